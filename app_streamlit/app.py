@@ -1,7 +1,46 @@
 # --- 1. Importação das Bibliotecas ---
+import io
+import os
+import time
+
 import streamlit as st
 import pandas as pd
-import joblib
+
+from cache_predicoes import CAPACIDADE_PADRAO, TTL_PADRAO_S, CachePredicoes
+from ensemble import Ensemble
+from esquema import EntradaInvalida
+from instrumentacao import (
+    AmostradorPilhas, Metricas, MetricasDesligadas, PREFIXO, coletor_cache, coletor_registro,
+    configuracao_ambiente, iniciar_servidor_metricas, prever_por_etapas,
+)
+from lote import COLUNA_ERRO, pontuar_csv
+from modelos import CAMINHOS_COMPACTOS, CAMINHOS_MODELOS, DIRETORIO_COMPACTOS, RegistroModelos
+from tabela_decisao import caminho_tabela, carregar_tabela
+from traducao import colunas_faltantes, preparar_dataframe, traduzir_predicao_para_portugues
+
+# --- Instrumentação (opcional) ---
+# Desligada por padrão; ativada por INSTRUMENTACAO=1, METRICAS_PORTA, METRICAS_ARQUIVO e
+# PERFIL_AMOSTRAS (ver instrumentacao.py). As métricas são compartilhadas entre as sessões.
+@st.cache_resource
+def obter_metricas():
+    """Cria as métricas da aplicação e inicia o endpoint e o amostrador de pilhas, se configurados."""
+    configuracao = configuracao_ambiente()
+    if configuracao['perfil']:
+        AmostradorPilhas(caminho=configuracao['perfil']).iniciar()
+    if not configuracao['ativa']:
+        return MetricasDesligadas()
+    metricas = Metricas()
+    if configuracao['porta']:
+        try:
+            iniciar_servidor_metricas(metricas, configuracao['porta'], configuracao['host'])
+        except OSError as erro:
+            # Porta ocupada por outro processo: as métricas continuam na barra lateral e no arquivo
+            st.warning(f"Endpoint de métricas indisponível em {configuracao['host']}:{configuracao['porta']}: {erro}")
+    return metricas
+
+
+metricas = obter_metricas()
+inicio_execucao = time.perf_counter()
 
 # --- HEADER ---
 st.markdown(
@@ -14,56 +53,49 @@ st.markdown(
 )
 
 # --- TABS ---
-abas = st.tabs(["Predição", "Dashboard Power BI"])
+abas = st.tabs(["Predição", "Predição em Lote", "Dashboard Power BI"])
 
 with abas[0]:
-    # Função para traduzir respostas do questionário do pt-br para inglês (esperado pelo modelo)
-    def traduzir_respostas_para_ingles(input_data):
-        traducoes = {
-            'Gender': {'Masculino': 'Male', 'Feminino': 'Female', 'Male': 'Male', 'Female': 'Female'},
-            'family_history': {'Sim': 'yes', 'Não': 'no', 'yes': 'yes', 'no': 'no'},
-            'family_history_with_overweight': {'Sim': 'yes', 'Não': 'no', 'yes': 'yes', 'no': 'no'},
-            'FAVC': {'Sim': 'yes', 'Não': 'no', 'yes': 'yes', 'no': 'no'},
-            'CAEC': {
-                'Não': 'no', 'Às vezes': 'Sometimes', 'Frequentemente': 'Frequently', 'Sempre': 'Always',
-                'no': 'no', 'Sometimes': 'Sometimes', 'Frequently': 'Frequently', 'Always': 'Always'
-            },
-            'SMOKE': {'Sim': 'yes', 'Não': 'no', 'yes': 'yes', 'no': 'no'},
-            'SCC': {'Sim': 'yes', 'Não': 'no', 'yes': 'yes', 'no': 'no'},
-            'CALC': {
-                'Não': 'no', 'Às vezes': 'Sometimes', 'Frequentemente': 'Frequently', 'Sempre': 'Always',
-                'no': 'no', 'Sometimes': 'Sometimes', 'Frequently': 'Frequently', 'Always': 'Always'
-            },
-            'MTRANS': {
-                'Transporte Público': 'Public_Transportation', 'Automóvel': 'Automobile', 'Caminhada': 'Walking',
-                'Motocicleta': 'Motorbike', 'Bicicleta': 'Bike',
-                'Public_Transportation': 'Public_Transportation', 'Automobile': 'Automobile',
-                'Walking': 'Walking', 'Motorbike': 'Motorbike', 'Bike': 'Bike'
-            }
-        }
-        for campo, valor in input_data.items():
-            if campo in traducoes and valor in traducoes[campo]:
-                input_data[campo] = traducoes[campo][valor]
-        return input_data
-
-    # Função para traduzir o resultado da predição do inglês para pt-br
-    def traduzir_predicao_para_portugues(prediction_text):
-        traducoes = {
-            'Insufficient Weight': 'Peso Insuficiente',
-            'Normal Weight': 'Peso Normal',
-            'Overweight Level I': 'Sobrepeso Nível I',
-            'Overweight Level II': 'Sobrepeso Nível II',
-            'Obesity Type I': 'Obesidade Tipo I',
-            'Obesity Type II': 'Obesidade Tipo II',
-            'Obesity Type III': 'Obesidade Tipo III'
-        }
-        return traducoes.get(prediction_text, prediction_text)
-
     # --- 2. Carregamento do Modelo Treinado ---
+    # O registro é compartilhado entre as sessões e só carrega cada modelo quando ele é
+    # selecionado pela primeira vez. Com AQUECER_MODELOS=1, todos são carregados em segundo plano.
     @st.cache_resource
-    def load_model(model_path):
-        """Carrega o pipeline de machine learning salvo."""
-        return joblib.load(model_path)
+    def obter_registro_modelos(compactos=False):
+        """Cria o registro de modelos compartilhado pela aplicação."""
+        registro = RegistroModelos(CAMINHOS_COMPACTOS if compactos else CAMINHOS_MODELOS)
+        metricas.adicionar_coletor(coletor_registro(registro, 'compacto' if compactos else 'pipeline'))
+        if os.environ.get('AQUECER_MODELOS') == '1':
+            registro.aquecer()
+        return registro
+
+    # Ensemble com todos os modelos do registro: um único pré-processamento e os classificadores
+    # executados em paralelo. É recriado quando algum arquivo de modelo muda (assinaturas); a
+    # versão substituída sai do cache e tem as suas threads liberadas.
+    @st.cache_resource(max_entries=2, on_release=Ensemble.fechar)
+    def obter_ensemble(compactos, assinaturas):
+        """Cria o ensemble com todos os modelos carregados pelo registro."""
+        registro = obter_registro_modelos(compactos)
+        return Ensemble({nome: registro.obter(nome) for nome in registro.caminhos})
+
+    # Cache de predições compartilhado entre as sessões. Com CACHE_PREDICOES_ARQUIVO definido,
+    # as predições também ficam em um arquivo SQLite e sobrevivem a reinicializações.
+    @st.cache_resource
+    def obter_cache_predicoes():
+        """Cria o cache de predições compartilhado pela aplicação."""
+        cache = CachePredicoes(
+            capacidade=int(os.environ.get('CACHE_PREDICOES_CAPACIDADE', CAPACIDADE_PADRAO)),
+            ttl_s=float(os.environ.get('CACHE_PREDICOES_TTL_S', TTL_PADRAO_S)),
+            caminho_disco=os.environ.get('CACHE_PREDICOES_ARQUIVO'),
+        )
+        metricas.adicionar_coletor(coletor_cache(cache))
+        return cache
+
+    # Tabela de decisão pré-calculada (tabela_decisao.py). A assinatura dos arquivos faz a
+    # tabela ser relida quando ela ou o modelo são substituídos.
+    @st.cache_resource
+    def obter_tabela_decisao(caminho_modelo, assinatura):
+        """Carrega a tabela de decisão do modelo, ou None se não houver uma tabela atualizada."""
+        return carregar_tabela(caminho_modelo)
 
     # --- 3. Configuração da Página e Título ---
     st.set_page_config(page_title="Sistema Preditivo de Obesidade", layout="wide")
@@ -78,22 +110,54 @@ with abas[0]:
     st.info("**Aviso:** Esta é uma ferramenta de apoio à decisão e não substitui o diagnóstico clínico realizado por um profissional de saúde qualificado.")
 
     # --- Escolha do Modelo ---
-    model_options = {
-        "KNN": "app_streamlit/models/KNN.pkl",
-        "Random Forest": "app_streamlit/models/RandomForest.pkl",
-        "SVM": "app_streamlit/models/SVM.pkl"
-    }
     st.sidebar.header("Configuração do Modelo")
-    selected_model_name = st.sidebar.selectbox("Selecione o modelo de Machine Learning", list(model_options.keys()), index=1)
-    selected_model_path = model_options[selected_model_name]
+    # Artefatos compactos (gerados por compactar.py) são menores e carregam mais rápido
+    usar_compactos = os.path.isdir(DIRETORIO_COMPACTOS) and st.sidebar.checkbox(
+        "Usar artefatos compactos", value=False, help="Modelos gerados por 'compactar.py'"
+    )
+    model_options = CAMINHOS_COMPACTOS if usar_compactos else CAMINHOS_MODELOS
+    # No modo ensemble, todos os modelos são executados e combinados por voto suave
+    OPCAO_ENSEMBLE = "Todos os modelos (ensemble)"
+    selected_model_name = st.sidebar.selectbox(
+        "Selecione o modelo de Machine Learning", list(model_options.keys()) + [OPCAO_ENSEMBLE], index=1
+    )
+    modo_ensemble = selected_model_name == OPCAO_ENSEMBLE
+    selected_model_path = model_options.get(selected_model_name)
 
     # Tenta carregar o modelo e exibe mensagem de erro se não encontrar o arquivo
+    registro_modelos = obter_registro_modelos(usar_compactos)
     try:
-        model = load_model(selected_model_path)
-    except FileNotFoundError:
-        st.error(f"Arquivo do modelo não encontrado: '{selected_model_path}'.\n\nVerifique se o arquivo existe no diretório correto.")
+        with st.spinner(f"Carregando o modelo '{selected_model_name}'..."):
+            if modo_ensemble:
+                assinaturas = tuple(os.stat(caminho).st_mtime_ns for caminho in model_options.values())
+                model = obter_ensemble(usar_compactos, assinaturas)
+            else:
+                model = registro_modelos.obter(selected_model_name)
+    except FileNotFoundError as erro:
+        st.error(f"Arquivo do modelo não encontrado: '{erro.filename}'.\n\nVerifique se o arquivo existe no diretório correto.")
         st.stop()
 
+    # Com a tabela de decisão, a predição é uma consulta a um array; combinações ou faixas de
+    # Idade/IMC fora da tabela usam o modelo exato
+    tabela_decisao = None
+    if not modo_ensemble and os.path.exists(caminho_tabela(selected_model_path)):
+        assinatura_tabela = tuple(
+            os.stat(caminho).st_mtime_ns for caminho in (selected_model_path, caminho_tabela(selected_model_path))
+        )
+        tabela_decisao = obter_tabela_decisao(selected_model_path, assinatura_tabela)
+    usar_tabela = tabela_decisao is not None and st.sidebar.checkbox(
+        "Usar tabela de decisão", value=False,
+        help="Predições pré-calculadas por faixas de Idade e IMC (geradas por 'tabela_decisao.py')"
+    )
+
+    with st.sidebar.expander("Desempenho de carregamento"):
+        relatorio_carga = registro_modelos.relatorio()
+        if relatorio_carga['tempo_importacao_s'] is not None:
+            st.caption(f"Importação das bibliotecas: {relatorio_carga['tempo_importacao_s'] * 1000:.0f} ms")
+        for nome, estatisticas in relatorio_carga['modelos'].items():
+            rss = f"{estatisticas['rss_mb']:.1f} MB" if estatisticas['rss_mb'] is not None else "n/d"
+            st.caption(f"**{nome}**: carga {estatisticas['tempo_carga_s'] * 1000:.0f} ms, RSS +{rss}")
+
     # --- 4. Coleta de Dados do Usuário com a Interface ---
     # Usamos um container para agrupar os campos do formulário
     with st.container():
@@ -131,52 +195,69 @@ with abas[0]:
     # --- 5. Botão e Lógica de Predição ---
     # O botão de predição, quando clicado, aciona o modelo
     if st.button('**Prever Nível de Obesidade**', use_container_width=True):
-        # Garante compatibilidade de nomes de coluna para todos os modelos
-        # Se o modelo espera 'family_history', use esse nome
-        # Se espera 'family_history_with_overweight', use esse nome
-        # Se espera ambos, envie ambos
-        family_history_keys = []
-        if hasattr(model, 'feature_names_in_'):
-            if 'family_history' in model.feature_names_in_:
-                family_history_keys.append('family_history')
-            if 'family_history_with_overweight' in model.feature_names_in_:
-                family_history_keys.append('family_history_with_overweight')
-        else:
-            # fallback: mantém ambos
-            family_history_keys = ['family_history', 'family_history_with_overweight']
-
+        # Rótulo do modelo nas métricas de instrumentação
+        rotulo_modelo = "Ensemble" if modo_ensemble else selected_model_name + (" (tabela)" if usar_tabela else "")
+        inicio_predicao = time.perf_counter()
         input_data = {
             'Gender': gender, 'Age': age, 'Height': height, 'Weight': weight,
             'FAVC': favc, 'FCVC': fcvc, 'NCP': ncp,
             'CAEC': caec, 'SMOKE': smoke, 'CH2O': ch2o, 'SCC': scc, 'FAF': faf,
-            'TUE': tue, 'CALC': calc, 'MTRANS': mtrans
+            'TUE': tue, 'CALC': calc, 'MTRANS': mtrans, 'family_history': family_history
         }
-        for key in family_history_keys:
-            input_data[key] = family_history
-
-        # Traduz as respostas para inglês antes de enviar ao modelo
-        input_data = traduzir_respostas_para_ingles(input_data)
 
-        input_df = pd.DataFrame([input_data])
-        input_df['IMC'] = input_df['Weight'] / (input_df['Height']**2)
+        # Valida e traduz as respostas para inglês, resolve os nomes de coluna esperados pelo
+        # modelo (ex: 'family_history_with_overweight') e cria o IMC antes de enviar ao modelo
+        with metricas.medir('montagem_dataframe', modelo=rotulo_modelo):
+            input_df = pd.DataFrame([input_data])
+        try:
+            with metricas.medir('traducao', modelo=rotulo_modelo):
+                input_df = preparar_dataframe(input_df, model)
+        except EntradaInvalida as erro:
+            st.error("Alguns campos do formulário têm valores inválidos.")
+            st.dataframe(erro.relatorio, use_container_width=True)
+            st.stop()
 
         # Garante que todas as colunas esperadas pelo modelo estejam presentes
-        if hasattr(model, 'feature_names_in_'):
-            expected_cols = set(model.feature_names_in_)
-            input_cols = set(input_df.columns)
-            missing = expected_cols - input_cols
-            if missing:
-                st.error(f"As seguintes colunas estão faltando para o modelo '{selected_model_name}': {missing}")
-                st.stop()
-
-        # Utiliza o modelo carregado para fazer a predição
-        prediction = model.predict(input_df)
-        
+        missing = colunas_faltantes(input_df, model)
+        if missing:
+            st.error(f"As seguintes colunas estão faltando para o modelo '{selected_model_name}': {missing}")
+            st.stop()
+
+        # Utiliza o modelo carregado para fazer a predição (ou reaproveita uma predição
+        # idêntica já feita com a mesma versão do arquivo do modelo)
+        input_row = input_df[list(model.feature_names_in_)].iloc[0] if hasattr(model, 'feature_names_in_') else input_df.iloc[0]
+        probabilidades_ensemble = None
+        if modo_ensemble:
+            with metricas.medir('modelo', modelo=rotulo_modelo):
+                resultado_ensemble = model.prever_registro(input_data)
+            prediction = str(resultado_ensemble['classe'])
+            probabilidades_ensemble = pd.DataFrame(
+                {nome: r['probabilidades'] for nome, r in resultado_ensemble['modelos'].items()}
+                | {"Ensemble": resultado_ensemble['probabilidades']}
+            ).T
+        elif usar_tabela:
+            # A chave usa o hash do arquivo da tabela: uma tabela regenerada invalida as respostas antigas
+            prediction = obter_cache_predicoes().obter_ou_calcular(
+                f"{selected_model_path}#tabela", caminho_tabela(selected_model_path), input_row,
+                lambda: str(tabela_decisao.prever(input_data, model))
+            )
+            metricas.incrementar(f'{PREFIXO}_predicoes_tabela_total', ajuda='Predições pela tabela de decisão',
+                                 modelo=selected_model_name)
+        else:
+            prediction = obter_cache_predicoes().obter_ou_calcular(
+                selected_model_path, selected_model_path, input_row,
+                lambda: str(prever_por_etapas(model, input_df, metricas, rotulo_modelo)[0])
+            )
+        metricas.observar(f'{PREFIXO}_predicao_segundos', time.perf_counter() - inicio_predicao,
+                          'Duração da predição (sem a renderização do resultado)', modelo=rotulo_modelo)
+        metricas.incrementar(f'{PREFIXO}_predicoes_total', ajuda='Predições realizadas', modelo=rotulo_modelo)
+        inicio_renderizacao = time.perf_counter()
+
         # --- 6. Exibição do Resultado ---
         st.subheader('Resultado da Predição', divider='blue')
         
         # Formata o texto da predição para ser mais legível
-        prediction_text = prediction[0].replace("_", " ")
+        prediction_text = prediction.replace("_", " ")
         # Traduz o resultado para português
         prediction_text_pt = traduzir_predicao_para_portugues(prediction_text)
         
@@ -188,7 +269,69 @@ with abas[0]:
         else:
             st.success(f'**{prediction_text_pt}**')
 
+        if probabilidades_ensemble is not None:
+            # Probabilidade de cada classe por modelo e no voto suave do ensemble
+            probabilidades_ensemble.columns = [
+                traduzir_predicao_para_portugues(classe.replace("_", " ")) for classe in probabilidades_ensemble.columns
+            ]
+            st.dataframe(probabilidades_ensemble.style.format("{:.1%}"), use_container_width=True)
+        metricas.registrar_etapa('renderizacao', time.perf_counter() - inicio_renderizacao, modelo=rotulo_modelo)
+
+    with st.sidebar.expander("Cache de predições"):
+        contadores_cache = obter_cache_predicoes().contadores()
+        st.caption(
+            f"Acertos: {contadores_cache['acertos']} | Falhas: {contadores_cache['falhas']} "
+            f"({contadores_cache['taxa_acerto'] * 100:.0f}% de acerto)"
+        )
+        st.caption(
+            f"Itens: {contadores_cache['itens']} | Removidos: {contadores_cache['remocoes']} | "
+            f"Expirados: {contadores_cache['expirados']} | Invalidados: {contadores_cache['invalidacoes']}"
+        )
+
+    if metricas.ativa:
+        with st.sidebar.expander("Instrumentação"):
+            for (etapa, modelo), (quantidade, media) in sorted(metricas.resumo_etapas().items()):
+                st.caption(f"**{etapa}** ({modelo}): {media * 1000:.2f} ms em média, {quantidade} medições")
+
 with abas[1]:
+    # --- 7. Predição em Lote a partir de um arquivo CSV ---
+    st.subheader("Predição em Lote")
+    st.markdown("""
+    Envie um arquivo CSV no mesmo formato de `Obesity.csv` (uma linha por paciente).
+    O arquivo é processado em blocos, com uma única chamada ao modelo por bloco.
+    """)
+    arquivo_lote = st.file_uploader("Arquivo CSV de questionários", type=['csv'])
+    tamanho_lote = st.number_input('Linhas por bloco', min_value=100, max_value=100_000, value=10_000, step=100)
+
+    if arquivo_lote is not None and st.button('**Prever Lote**', use_container_width=True):
+        progresso = st.empty()
+
+        def relatar_progresso(linhas, segundos):
+            progresso.info(f"{linhas} linhas pontuadas ({linhas / segundos:,.0f} linhas/s)")
+
+        saida_lote = io.StringIO()
+        try:
+            estatisticas = pontuar_csv(model, arquivo_lote, saida_lote, int(tamanho_lote),
+                                       ao_concluir_lote=relatar_progresso)
+        except (ValueError, KeyError) as erro:
+            st.error(f"Não foi possível pontuar o arquivo com o modelo '{selected_model_name}': {erro}")
+            st.stop()
+
+        st.success(
+            f"**{estatisticas['linhas']}** linhas pontuadas em {estatisticas['segundos']:.2f}s "
+            f"({estatisticas['linhas_por_segundo']:,.0f} linhas/s)"
+        )
+        if estatisticas['linhas_invalidas']:
+            st.warning(
+                f"**{estatisticas['linhas_invalidas']}** linhas com valores inválidos não foram previstas; "
+                f"os motivos estão na coluna '{COLUNA_ERRO}' do arquivo de predições."
+            )
+        st.download_button(
+            'Baixar predições (CSV)', saida_lote.getvalue(),
+            file_name='predicoes.csv', mime='text/csv', use_container_width=True
+        )
+
+with abas[2]:
     st.subheader("Dashboard Power BI")
     powerbi_url = "https://app.powerbi.com/view?r=eyJrIjoiMjE3NGM2YjEtZjc1Zi00Y2RhLTg5MjctMDhkY2IwNThmNjczIiwidCI6Ijk4ZmM5YWY2LWZkOWItNGI5Yi1hZjA2LTNiY2VjYmQwNzNkMiIsImMiOjR9"  # Substitua pelo seu link de incorporação
     st.markdown(
@@ -198,6 +341,13 @@ with abas[1]:
         unsafe_allow_html=True
     )
 
+# --- Duração da execução do script (renderização completa da página) ---
+# Registrada antes do rodapé para que o arquivo de métricas, se configurado, inclua esta execução
+metricas.observar(f'{PREFIXO}_execucao_script_segundos', time.perf_counter() - inicio_execucao,
+                  'Duração de cada execução do script do Streamlit')
+if metricas.ativa and configuracao_ambiente()['arquivo']:
+    metricas.gravar_arquivo(configuracao_ambiente()['arquivo'])
+
 # --- FOOTER ---
 st.markdown(
     """
@@ -0,0 +1,446 @@
+# --- Benchmark de treino e inferência dos modelos (KNN, Random Forest, SVM) ---
+# Para cada conjunto de dados ('Obesity.csv' e/ou dados sintéticos ampliados por sinteticos.py) e
+# cada modelo, mede:
+#   - treino: tempo de parede do fit do pipeline, pico de memória e acurácia no teste;
+#   - artefato: tamanho do .pkl e tempo de carga (primeira carga do processo e cargas seguintes);
+#   - inferência: latência por registro (caminho da interface: DataFrame + tradução + predict) e
+#     latência/vazão em lotes de 1, 64, 1024 e 65536 linhas.
+# Cada etapa roda em um processo novo ('spawn'), para que memória e caches de uma não afetem a
+# outra. O resultado vai para um JSON com os metadados do ambiente (versões, CPU, commit) e pode
+# ser comparado com uma base salva: métricas piores que a tolerância são listadas como regressões.
+#
+# Uso:
+#   python app_streamlit/benchmark.py --salvar-base                   # mede e grava a base
+#   python app_streamlit/benchmark.py --saida resultado.json          # mede e compara com a base
+#   python app_streamlit/benchmark.py --dados sintetico --linhas-sinteticas 50000 --modelos SVM
+#   python app_streamlit/benchmark.py --comparar resultado.json       # só compara um JSON já gerado
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from dataset_colunar import CAMINHO_DADOS, DIRETORIO_CACHE
+from modelos import CAMINHOS_MODELOS, DIRETORIO_MODELOS
+
+DIRETORIO_BENCHMARK = os.path.join(DIRETORIO_MODELOS, 'benchmark')
+CAMINHO_BASE = os.path.join(DIRETORIO_BENCHMARK, 'base.json')
+VERSAO_FORMATO = 1
+
+TAMANHOS_LOTE_PADRAO = [1, 64, 1024, 65536]
+LINHAS_SINTETICAS_PADRAO = 20_000
+REGISTROS_PADRAO = 500
+# Piora relativa tolerada nas métricas de desempenho e queda absoluta tolerada na acurácia.
+# Medições de poucos milissegundos variam bastante entre execuções na mesma máquina; a base deve
+# ser gravada no mesmo ambiente em que a comparação é feita.
+TOLERANCIA_PADRAO = 0.5
+TOLERANCIA_ACURACIA_PADRAO = 0.01
+# Métricas em que um valor maior é melhor; nas demais (tempos, memória, tamanho), menor é melhor
+MAIOR_MELHOR = {'acuracia', 'registros_por_s', 'linhas_por_s'}
+# Métricas que não entram na comparação: descrevem a configuração ou variam demais entre execuções
+NAO_COMPARAVEIS = {'linhas_treino', 'linhas_teste', 'repeticoes', 'latencia_ms_p95', 'tempo_primeira_carga_s'}
+# Variações de tempo abaixo deste valor (ms) nunca são regressões, qualquer que seja a variação relativa
+LIMIAR_ABSOLUTO_MS_PADRAO = 5.0
+
+
+def _contexto_processo():
+    return multiprocessing.get_context('spawn')
+
+
+def _executar_isolado(funcao, *args):
+    """Executa `funcao(*args)` em um processo Python novo e retorna o resultado."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=_contexto_processo()) as executor:
+        return executor.submit(funcao, *args).result()
+
+
+def _cronometrar(funcao, repeticoes_minimas=5, tempo_minimo_s=1.0, repeticoes_maximas=1000, aquecer=True):
+    """Durações (s) de chamadas repetidas de `funcao`, por padrão após uma chamada de aquecimento."""
+    if aquecer:
+        funcao()
+    duracoes = []
+    inicio = time.perf_counter()
+    while len(duracoes) < repeticoes_maximas and (
+        len(duracoes) < repeticoes_minimas or time.perf_counter() - inicio < tempo_minimo_s
+    ):
+        comeco = time.perf_counter()
+        funcao()
+        duracoes.append(time.perf_counter() - comeco)
+    return duracoes
+
+
+# --- Medições (executadas em processos isolados) ---
+def _medir_treino(nome, caminho_dados, diretorio_cache, destino):
+    """Treina o pipeline como treinar.py e salva em `destino`. Retorna tempo, memória e acurácia.
+
+    Treinos rápidos são repetidos (com pipelines novos) por pelo menos 2s e o tempo é a mediana.
+    """
+    from sklearn.base import clone
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+    import joblib
+
+    from modelos import pico_memoria_mb, rss_atual_mb
+    from treinar import CLASSIFICADORES, CONFIG_DIVISAO, carregar_dataset, criar_preprocessador
+
+    X, y = carregar_dataset(caminho_dados, diretorio_cache)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, **CONFIG_DIVISAO)
+    classe, parametros = CLASSIFICADORES[nome]
+    pipeline = Pipeline(steps=[('preprocessor', criar_preprocessador(X_train)), ('classifier', classe(**parametros))])
+
+    rss_antes = rss_atual_mb()
+    treinados = []
+
+    def treinar():
+        treinados[:] = [clone(pipeline).fit(X_train, y_train)]
+
+    duracoes = _cronometrar(treinar, repeticoes_minimas=1, tempo_minimo_s=2.0, repeticoes_maximas=20, aquecer=False)
+    pico = pico_memoria_mb()
+    treinado = treinados[0]
+    joblib.dump(treinado, destino)
+    return {
+        'tempo_treino_s': float(np.median(duracoes)),
+        'pico_memoria_mb': pico,
+        'memoria_treino_mb': pico - rss_antes if rss_antes is not None else None,
+        'acuracia': float(accuracy_score(y_test, treinado.predict(X_test))),
+        'linhas_treino': len(X_train),
+        'linhas_teste': len(X_test),
+    }
+
+
+def _medir_carga(caminho_modelo):
+    """Tamanho do artefato e tempo de carga: primeira carga do processo e mediana das seguintes."""
+    import joblib
+    import sklearn.pipeline  # noqa: F401 (o tempo de importação não entra na carga)
+
+    inicio = time.perf_counter()
+    joblib.load(caminho_modelo)
+    primeira = time.perf_counter() - inicio
+    seguintes = _cronometrar(lambda: joblib.load(caminho_modelo), aquecer=False)
+    return {
+        'tamanho_arquivo_mb': os.path.getsize(caminho_modelo) / 1024**2,
+        'tempo_primeira_carga_s': primeira,
+        'tempo_carga_s': float(np.median(seguintes)),
+    }
+
+
+def _medir_inferencia(caminho_modelo, caminho_dados, diretorio_cache, tamanhos_lote, n_registros, semente=42):
+    """Latência por registro (caminho da interface) e latência/vazão por tamanho de lote."""
+    import joblib
+    import pandas as pd
+
+    from dataset_colunar import carregar_colunar
+    from traducao import preparar_dataframe
+
+    model = joblib.load(caminho_modelo)
+    entrada = carregar_colunar(caminho_dados, diretorio_cache).drop(columns=['Obesity', 'IMC'])
+    rng = np.random.default_rng(semente)
+
+    # Registro a registro, como na interface: DataFrame de uma linha, tradução/IMC e predict
+    registros = entrada.iloc[rng.integers(0, len(entrada), n_registros)].astype(object).to_dict('records')
+
+    def prever_registro(registro):
+        return model.predict(preparar_dataframe(pd.DataFrame([registro]), model))
+
+    prever_registro(registros[0])
+    duracoes = []
+    for registro in registros:
+        inicio = time.perf_counter()
+        prever_registro(registro)
+        duracoes.append(time.perf_counter() - inicio)
+    duracoes = np.array(duracoes)
+    resultado = {
+        'registro': {
+            'latencia_ms_p50': float(np.percentile(duracoes, 50) * 1000),
+            'latencia_ms_p95': float(np.percentile(duracoes, 95) * 1000),
+            'registros_por_s': float(len(duracoes) / duracoes.sum()),
+        },
+        'lotes': {},
+    }
+
+    # Em lote: um DataFrame de n linhas (sorteadas com reposição) por chamada
+    for tamanho in tamanhos_lote:
+        lote = entrada.iloc[rng.integers(0, len(entrada), tamanho)].reset_index(drop=True)
+        duracoes = _cronometrar(lambda: model.predict(preparar_dataframe(lote, model)))
+        mediana = float(np.median(duracoes))
+        resultado['lotes'][str(tamanho)] = {
+            'latencia_ms': mediana * 1000,
+            'linhas_por_s': tamanho / mediana,
+            'repeticoes': len(duracoes),
+        }
+    return resultado
+
+
+# --- Ambiente ---
+def _versao(modulo):
+    try:
+        return __import__(modulo).__version__
+    except (ImportError, AttributeError):
+        return None
+
+
+def _commit_git():
+    try:
+        saida = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return saida.stdout.strip() or None
+
+
+def metadados_ambiente():
+    """Versões de Python e das bibliotecas, CPU, bibliotecas de BLAS e commit do repositório."""
+    ambiente = {
+        'python': platform.python_version(),
+        'implementacao': platform.python_implementation(),
+        'sistema': platform.platform(),
+        'maquina': platform.machine(),
+        'processador': platform.processor() or None,
+        'nucleos': os.cpu_count(),
+        'bibliotecas': {modulo: _versao(modulo) for modulo in ('sklearn', 'numpy', 'pandas', 'scipy', 'joblib')},
+        'variaveis_threads': {
+            nome: os.environ[nome] for nome in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+            if nome in os.environ
+        },
+        'commit': _commit_git(),
+    }
+    try:
+        from threadpoolctl import threadpool_info
+        # A ordem das bibliotecas carregadas varia entre execuções
+        ambiente['blas'] = sorted((
+            {chave: info.get(chave) for chave in ('internal_api', 'version', 'num_threads', 'architecture')}
+            for info in threadpool_info()
+        ), key=lambda info: json.dumps(info, sort_keys=True))
+    except ImportError:
+        pass
+    return ambiente
+
+
+# --- Execução ---
+def executar(modelos, conjuntos, linhas_sinteticas=LINHAS_SINTETICAS_PADRAO, tamanhos_lote=TAMANHOS_LOTE_PADRAO,
+             n_registros=REGISTROS_PADRAO, semente=42, relatar=print):
+    """Executa o benchmark e retorna o resultado (dicionário serializável em JSON)."""
+    from cache_predicoes import HashArquivos
+    from sinteticos import gerar_csv
+
+    resultado = {
+        'versao': VERSAO_FORMATO,
+        'executado_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'ambiente': metadados_ambiente(),
+        'configuracao': {
+            'modelos': list(modelos), 'conjuntos': list(conjuntos), 'linhas_sinteticas': linhas_sinteticas,
+            'tamanhos_lote': list(tamanhos_lote), 'registros': n_registros, 'semente': semente,
+        },
+        'resultados': {},
+    }
+    diretorio_temporario = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        for conjunto in conjuntos:
+            if conjunto == 'obesity':
+                caminho_dados, diretorio_cache = CAMINHO_DADOS, DIRETORIO_CACHE
+            else:
+                caminho_dados = os.path.join(diretorio_temporario, 'sintetico.csv')
+                diretorio_cache = os.path.join(diretorio_temporario, 'cache')
+                relatar(f"Gerando {linhas_sinteticas} linhas sintéticas...")
+                gerar_csv(caminho_dados, linhas_sinteticas, semente=semente)
+            resultados_conjunto = resultado['resultados'][conjunto] = {
+                '_dados': {'hash': HashArquivos().obter(caminho_dados)[:16]},
+            }
+            for nome in modelos:
+                relatar(f"[{conjunto}] {nome}: treino...")
+                destino = os.path.join(diretorio_temporario, f"{conjunto}_{os.path.basename(CAMINHOS_MODELOS[nome])}")
+                treino = _executar_isolado(_medir_treino, nome, caminho_dados, diretorio_cache, destino)
+                resultados_conjunto['_dados']['linhas'] = treino['linhas_treino'] + treino['linhas_teste']
+                relatar(f"[{conjunto}] {nome}: carga e inferência...")
+                carga = _executar_isolado(_medir_carga, destino)
+                inferencia = _executar_isolado(
+                    _medir_inferencia, destino, caminho_dados, diretorio_cache, tamanhos_lote, n_registros, semente
+                )
+                resultados_conjunto[nome] = {'treino': treino, 'artefato': carga, **inferencia}
+    finally:
+        shutil.rmtree(diretorio_temporario, ignore_errors=True)
+    return resultado
+
+
+# --- Comparação com a base ---
+def _achatar(resultados, prefixo=()):
+    """{('obesity', 'SVM', 'lotes', '64', 'linhas_por_s'): valor, ...} das métricas numéricas."""
+    metricas = {}
+    for chave, valor in resultados.items():
+        if chave.startswith('_'):
+            continue
+        if isinstance(valor, dict):
+            metricas.update(_achatar(valor, prefixo + (chave,)))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool) and chave not in NAO_COMPARAVEIS:
+            metricas[prefixo + (chave,)] = float(valor)
+    return metricas
+
+
+def _diferenca_ms(metrica, anterior, atual):
+    """Diferença absoluta em ms para métricas de tempo (sufixo _s ou _ms), ou None."""
+    if metrica.endswith('_s') and not metrica.endswith('_por_s'):
+        return (atual - anterior) * 1000
+    if metrica.startswith('latencia_ms') or metrica.endswith('_ms'):
+        return atual - anterior
+    return None
+
+
+def comparar(resultado, base, tolerancia=TOLERANCIA_PADRAO, tolerancia_acuracia=TOLERANCIA_ACURACIA_PADRAO,
+             limiar_absoluto_ms=LIMIAR_ABSOLUTO_MS_PADRAO):
+    """Compara as métricas de `resultado` com as de `base`.
+
+    Retorna a lista de comparações (caminho, base, atual, variação relativa, se é regressão) e as
+    diferenças de ambiente (versões, CPU, commit) que podem explicar as variações.
+    """
+    atuais = _achatar(resultado['resultados'])
+    anteriores = _achatar(base['resultados'])
+    comparacoes = []
+    for caminho in sorted(atuais.keys() & anteriores.keys()):
+        atual, anterior = atuais[caminho], anteriores[caminho]
+        metrica = caminho[-1]
+        variacao = (atual - anterior) / anterior if anterior else 0.0
+        if metrica == 'acuracia':
+            regressao = anterior - atual > tolerancia_acuracia
+        elif metrica in MAIOR_MELHOR:
+            regressao = variacao < -tolerancia
+        else:
+            diferenca_ms = _diferenca_ms(metrica, anterior, atual)
+            regressao = variacao > tolerancia and (diferenca_ms is None or diferenca_ms > limiar_absoluto_ms)
+        comparacoes.append({
+            'metrica': '/'.join(caminho), 'base': anterior, 'atual': atual,
+            'variacao': variacao, 'regressao': regressao,
+        })
+
+    diferencas_ambiente = {}
+    ambiente_atual, ambiente_base = _achatar_ambiente(resultado['ambiente']), _achatar_ambiente(base['ambiente'])
+    for chave in sorted(ambiente_atual.keys() | ambiente_base.keys()):
+        if ambiente_atual.get(chave) != ambiente_base.get(chave):
+            diferencas_ambiente[chave] = (ambiente_base.get(chave), ambiente_atual.get(chave))
+    for conjunto in resultado['resultados'].keys() & base['resultados'].keys():
+        dados_atual = resultado['resultados'][conjunto].get('_dados')
+        dados_base = base['resultados'][conjunto].get('_dados')
+        if dados_atual != dados_base:
+            diferencas_ambiente[f'dados/{conjunto}'] = (dados_base, dados_atual)
+    return comparacoes, diferencas_ambiente
+
+
+def _achatar_ambiente(ambiente, prefixo=''):
+    achatado = {}
+    for chave, valor in ambiente.items():
+        if isinstance(valor, dict):
+            achatado.update(_achatar_ambiente(valor, f'{prefixo}{chave}/'))
+        else:
+            achatado[f'{prefixo}{chave}'] = json.dumps(valor, sort_keys=True) if isinstance(valor, list) else valor
+    return achatado
+
+
+# --- Relatórios ---
+def imprimir_resultado(resultado):
+    tamanhos = resultado['configuracao']['tamanhos_lote']
+    for conjunto, modelos in resultado['resultados'].items():
+        print(f"\n=== {conjunto} ({modelos['_dados'].get('linhas', '?')} linhas) ===")
+        print(f"{'Modelo':<15}{'Treino (s)':>11}{'Pico (MB)':>11}{'Acurácia':>10}{'.pkl (MB)':>11}"
+              f"{'Carga (ms)':>12}{'Registro p50 (ms)':>19}")
+        for nome, r in modelos.items():
+            if nome.startswith('_'):
+                continue
+            print(f"{nome:<15}{r['treino']['tempo_treino_s']:>11.2f}{r['treino']['pico_memoria_mb']:>11.0f}"
+                  f"{r['treino']['acuracia'] * 100:>9.2f}%{r['artefato']['tamanho_arquivo_mb']:>11.2f}"
+                  f"{r['artefato']['tempo_carga_s'] * 1000:>12.1f}{r['registro']['latencia_ms_p50']:>19.3f}")
+        print(f"\n{'Lote: linhas/s (ms por lote)':<30}" + ''.join(f"{tamanho:>20}" for tamanho in tamanhos))
+        for nome, r in modelos.items():
+            if nome.startswith('_'):
+                continue
+            celulas = [
+                f"{r['lotes'][str(t)]['linhas_por_s']:,.0f} ({r['lotes'][str(t)]['latencia_ms']:.1f})" for t in tamanhos
+            ]
+            print(f"{nome:<30}" + ''.join(f"{celula:>20}" for celula in celulas))
+
+
+def imprimir_comparacao(comparacoes, diferencas_ambiente, mostrar_todas=False):
+    if diferencas_ambiente:
+        print("\nDiferenças de ambiente em relação à base:")
+        for chave, (anterior, atual) in diferencas_ambiente.items():
+            print(f"  {chave}: {anterior} -> {atual}")
+    regressoes = [c for c in comparacoes if c['regressao']]
+    exibidas = comparacoes if mostrar_todas else regressoes
+    if exibidas:
+        print(f"\n{'Métrica':<55}{'Base':>14}{'Atual':>14}{'Variação':>10}")
+        for c in exibidas:
+            marca = '  REGRESSÃO' if c['regressao'] else ''
+            print(f"{c['metrica']:<55}{c['base']:>14.4g}{c['atual']:>14.4g}{c['variacao'] * 100:>+9.1f}%{marca}")
+    print(f"\n{len(comparacoes)} métricas comparadas, {len(regressoes)} regressões.")
+    return regressoes
+
+
+def gravar_json(dados, caminho):
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de treino e inferência dos modelos.")
+    parser.add_argument('--modelos', nargs='+', choices=list(CAMINHOS_MODELOS), default=list(CAMINHOS_MODELOS))
+    parser.add_argument('--dados', nargs='+', choices=['obesity', 'sintetico'], default=['obesity', 'sintetico'],
+                        help="Conjuntos de dados: 'Obesity.csv' e/ou dados sintéticos ampliados")
+    parser.add_argument('--linhas-sinteticas', type=int, default=LINHAS_SINTETICAS_PADRAO)
+    parser.add_argument('--tamanhos-lote', type=int, nargs='+', default=TAMANHOS_LOTE_PADRAO)
+    parser.add_argument('--registros', type=int, default=REGISTROS_PADRAO,
+                        help="Registros previstos um a um na medição de latência por registro")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', help="Arquivo JSON do resultado")
+    parser.add_argument('--base', default=CAMINHO_BASE, help="JSON usado como base de comparação")
+    parser.add_argument('--salvar-base', action='store_true', help="Grava o resultado como a nova base")
+    parser.add_argument('--comparar', metavar='RESULTADO',
+                        help="Não executa: compara um JSON já gerado com a base")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help="Piora relativa tolerada em tempos, memória, tamanho e vazão")
+    parser.add_argument('--tolerancia-acuracia', type=float, default=TOLERANCIA_ACURACIA_PADRAO,
+                        help="Queda absoluta tolerada na acurácia")
+    parser.add_argument('--limiar-ms', type=float, default=LIMIAR_ABSOLUTO_MS_PADRAO,
+                        help="Aumento mínimo (ms) para que um tempo seja considerado regressão")
+    parser.add_argument('--todas', action='store_true', help="Lista todas as métricas comparadas, não só as regressões")
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            resultado = json.load(arquivo)
+    else:
+        resultado = executar(args.modelos, args.dados, args.linhas_sinteticas, args.tamanhos_lote,
+                             args.registros, args.semente, relatar=lambda texto: print(texto, file=sys.stderr))
+        imprimir_resultado(resultado)
+        if args.saida:
+            gravar_json(resultado, args.saida)
+            print(f"\nResultado salvo em '{args.saida}'")
+
+    if args.salvar_base:
+        gravar_json(resultado, args.base)
+        print(f"Base salva em '{args.base}'")
+    elif os.path.exists(args.base):
+        with open(args.base, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        regressoes = imprimir_comparacao(
+            *comparar(resultado, base, args.tolerancia, args.tolerancia_acuracia, args.limiar_ms), mostrar_todas=args.todas
+        )
+        if regressoes:
+            raise SystemExit(1)
+    else:
+        print(f"Sem base para comparação em '{args.base}' (use --salvar-base).")
+
+
+if __name__ == '__main__':
+    # Importa pelo nome do módulo para que os processos de medição encontrem as funções em 'benchmark'
+    from benchmark import main
+    main()
@@ -0,0 +1,67 @@
+# --- Benchmark: micro-lotes x uma chamada ao modelo por registro ---
+# Compara a vazão de N requisições simultâneas de um único registro, previstas uma a uma
+# ou agrupadas pelo MicroLote, para os modelos Random Forest e SVM (probability=True).
+# Uso: python app_streamlit/benchmark_microlote.py --registros 1000 --max-lote 8 32 128
+import argparse
+import asyncio
+import time
+
+from carga import amostrar_registros
+from lote import prever_registros
+from microlote import MAX_ESPERA_MS_PADRAO, MicroLote
+from servidor import carregar_modelos
+
+
+def medir_por_registro(model, registros):
+    """Vazão (registros/s) chamando o pipeline uma vez por registro."""
+    inicio = time.perf_counter()
+    for registro in registros:
+        prever_registros(model, [registro])
+    return len(registros) / (time.perf_counter() - inicio)
+
+
+async def _disparar_simultaneos(micro_lote, registros):
+    return await asyncio.gather(*(micro_lote.prever(registro) for registro in registros))
+
+
+def medir_micro_lote(model, registros, max_lote, max_espera_ms):
+    """Vazão (registros/s) e tamanho médio de lote com todas as requisições chegando juntas."""
+    async def executar():
+        micro_lote = MicroLote(model, max_lote, max_espera_ms)
+        try:
+            inicio = time.perf_counter()
+            await _disparar_simultaneos(micro_lote, registros)
+            duracao = time.perf_counter() - inicio
+        finally:
+            await micro_lote.encerrar()
+        return len(registros) / duracao, micro_lote.tamanho_medio_lote
+
+    return asyncio.run(executar())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do agendador de micro-lotes.")
+    parser.add_argument('--registros', type=int, default=1000, help="Requisições simultâneas por medição")
+    parser.add_argument('--max-lote', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--max-espera-ms', type=float, default=MAX_ESPERA_MS_PADRAO)
+    parser.add_argument('--modelos', nargs='+', default=["Random Forest", "SVM"])
+    args = parser.parse_args()
+
+    modelos = carregar_modelos()
+    registros = amostrar_registros(args.registros)
+
+    print(f"{'Modelo':<15}{'Modo':<22}{'Lote médio':>12}{'registros/s':>14}{'Ganho':>8}")
+    for nome_modelo in args.modelos:
+        model = modelos[nome_modelo]
+        prever_registros(model, registros[:1])  # aquecimento
+
+        base = medir_por_registro(model, registros)
+        print(f"{nome_modelo:<15}{'por registro':<22}{1:>12.1f}{base:>14.1f}{1:>7.1f}x")
+        for max_lote in args.max_lote:
+            vazao, lote_medio = medir_micro_lote(model, registros, max_lote, args.max_espera_ms)
+            modo = f"micro-lote (N={max_lote})"
+            print(f"{nome_modelo:<15}{modo:<22}{lote_medio:>12.1f}{vazao:>14.1f}{vazao / base:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
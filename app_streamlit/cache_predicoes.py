@@ -0,0 +1,207 @@
+# --- Cache de predições ---
+# O formulário tem um espaço de entradas pequeno e discreto, então muitas submissões se repetem.
+# As predições ficam guardadas em um cache LRU com TTL, com chave formada por
+# (nome do modelo, hash do arquivo .pkl, linha de entrada canônica já traduzida).
+# Quando um .pkl é retreinado o hash muda e as entradas antigas daquele modelo são descartadas.
+# Opcionalmente o cache é espelhado em um arquivo SQLite, sobrevivendo a reinicializações.
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CAPACIDADE_PADRAO = 10_000
+TTL_PADRAO_S = 24 * 60 * 60
+
+
+class HashArquivos:
+    """SHA-256 de arquivos, recalculado apenas quando o tamanho ou a data de modificação mudam."""
+
+    def __init__(self):
+        self._hashes = {}
+        self._trava = threading.Lock()
+
+    def obter(self, caminho):
+        estado = os.stat(caminho)
+        assinatura = (estado.st_mtime_ns, estado.st_size)
+        with self._trava:
+            salvo = self._hashes.get(caminho)
+            if salvo is not None and salvo[0] == assinatura:
+                return salvo[1]
+        sha256 = hashlib.sha256()
+        with open(caminho, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+                sha256.update(bloco)
+        with self._trava:
+            self._hashes[caminho] = (assinatura, sha256.hexdigest())
+        return sha256.hexdigest()
+
+
+def canonizar_linha(linha):
+    """Representação canônica (texto JSON) de uma linha de entrada já traduzida.
+
+    Aceita um dict ou uma linha de DataFrame (Series). Números viram float, de forma que
+    25, 25.0 e np.int64(25) geram a mesma chave; as colunas são ordenadas pelo nome.
+    """
+    canonica = []
+    for coluna, valor in sorted(dict(linha).items()):
+        if isinstance(valor, bool):
+            valor = str(valor)
+        elif isinstance(valor, (int, float)) or hasattr(valor, 'dtype'):
+            try:
+                valor = float(valor)
+            except (TypeError, ValueError):
+                valor = str(valor)
+            if isinstance(valor, float) and math.isnan(valor):
+                valor = None
+        else:
+            valor = str(valor)
+        canonica.append([coluna, valor])
+    return json.dumps(canonica, ensure_ascii=False, separators=(',', ':'))
+
+
+class CachePredicoes:
+    """Cache LRU com TTL, seguro para uso entre threads (ex: sessões do Streamlit).
+
+    Os valores guardados precisam ser serializáveis em JSON quando o cache usa o disco.
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO, ttl_s=TTL_PADRAO_S, caminho_disco=None):
+        self.capacidade = capacidade
+        self.ttl_s = ttl_s
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+        self.expirados = 0
+        self.invalidacoes = 0
+        self._itens = OrderedDict()  # chave -> (modelo, hash do modelo, criado em, valor)
+        self._hashes_atuais = {}
+        self._hash_arquivos = HashArquivos()
+        self._trava = threading.RLock()
+        self._disco = None
+        if caminho_disco:
+            diretorio = os.path.dirname(os.path.abspath(caminho_disco))
+            os.makedirs(diretorio, exist_ok=True)
+            self._disco = sqlite3.connect(caminho_disco, check_same_thread=False)
+            self._disco.execute(
+                "CREATE TABLE IF NOT EXISTS predicoes ("
+                "chave TEXT PRIMARY KEY, modelo TEXT, hash_modelo TEXT, criado REAL, valor TEXT)"
+            )
+            self._disco.commit()
+
+    @staticmethod
+    def _chave(nome_modelo, hash_modelo, linha_canonica):
+        return hashlib.sha256(f"{nome_modelo}\0{hash_modelo}\0{linha_canonica}".encode()).hexdigest()
+
+    def hash_modelo(self, nome_modelo, caminho_modelo):
+        """Hash atual do arquivo do modelo; se mudou (modelo retreinado), invalida as entradas antigas."""
+        hash_atual = self._hash_arquivos.obter(caminho_modelo)
+        with self._trava:
+            anterior = self._hashes_atuais.get(nome_modelo)
+            self._hashes_atuais[nome_modelo] = hash_atual
+            # Na primeira consulta também limpa o disco de versões antigas do modelo
+            if anterior != hash_atual:
+                self._invalidar_modelo(nome_modelo, hash_atual)
+        return hash_atual
+
+    def _invalidar_modelo(self, nome_modelo, hash_atual):
+        obsoletas = [c for c, item in self._itens.items() if item[0] == nome_modelo and item[1] != hash_atual]
+        for chave in obsoletas:
+            del self._itens[chave]
+        removidas = len(obsoletas)
+        if self._disco is not None:
+            cursor = self._disco.execute(
+                "DELETE FROM predicoes WHERE modelo = ? AND hash_modelo != ?", (nome_modelo, hash_atual)
+            )
+            self._disco.commit()
+            removidas = max(removidas, cursor.rowcount)
+        self.invalidacoes += removidas
+
+    def obter_ou_calcular(self, nome_modelo, caminho_modelo, linha, calcular):
+        """Retorna a predição em cache para a linha ou chama `calcular()` e guarda o resultado."""
+        hash_modelo = self.hash_modelo(nome_modelo, caminho_modelo)
+        chave = self._chave(nome_modelo, hash_modelo, canonizar_linha(linha))
+        encontrado, valor = self._buscar(chave)
+        if encontrado:
+            return valor
+        valor = calcular()
+        self._guardar(chave, nome_modelo, hash_modelo, valor)
+        return valor
+
+    def _buscar(self, chave):
+        agora = time.time()
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None:
+                if agora - item[2] <= self.ttl_s:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return True, item[3]
+                del self._itens[chave]
+                self.expirados += 1
+
+            if self._disco is not None:
+                linha = self._disco.execute(
+                    "SELECT modelo, hash_modelo, criado, valor FROM predicoes WHERE chave = ?", (chave,)
+                ).fetchone()
+                if linha is not None:
+                    if agora - linha[2] <= self.ttl_s:
+                        valor = json.loads(linha[3])
+                        self._inserir_memoria(chave, (linha[0], linha[1], linha[2], valor))
+                        self.acertos += 1
+                        return True, valor
+                    self._disco.execute("DELETE FROM predicoes WHERE chave = ?", (chave,))
+                    self._disco.commit()
+                    self.expirados += 1
+
+            self.falhas += 1
+            return False, None
+
+    def _inserir_memoria(self, chave, item):
+        self._itens[chave] = item
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.capacidade:
+            self._itens.popitem(last=False)
+            self.remocoes += 1
+
+    def _guardar(self, chave, nome_modelo, hash_modelo, valor):
+        criado = time.time()
+        with self._trava:
+            self._inserir_memoria(chave, (nome_modelo, hash_modelo, criado, valor))
+            if self._disco is not None:
+                self._disco.execute(
+                    "INSERT OR REPLACE INTO predicoes VALUES (?, ?, ?, ?, ?)",
+                    (chave, nome_modelo, hash_modelo, criado, json.dumps(valor, ensure_ascii=False)),
+                )
+                # O arquivo segue a mesma capacidade do cache em memória: remove os mais antigos
+                excedente = self._disco.execute("SELECT COUNT(*) FROM predicoes").fetchone()[0] - self.capacidade
+                if excedente > 0:
+                    self._disco.execute(
+                        "DELETE FROM predicoes WHERE chave IN "
+                        "(SELECT chave FROM predicoes ORDER BY criado LIMIT ?)", (excedente,)
+                    )
+                self._disco.commit()
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            if self._disco is not None:
+                self._disco.execute("DELETE FROM predicoes")
+                self._disco.commit()
+
+    def contadores(self):
+        """Contadores de uso do cache."""
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'remocoes': self.remocoes,
+                'expirados': self.expirados,
+                'invalidacoes': self.invalidacoes,
+            }
@@ -0,0 +1,102 @@
+# --- Teste de carga local do servidor de predição ---
+# Sobe o servidor em segundo plano (ou usa um já em execução com --url) e dispara requisições
+# concorrentes para cada modelo, reportando latência p50/p99 e requisições por segundo.
+# Uso: python app_streamlit/carga.py --requisicoes 500 --concorrencia 8
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dataset_colunar import CAMINHO_DADOS, carregar_colunar
+from microlote import MAX_ESPERA_MS_PADRAO, MAX_LOTE_PADRAO, MicroLoteEmSegundoPlano
+from modelos import CAMINHOS_MODELOS
+from servidor import carregar_modelos, criar_servidor
+
+
+def amostrar_registros(quantidade, semente=42):
+    """Sorteia registros reais de 'Obesity.csv' para usar como corpo das requisições."""
+    df = carregar_colunar(CAMINHO_DADOS).drop(columns=['Obesity', 'IMC'])
+    return df.sample(n=quantidade, replace=True, random_state=semente).to_dict('records')
+
+
+def enviar(url, corpo):
+    """Envia uma requisição POST com corpo JSON e retorna a latência em segundos."""
+    dados = json.dumps(corpo).encode('utf-8')
+    requisicao = urllib.request.Request(url, data=dados, headers={'Content-Type': 'application/json'})
+    inicio = time.perf_counter()
+    with urllib.request.urlopen(requisicao) as resposta:
+        resposta.read()
+    return time.perf_counter() - inicio
+
+
+def medir_modelo(url_base, nome_modelo, registros, concorrencia, tamanho_lote=1):
+    """Dispara as requisições de um modelo em paralelo e calcula as estatísticas de latência."""
+    if tamanho_lote == 1:
+        url = f"{url_base}/prever"
+        corpos = [{'modelo': nome_modelo, 'dados': r} for r in registros]
+    else:
+        url = f"{url_base}/prever_lote"
+        corpos = [{'modelo': nome_modelo, 'dados': registros[i:i + tamanho_lote]}
+                  for i in range(0, len(registros), tamanho_lote)]
+
+    # Aquecimento: a primeira chamada de cada modelo não entra nas estatísticas
+    enviar(url, corpos[0])
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        latencias = np.array(list(executor.map(lambda corpo: enviar(url, corpo), corpos)))
+    duracao = time.perf_counter() - inicio
+    return {
+        'modelo': nome_modelo,
+        'requisicoes': len(corpos),
+        'p50_ms': float(np.percentile(latencias, 50) * 1000),
+        'p99_ms': float(np.percentile(latencias, 99) * 1000),
+        'requisicoes_por_segundo': len(corpos) / duracao,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de predição.")
+    parser.add_argument('--url', help="URL de um servidor já em execução (ex: http://127.0.0.1:8000)")
+    parser.add_argument('--requisicoes', type=int, default=500, help="Requisições por modelo")
+    parser.add_argument('--concorrencia', type=int, default=8, help="Requisições simultâneas")
+    parser.add_argument('--tamanho-lote', type=int, default=1,
+                        help="Registros por requisição (1 usa /prever, mais que 1 usa /prever_lote)")
+    parser.add_argument('--modelos', nargs='+', default=list(CAMINHOS_MODELOS), help="Modelos a testar")
+    parser.add_argument('--microlote', action='store_true', help="Sobe o servidor local com micro-lotes")
+    parser.add_argument('--max-lote', type=int, default=MAX_LOTE_PADRAO)
+    parser.add_argument('--max-espera-ms', type=float, default=MAX_ESPERA_MS_PADRAO)
+    args = parser.parse_args()
+
+    servidor = None
+    micro_lote = None
+    url_base = args.url
+    if url_base is None:
+        modelos = carregar_modelos()
+        if args.microlote:
+            micro_lote = MicroLoteEmSegundoPlano(modelos, args.max_lote, args.max_espera_ms)
+        servidor = criar_servidor('127.0.0.1', 0, modelos, silencioso=True, micro_lote=micro_lote)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url_base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    registros = amostrar_registros(args.requisicoes * args.tamanho_lote)
+    try:
+        print(f"{'Modelo':<15}{'Requisições':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}{'req/s':>10}")
+        for nome_modelo in args.modelos:
+            r = medir_modelo(url_base, nome_modelo, registros, args.concorrencia, args.tamanho_lote)
+            print(f"{r['modelo']:<15}{r['requisicoes']:>12}{r['p50_ms']:>12.2f}{r['p99_ms']:>12.2f}"
+                  f"{r['requisicoes_por_segundo']:>10.1f}")
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+            servidor.server_close()
+        if micro_lote is not None:
+            micro_lote.encerrar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+# --- Artefatos compactos dos modelos ---
+# Converte os pipelines salvos em preditores menores e mais rápidos de carregar:
+#   - Random Forest: as árvores viram arrays planos e contíguos de nós, nos menores tipos
+#     inteiros que comportam os índices, com limiares em float32; opcionalmente a floresta é
+#     podada para o menor subconjunto de árvores que mantém a acurácia dentro da tolerância.
+#   - KNN: o conjunto de referência é guardado em float32 e os rótulos como códigos inteiros.
+#   - SVM: mantém o classificador original, apenas com o pré-processamento do caminho rápido.
+# O pré-processamento é o mesmo do PreditorRapido (rapido.py).
+#
+# Uso:
+#   python app_streamlit/compactar.py                          # gera models/compactos/*.pkl e o relatório
+#   python app_streamlit/compactar.py --podar --tolerancia 0.005
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+
+from modelos import CAMINHOS_MODELOS, DIRETORIO_COMPACTOS, carregar_modelo, salvar_modelo
+from rapido import exportar_preditor
+from vizinhos import IndiceExato, votar_vizinhos
+
+# Linhas processadas por vez na predição, para limitar a memória dos arrays intermediários
+TAMANHO_BLOCO = 4096
+
+
+def menor_inteiro(maximo, minimo=-1):
+    """Menor tipo inteiro com sinal capaz de guardar valores entre `minimo` e `maximo`."""
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if np.iinfo(dtype).min <= minimo and maximo <= np.iinfo(dtype).max:
+            return dtype
+    raise ValueError(f"Valor grande demais para um inteiro de 64 bits: {maximo}")
+
+
+def limiar_float32(limiares):
+    """Converte limiares float64 para float32 arredondando para baixo.
+
+    As árvores comparam `x <= limiar` com x em float32. Arredondar o limiar para o maior
+    float32 que não o ultrapassa preserva exatamente todas as decisões de divisão.
+    """
+    convertidos = limiares.astype(np.float32)
+    acima = convertidos.astype(np.float64) > limiares
+    convertidos[acima] = np.nextafter(convertidos[acima], np.float32(-np.inf))
+    return convertidos
+
+
+class FlorestaCompacta:
+    """Random Forest guardada como arrays planos de nós, com predição vetorizada em NumPy.
+
+    Para cada nó: filho esquerdo e direito (índices relativos à raiz da árvore), feature e
+    limiar. Nas folhas, `esquerda` vale -1 e `direita` guarda a linha de `valores` com as
+    probabilidades das classes naquela folha.
+    """
+
+    def __init__(self, arvores, classes):
+        self.classes_ = np.asarray(classes)
+        n_nos = [a.tree_.node_count for a in arvores]
+        n_folhas = sum(int(np.sum(a.tree_.children_left == -1)) for a in arvores)
+        tipo_indice = menor_inteiro(max(max(n_nos), n_folhas))
+        n_features = arvores[0].tree_.n_features
+
+        self.raizes = np.concatenate([[0], np.cumsum(n_nos)[:-1]]).astype(menor_inteiro(sum(n_nos)))
+        self.esquerda = np.empty(sum(n_nos), dtype=tipo_indice)
+        self.direita = np.empty(sum(n_nos), dtype=tipo_indice)
+        self.feature = np.zeros(sum(n_nos), dtype=menor_inteiro(n_features))
+        self.limiar = np.zeros(sum(n_nos), dtype=np.float32)
+        self.valores = np.empty((n_folhas, len(self.classes_)), dtype=np.float32)
+        self.profundidade = max(a.tree_.max_depth for a in arvores)
+
+        proxima_folha = 0
+        for raiz, arvore in zip(self.raizes, arvores):
+            tree = arvore.tree_
+            fim = raiz + tree.node_count
+            folhas = tree.children_left == -1
+            esquerda = tree.children_left.copy()
+            direita = tree.children_right.copy()
+            linhas_folhas = np.arange(proxima_folha, proxima_folha + folhas.sum())
+            direita[folhas] = linhas_folhas
+            self.esquerda[raiz:fim] = esquerda
+            self.direita[raiz:fim] = direita
+            self.feature[raiz:fim] = np.where(folhas, 0, tree.feature)
+            self.limiar[raiz:fim] = np.where(folhas, 0.0, limiar_float32(tree.threshold))
+            # Em classificadores, tree_.value já guarda a fração de cada classe na folha
+            valores = tree.value[folhas, 0, :]
+            self.valores[linhas_folhas] = valores / valores.sum(axis=1, keepdims=True)
+            proxima_folha += folhas.sum()
+
+    @property
+    def n_arvores(self):
+        return len(self.raizes)
+
+    def folhas(self, X):
+        """Linha de `valores` da folha alcançada por cada amostra em cada árvore: (n_amostras, n_arvores)."""
+        X = np.asarray(X, dtype=np.float32)
+        linhas = np.arange(len(X))[:, None]
+        raizes = self.raizes.astype(np.int64)[None, :]
+        no = np.broadcast_to(raizes, (len(X), self.n_arvores)).copy()
+        for _ in range(self.profundidade):
+            esquerda = self.esquerda[no]
+            interno = esquerda >= 0
+            if not interno.any():
+                break
+            vai_esquerda = X[linhas, self.feature[no]] <= self.limiar[no]
+            proximo = raizes + np.where(vai_esquerda, esquerda, self.direita[no])
+            no = np.where(interno, proximo, no)
+        return self.direita[no]
+
+    def probabilidades_por_arvore(self, X):
+        """Probabilidades de cada árvore: (n_amostras, n_arvores, n_classes)."""
+        return self.valores[self.folhas(X)]
+
+    def predict_proba(self, X):
+        resultado = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for inicio in range(0, len(X), TAMANHO_BLOCO):
+            bloco = self.probabilidades_por_arvore(X[inicio:inicio + TAMANHO_BLOCO])
+            resultado[inicio:inicio + TAMANHO_BLOCO] = bloco.sum(axis=1, dtype=np.float64) / self.n_arvores
+        return resultado
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def podar(self, indices_arvores):
+        """Mantém apenas as árvores indicadas (na ordem dada)."""
+        raizes = self.raizes.astype(np.int64)
+        fins = np.append(raizes[1:], len(self.esquerda))
+        blocos_nos = [np.arange(raizes[i], fins[i]) for i in indices_arvores]
+        nos = np.concatenate(blocos_nos)
+        folhas_mantidas = self.esquerda[nos] == -1
+        linhas_antigas = self.direita[nos][folhas_mantidas].astype(np.int64)
+
+        self.raizes = np.concatenate([[0], np.cumsum([len(b) for b in blocos_nos])[:-1]]).astype(
+            menor_inteiro(len(nos)))
+        self.esquerda = self.esquerda[nos]
+        self.direita = self.direita[nos]
+        self.direita[folhas_mantidas] = np.arange(len(linhas_antigas))
+        self.feature = self.feature[nos]
+        self.limiar = self.limiar[nos]
+        self.valores = self.valores[linhas_antigas]
+        return self
+
+
+class KNNCompacto:
+    """KNN (distância euclidiana) com o conjunto de referência em float32 e rótulos como códigos."""
+
+    def __init__(self, knn):
+        if knn.effective_metric_ != 'euclidean':
+            raise ValueError(f"KNNCompacto só suporta distância euclidiana, não '{knn.effective_metric_}'")
+        if knn.weights not in ('uniform', 'distance'):
+            raise ValueError("KNNCompacto só suporta weights='uniform' ou 'distance'")
+        self.classes_ = knn.classes_
+        self.n_neighbors = knn.n_neighbors
+        self.weights = knn.weights
+        # Busca exata em blocos com multiplicação de matrizes (ver vizinhos.py)
+        self.indice = IndiceExato(knn._fit_X)
+        self.rotulos = np.asarray(knn._y, dtype=menor_inteiro(len(self.classes_)))
+
+    def predict_proba(self, X):
+        distancias, indices = self.indice.consultar(X, self.n_neighbors)
+        return votar_vizinhos(distancias, self.rotulos[indices], len(self.classes_), self.weights)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def mascara_fora_da_amostra(floresta, n_amostras):
+    """(n_amostras, n_arvores): True onde a linha de treino ficou fora do bootstrap da árvore.
+
+    Refaz os sorteios do bootstrap a partir da semente de cada árvore, como o oob_score do
+    scikit-learn.
+    """
+    from sklearn.ensemble._forest import _generate_unsampled_indices, _get_n_samples_bootstrap
+
+    n_bootstrap = _get_n_samples_bootstrap(n_amostras, floresta.max_samples)
+    mascara = np.zeros((n_amostras, len(floresta.estimators_)), dtype=bool)
+    for j, arvore in enumerate(floresta.estimators_):
+        mascara[_generate_unsampled_indices(arvore.random_state, n_amostras, n_bootstrap), j] = True
+    return mascara
+
+
+def podar_floresta(floresta, X_validacao, y_validacao, tolerancia, votos=None):
+    """Escolhe o menor número k de árvores com acurácia >= acurácia total - tolerância.
+
+    As árvores de uma Random Forest são independentes entre si, então as k primeiras formam
+    uma amostra da floresta inteira. Escolher só k (e não quais árvores) evita ajustar a
+    seleção demais ao conjunto de validação. Com `votos` (ver `mascara_fora_da_amostra`), cada
+    linha só recebe o voto das árvores que não a viram no treino, e a acurácia das k primeiras
+    é medida nas linhas com pelo menos um voto. Retorna os índices das árvores mantidas.
+    """
+    por_arvore = floresta.probabilidades_por_arvore(X_validacao).astype(np.float64)
+    codigos = np.searchsorted(floresta.classes_, y_validacao)
+    if votos is None:
+        votos = np.ones(por_arvore.shape[:2], dtype=bool)
+    acumulado = np.cumsum(por_arvore * votos[:, :, None], axis=1)
+    com_voto = np.cumsum(votos, axis=1) > 0
+    acertos = (np.argmax(acumulado, axis=2) == codigos[:, None]) & com_voto
+    acuracias = acertos.sum(axis=0) / np.maximum(com_voto.sum(axis=0), 1)
+    k = int(np.argmax(acuracias >= acuracias[-1] - tolerancia)) + 1
+    return list(range(k))
+
+
+def compactar_modelo(model, X_validacao=None, y_validacao=None, tolerancia=None, fora_da_amostra=False):
+    """Gera o preditor compacto a partir de um pipeline salvo.
+
+    Com `tolerancia` (e dados de validação já transformados pelo pipeline), a Random Forest é podada.
+    Com `fora_da_amostra=True`, os dados de validação são as linhas de treino da floresta, na ordem
+    do treino, e cada uma só é avaliada pelas árvores que não a usaram (ver `podar_floresta`).
+    """
+    preditor = exportar_preditor(model)
+    classificador = model.named_steps['classifier']
+    if hasattr(classificador, 'estimators_'):
+        floresta = FlorestaCompacta(classificador.estimators_, classificador.classes_)
+        if tolerancia is not None:
+            votos = mascara_fora_da_amostra(classificador, len(X_validacao)) if fora_da_amostra else None
+            floresta.podar(podar_floresta(floresta, X_validacao, y_validacao, tolerancia, votos))
+        preditor.classificador = floresta
+    elif hasattr(classificador, '_fit_X'):
+        preditor.classificador = KNNCompacto(classificador)
+    return preditor
+
+
+def medir_carga(caminho, repeticoes=3):
+    """Menor tempo (ms) de carga de um artefato entre algumas repetições."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        joblib.load(caminho)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos) * 1000
+
+
+def main():
+    # Importado aqui para que carregar um artefato compacto não importe o código de treino
+    from traducao import preparar_dataframe
+    from treinar import dividir_dataset
+
+    parser = argparse.ArgumentParser(description="Gera os artefatos compactos dos modelos e um relatório.")
+    parser.add_argument('--modelos', nargs='+', default=list(CAMINHOS_MODELOS))
+    parser.add_argument('--podar', action='store_true', help="Poda a Random Forest")
+    parser.add_argument('--tolerancia', type=float, default=0.005,
+                        help="Perda máxima de acurácia aceita na poda (ex: 0.005 = 0,5 ponto percentual)")
+    parser.add_argument('--saida', default=DIRETORIO_COMPACTOS)
+    args = parser.parse_args()
+
+    # A poda escolhe o número de árvores com as linhas de treino fora do bootstrap de cada árvore;
+    # a comparação de acurácia usa o conjunto de teste, que não participa da escolha
+    X_train, X_test, y_train, y_test = dividir_dataset()
+    os.makedirs(args.saida, exist_ok=True)
+
+    print(f"{'Modelo':<15}{'Tamanho (KB)':>22}{'Carga (ms)':>20}{'Acurácia (%)':>20}{'Concordância':>14}")
+    for nome in args.modelos:
+        model = carregar_modelo(nome)
+        entrada = preparar_dataframe(X_test, model)
+        preditor = exportar_preditor(model)
+        compacto = compactar_modelo(model, preditor.transformar(preparar_dataframe(X_train, model)),
+                                    y_train.to_numpy(), args.tolerancia if args.podar else None,
+                                    fora_da_amostra=True)
+        destino = os.path.join(args.saida, os.path.basename(CAMINHOS_MODELOS[nome]))
+        salvar_modelo(compacto, destino)
+
+        original = model.predict(entrada)
+        reduzido = compacto.predict(entrada)
+        tamanhos = (os.path.getsize(CAMINHOS_MODELOS[nome]) / 1024, os.path.getsize(destino) / 1024)
+        cargas = (medir_carga(CAMINHOS_MODELOS[nome]), medir_carga(destino))
+        acuracias = (np.mean(original == y_test) * 100, np.mean(reduzido == y_test) * 100)
+        concordancia = np.mean(original == reduzido) * 100
+        print(f"{nome:<15}{tamanhos[0]:>10.0f} -> {tamanhos[1]:>7.0f}{cargas[0]:>10.1f} -> {cargas[1]:>6.1f}"
+              f"{acuracias[0]:>10.2f} -> {acuracias[1]:>6.2f}{concordancia:>13.2f}%")
+        if isinstance(compacto.classificador, FlorestaCompacta):
+            print(f"{'':<15}{compacto.classificador.n_arvores} árvores mantidas")
+
+
+if __name__ == '__main__':
+    # Importa pelo nome do módulo para que o pickle referencie 'compactar.*', e não '__main__'
+    from compactar import main
+    main()
@@ -0,0 +1,159 @@
+# --- Cache colunar binário do dataset ---
+# Converte o CSV uma única vez em um diretório com um arquivo .npy por coluna: numéricas no tipo
+# inferido pelo read_csv, categóricas como códigos inteiros (dicionário de categorias no
+# metadados.json) e o IMC já calculado. A chave do diretório é o hash do CSV, então alterar o
+# arquivo gera um novo cache. A leitura mapeia os arrays em memória (mmap): o DataFrame é montado
+# sem copiar os dados e as páginas só são lidas do disco quando usadas.
+#
+# Uso:
+#   python app_streamlit/dataset_colunar.py construir
+#   python app_streamlit/dataset_colunar.py relatorio --replicar 100   # read_csv x cache colunar
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache_predicoes import HashArquivos
+from modelos import DIRETORIO_MODELOS, rss_atual_mb
+
+CAMINHO_DADOS = os.path.join(DIRETORIO_MODELOS, 'data', 'Obesity.csv')
+DIRETORIO_CACHE = os.path.join(DIRETORIO_MODELOS, 'cache')
+# Mudanças no formato gravado geram uma nova chave de cache
+VERSAO_FORMATO = 1
+ARQUIVO_METADADOS = 'metadados.json'
+
+_hash_arquivos = HashArquivos()
+
+
+def diretorio_colunar(caminho_csv=CAMINHO_DADOS, diretorio_cache=DIRETORIO_CACHE):
+    """Diretório do cache colunar de um CSV (chave: hash do conteúdo e versão do formato)."""
+    return os.path.join(diretorio_cache, f"colunar_v{VERSAO_FORMATO}_{_hash_arquivos.obter(caminho_csv)[:16]}")
+
+
+def construir_cache_colunar(caminho_csv=CAMINHO_DADOS, diretorio_cache=DIRETORIO_CACHE):
+    """Converte o CSV para o formato colunar, se ainda não estiver em cache. Retorna o diretório."""
+    destino = diretorio_colunar(caminho_csv, diretorio_cache)
+    if os.path.exists(os.path.join(destino, ARQUIVO_METADADOS)):
+        return destino
+
+    df = pd.read_csv(caminho_csv)
+    # Feature Engineering: Criação do IMC
+    df['IMC'] = df['Weight'] / (df['Height']**2)
+
+    os.makedirs(diretorio_cache, exist_ok=True)
+    # Grava em um diretório temporário e renomeia, para que uma conversão interrompida não deixe cache corrompido
+    temporario = tempfile.mkdtemp(dir=diretorio_cache, prefix='.colunar_')
+    colunas = []
+    for coluna in df.columns:
+        if df[coluna].dtype == object:
+            categorico = pd.Categorical(df[coluna])
+            valores = np.asarray(categorico.codes)
+            colunas.append({'nome': coluna, 'categorias': categorico.categories.tolist()})
+        else:
+            valores = df[coluna].to_numpy()
+            colunas.append({'nome': coluna})
+        np.save(os.path.join(temporario, f"{len(colunas) - 1:03d}.npy"), valores)
+    with open(os.path.join(temporario, ARQUIVO_METADADOS), 'w', encoding='utf-8') as arquivo:
+        json.dump({'origem': os.path.basename(caminho_csv), 'linhas': len(df), 'colunas': colunas},
+                  arquivo, indent=1, ensure_ascii=False)
+    try:
+        os.rename(temporario, destino)
+    except OSError:
+        # Outro processo terminou a mesma conversão antes
+        shutil.rmtree(temporario, ignore_errors=True)
+    return destino
+
+
+def carregar_colunar(caminho_csv=CAMINHO_DADOS, diretorio_cache=DIRETORIO_CACHE, colunas=None):
+    """DataFrame do dataset (com IMC) lido do cache colunar, construído na primeira chamada.
+
+    Os arrays são mapeados em memória e somente leitura: o DataFrame não copia os dados.
+    Colunas categóricas usam o tipo 'category' do pandas. `colunas` limita as colunas lidas.
+    """
+    diretorio = construir_cache_colunar(caminho_csv, diretorio_cache)
+    with open(os.path.join(diretorio, ARQUIVO_METADADOS), encoding='utf-8') as arquivo:
+        metadados = json.load(arquivo)
+    dados = {}
+    for i, coluna in enumerate(metadados['colunas']):
+        if colunas is not None and coluna['nome'] not in colunas:
+            continue
+        valores = np.load(os.path.join(diretorio, f"{i:03d}.npy"), mmap_mode='r')
+        if 'categorias' in coluna:
+            valores = pd.Categorical.from_codes(valores, coluna['categorias'])
+        dados[coluna['nome']] = valores
+    return pd.DataFrame(dados, copy=False)
+
+
+def _medir_leitura(modo, caminho_csv, diretorio_cache):
+    """Executada em um processo novo: tempo de leitura, memória (RSS) e tempo até somar todos os dados."""
+    rss_inicial = rss_atual_mb()
+    inicio = time.perf_counter()
+    if modo == 'read_csv':
+        df = pd.read_csv(caminho_csv)
+        df['IMC'] = df['Weight'] / (df['Height']**2)
+    else:
+        df = carregar_colunar(caminho_csv, diretorio_cache)
+    leitura = time.perf_counter() - inicio
+    rss_leitura = rss_atual_mb() - rss_inicial
+    # Percorre todas as colunas para medir também o custo de acessar os dados
+    for coluna in df.columns:
+        serie = df[coluna]
+        serie.nunique() if serie.dtype == object or isinstance(serie.dtype, pd.CategoricalDtype) else serie.sum()
+    total = time.perf_counter() - inicio
+    return leitura, total, rss_leitura, rss_atual_mb() - rss_inicial
+
+
+def relatorio(caminho_csv, diretorio_cache, replicar=100):
+    """Compara read_csv e o cache colunar no CSV original e em uma versão replicada `replicar` vezes."""
+    diretorio_temporario = tempfile.mkdtemp(prefix='dataset_colunar_')
+    try:
+        replicado = os.path.join(diretorio_temporario, f"replicado_{replicar}x.csv")
+        original = pd.read_csv(caminho_csv)
+        pd.concat([original] * replicar, ignore_index=True).to_csv(replicado, index=False)
+        cache_temporario = os.path.join(diretorio_temporario, 'cache')
+
+        print(f"{'Arquivo':<22}{'Linhas':>10}{'Modo':>10}{'Leitura (ms)':>14}{'Leitura+uso (ms)':>18}"
+              f"{'RSS leitura (MB)':>18}{'RSS uso (MB)':>14}")
+        for nome, caminho, cache in (('original', caminho_csv, diretorio_cache),
+                                     (f'replicado {replicar}x', replicado, cache_temporario)):
+            inicio = time.perf_counter()
+            construir_cache_colunar(caminho, cache)
+            construcao = time.perf_counter() - inicio
+            linhas = len(original) * (replicar if caminho == replicado else 1)
+            for modo in ('read_csv', 'colunar'):
+                # Cada medição roda em um processo novo para que a memória de uma não afete a outra
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    leitura, total, rss_leitura, rss_total = executor.submit(
+                        _medir_leitura, modo, caminho, cache
+                    ).result()
+                print(f"{nome:<22}{linhas:>10}{modo:>10}{leitura * 1000:>14.1f}{total * 1000:>18.1f}"
+                      f"{rss_leitura:>18.1f}{rss_total:>14.1f}")
+            print(f"{'':<22}(cache construído ou reaproveitado em {construcao * 1000:.0f} ms)")
+    finally:
+        shutil.rmtree(diretorio_temporario, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache colunar binário do dataset.")
+    parser.add_argument('acao', choices=['construir', 'relatorio'])
+    parser.add_argument('--dados', default=CAMINHO_DADOS, help="CSV no formato de 'Obesity.csv'")
+    parser.add_argument('--cache', default=DIRETORIO_CACHE)
+    parser.add_argument('--replicar', type=int, default=100, help="Vezes que o CSV é replicado no relatório")
+    args = parser.parse_args()
+
+    if args.acao == 'construir':
+        inicio = time.perf_counter()
+        destino = construir_cache_colunar(args.dados, args.cache)
+        print(f"Cache colunar em '{destino}' ({time.perf_counter() - inicio:.2f}s)")
+    else:
+        relatorio(args.dados, args.cache, args.replicar)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# --- Predição com todos os modelos de uma vez (ensemble) ---
+# Os três pipelines salvos usam o mesmo pré-processamento (StandardScaler + OneHotEncoder ajustados
+# na mesma divisão de treino). O Ensemble transforma a entrada uma única vez, executa os
+# classificadores em paralelo (threads) e combina as probabilidades por voto suave (média ponderada).
+#
+# Uso: python app_streamlit/ensemble.py --registros 200   (benchmark: modelos separados x ensemble)
+import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modelos import CAMINHOS_MODELOS, carregar_modelo
+from rapido import PreditorRapido, carregar_dados_verificacao, exportar_preditor, medir_latencia
+from traducao import preparar_dataframe
+
+
+def _assinatura_preprocessamento(preditor):
+    """Parâmetros do pré-processamento; preditores com a mesma assinatura compartilham a transformação."""
+    return (
+        tuple(preditor.colunas_numericas), preditor.medias.tobytes(), preditor.escalas.tobytes(),
+        tuple(preditor.colunas_categoricas), tuple(tuple(c) for c in preditor.categorias),
+    )
+
+
+class Ensemble:
+    """Prevê com vários modelos ao mesmo tempo e combina as probabilidades por voto suave.
+
+    Aceita pipelines salvos ou preditores do caminho rápido (inclusive os compactos). Modelos com
+    o mesmo pré-processamento recebem a mesma matriz de features, calculada uma única vez.
+    Expõe `predict`/`predict_proba`/`classes_`, podendo ser usado no lugar de um modelo comum.
+    As threads são liberadas por `fechar()` (ou ao sair de um bloco `with`).
+    """
+
+    def __init__(self, modelos, pesos=None, n_threads=None):
+        self.preditores = {
+            nome: model if isinstance(model, PreditorRapido) else exportar_preditor(model)
+            for nome, model in modelos.items()
+        }
+        pesos = pesos or {}
+        self.pesos = {nome: float(pesos.get(nome, 1.0)) for nome in self.preditores}
+        self.classes_ = np.unique(np.concatenate([p.classes_ for p in self.preditores.values()]))
+        self.feature_names_in_ = next(iter(self.preditores.values())).feature_names_in_
+
+        # Agrupa os modelos por pré-processamento: o primeiro preditor de cada grupo transforma a entrada
+        self.grupos = {}
+        for nome, preditor in self.preditores.items():
+            self.grupos.setdefault(_assinatura_preprocessamento(preditor), []).append(nome)
+        # Posição das classes de cada modelo dentro de `classes_`
+        self._posicoes = {
+            nome: np.searchsorted(self.classes_, p.classes_) for nome, p in self.preditores.items()
+        }
+        self.n_threads = n_threads or len(self.preditores)
+        self._executor = self._criar_executor()
+
+    def _criar_executor(self):
+        return ThreadPoolExecutor(max_workers=self.n_threads, thread_name_prefix='ensemble')
+
+    def fechar(self):
+        """Libera as threads. Predições posteriores continuam funcionando, sem paralelismo."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    def _probabilidades(self, transformar):
+        """Probabilidades de cada modelo, alinhadas em `classes_`, calculadas em paralelo."""
+        executor = self._executor
+        futuros = {}
+        for nomes in self.grupos.values():
+            X = transformar(self.preditores[nomes[0]])
+            for nome in nomes:
+                predict_proba = self.preditores[nome].classificador.predict_proba
+                if executor is not None:
+                    try:
+                        futuros[nome] = executor.submit(predict_proba, X)
+                        continue
+                    except RuntimeError:
+                        # fechar() foi chamado por outra sessão no meio da predição: segue sem threads
+                        executor = None
+                futuros[nome] = predict_proba(X)
+        probabilidades = {}
+        for nome, futuro in futuros.items():
+            parcial = futuro.result() if isinstance(futuro, Future) else futuro
+            alinhada = np.zeros((parcial.shape[0], len(self.classes_)))
+            alinhada[:, self._posicoes[nome]] = parcial
+            probabilidades[nome] = alinhada
+        return probabilidades
+
+    def _votar(self, probabilidades):
+        total = sum(self.pesos.values())
+        return sum(self.pesos[nome] * p for nome, p in probabilidades.items()) / total
+
+    def prever_registro(self, registro):
+        """Prevê um único questionário (dict com respostas em pt-br ou inglês).
+
+        Retorna a classe e as probabilidades do ensemble e de cada modelo. A classe de cada
+        modelo é a de maior probabilidade.
+        """
+        # O vetor de features é por thread, então é copiado antes de ir para os classificadores
+        probabilidades = self._probabilidades(lambda preditor: preditor.transformar_registro(registro).copy())
+        probabilidades['Ensemble'] = self._votar(probabilidades)
+        resultado = {
+            nome: {
+                'classe': self.classes_[int(np.argmax(p[0]))],
+                'probabilidades': dict(zip(self.classes_, p[0].tolist())),
+            }
+            for nome, p in probabilidades.items()
+        }
+        ensemble = resultado.pop('Ensemble')
+        return {**ensemble, 'modelos': resultado}
+
+    def predict_proba(self, df):
+        """Probabilidades do voto suave para um DataFrame já traduzido e com IMC."""
+        return self._votar(self._probabilidades(lambda preditor: preditor.transformar(df)))
+
+    def predict(self, df):
+        return self.classes_[np.argmax(self.predict_proba(df), axis=1)]
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado.pop('_executor')
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._executor = self._criar_executor()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência por registro: modelos separados x ensemble.")
+    parser.add_argument('--modelos', nargs='+', default=list(CAMINHOS_MODELOS))
+    parser.add_argument('--registros', type=int, default=200, help="Registros usados em cada medição")
+    args = parser.parse_args()
+
+    modelos = {nome: carregar_modelo(nome) for nome in args.modelos}
+    registros = carregar_dados_verificacao().sample(n=args.registros, random_state=42).to_dict('records')
+
+    # Referência: cada pipeline faz o próprio pré-processamento (como ao escolher um modelo por vez)
+    latencias = {}
+    for nome, model in modelos.items():
+        def prever_pipeline(registro, model=model):
+            return model.predict_proba(preparar_dataframe(pd.DataFrame([registro]), model))
+        latencias[nome] = medir_latencia(prever_pipeline, registros)
+
+    with Ensemble(modelos, n_threads=1) as sequencial, Ensemble(modelos) as concorrente:
+        ensemble_sequencial = medir_latencia(sequencial.prever_registro, registros)
+        ensemble_concorrente = medir_latencia(concorrente.prever_registro, registros)
+
+    print(f"{'Modo':<40}{'Latência (ms)':>15}")
+    for nome, latencia in latencias.items():
+        print(f"{'Pipeline ' + nome:<40}{latencia:>15.3f}")
+    print(f"{'Soma dos pipelines (um por vez)':<40}{sum(latencias.values()):>15.3f}")
+    print(f"{'Modelo mais lento':<40}{max(latencias.values()):>15.3f}")
+    print(f"{'Ensemble (1 thread)':<40}{ensemble_sequencial:>15.3f}")
+    print(f"{f'Ensemble ({len(modelos)} threads)':<40}{ensemble_concorrente:>15.3f}")
+    print(f"Grupos de pré-processamento compartilhado: {len(concorrente.grupos)}")
+
+
+if __name__ == '__main__':
+    main()
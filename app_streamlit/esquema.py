@@ -0,0 +1,263 @@
+# --- Esquema das entradas: vocabulários, validação e tradução vetorizadas ---
+# Fonte única das respostas aceitas em cada campo do questionário (em inglês, como no dataset, e
+# em pt-br, como na interface), das faixas válidas das colunas numéricas e dos nomes alternativos
+# de colunas. Os vocabulários são compilados uma vez em tabelas de códigos inteiros: validar e
+# traduzir uma coluna inteira é um get_indexer (ou, em colunas 'category', só nas categorias)
+# seguido de uma indexação NumPy. Os erros de todas as linhas são reunidos em um único relatório.
+#
+# Usado pela interface, pela pontuação em lote, pelo servidor e pelos scripts de treino.
+# Uso: python app_streamlit/esquema.py pacientes.csv   (valida um CSV e lista as linhas inválidas)
+import argparse
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Campo -> {categoria em inglês (como no dataset): grafias aceitas além da própria categoria}
+VOCABULARIOS = {
+    'Gender': {'Female': ['Feminino'], 'Male': ['Masculino']},
+    'family_history': {'no': ['Não'], 'yes': ['Sim']},
+    'FAVC': {'no': ['Não'], 'yes': ['Sim']},
+    'CAEC': {'Always': ['Sempre'], 'Frequently': ['Frequentemente'], 'Sometimes': ['Às vezes'], 'no': ['Não']},
+    'SMOKE': {'no': ['Não'], 'yes': ['Sim']},
+    'SCC': {'no': ['Não'], 'yes': ['Sim']},
+    'CALC': {'Always': ['Sempre'], 'Frequently': ['Frequentemente'], 'Sometimes': ['Às vezes'], 'no': ['Não']},
+    'MTRANS': {
+        'Automobile': ['Automóvel'], 'Bike': ['Bicicleta'], 'Motorbike': ['Motocicleta'],
+        'Public_Transportation': ['Transporte Público'], 'Walking': ['Caminhada'],
+    },
+    'Obesity': {
+        'Insufficient_Weight': ['Peso Insuficiente'], 'Normal_Weight': ['Peso Normal'],
+        'Obesity_Type_I': ['Obesidade Tipo I'], 'Obesity_Type_II': ['Obesidade Tipo II'],
+        'Obesity_Type_III': ['Obesidade Tipo III'], 'Overweight_Level_I': ['Sobrepeso Nível I'],
+        'Overweight_Level_II': ['Sobrepeso Nível II'],
+    },
+}
+
+# Nomes alternativos aceitos para a mesma coluna
+SINONIMOS_COLUNAS = {
+    'family_history': 'family_history_with_overweight',
+    'family_history_with_overweight': 'family_history',
+}
+VOCABULARIOS['family_history_with_overweight'] = VOCABULARIOS['family_history']
+
+# Faixas válidas (inclusivas) das colunas numéricas
+FAIXAS_NUMERICAS = {
+    'Age': (1, 120), 'Height': (0.5, 2.75), 'Weight': (10, 400),
+    'FCVC': (1, 3), 'NCP': (1, 4), 'CH2O': (1, 3), 'FAF': (0, 3), 'TUE': (0, 2),
+}
+
+COLUNA_ALVO = 'Obesity'
+COLUNAS_RELATORIO = ['linha', 'coluna', 'valor', 'motivo']
+# Erros listados na mensagem da exceção (o relatório completo fica em `EntradaInvalida.relatorio`)
+ERROS_NA_MENSAGEM = 5
+
+# Tradução do pt-br para inglês por campo (formato dos dicionários antigos de traducao.py)
+TRADUCOES = {
+    campo: {grafia: categoria for categoria, grafias in vocabulario.items() for grafia in (categoria, *grafias)}
+    for campo, vocabulario in VOCABULARIOS.items() if campo != COLUNA_ALVO
+}
+
+
+class EntradaInvalida(ValueError):
+    """Entradas com valores inválidos. `relatorio` tem uma linha por erro (linha, coluna, valor, motivo)."""
+
+    def __init__(self, relatorio):
+        self.relatorio = relatorio
+        n_linhas = relatorio['linha'].nunique()
+        exemplos = '; '.join(
+            f"linha {erro.linha}, '{erro.coluna}' = {erro.valor!r}: {erro.motivo}"
+            for erro in relatorio.head(ERROS_NA_MENSAGEM).itertuples()
+        )
+        restantes = len(relatorio) - ERROS_NA_MENSAGEM
+        super().__init__(
+            f"{n_linhas} linha(s) com valores inválidos: {exemplos}"
+            + (f" (e mais {restantes} erro(s))" if restantes > 0 else "")
+        )
+
+    def erros(self):
+        """Erros como lista de dicionários (ex: para respostas JSON)."""
+        return [
+            {**erro, 'valor': None if pd.isna(erro['valor']) else str(erro['valor'])}
+            for erro in self.relatorio.to_dict('records')
+        ]
+
+
+class ColunasModelo:
+    """Colunas de entrada de um modelo e os nomes aceitos para cada uma, resolvidos uma única vez."""
+
+    def __init__(self, esperadas, sinonimos=SINONIMOS_COLUNAS):
+        # Sem `feature_names_in_`, as duas grafias de cada coluna com sinônimo são enviadas ao modelo
+        self.esperadas = None if esperadas is None else list(esperadas)
+        colunas = self.esperadas if self.esperadas is not None else list(sinonimos)
+        self.origens = {
+            coluna: [coluna] + ([sinonimos[coluna]] if coluna in sinonimos else []) for coluna in colunas
+        }
+
+    def aplicar(self, df):
+        """Cria (sem copiar os dados) as colunas esperadas que chegaram com um nome alternativo."""
+        for coluna, origens in self.origens.items():
+            if coluna not in df.columns:
+                origem = next((o for o in origens if o in df.columns), None)
+                if origem is not None:
+                    df[coluna] = df[origem]
+        return df
+
+    def faltantes(self, df):
+        """Colunas esperadas pelo modelo que não estão no DataFrame."""
+        if self.esperadas is None:
+            return set()
+        return set(self.esperadas) - set(df.columns)
+
+
+class Esquema:
+    """Vocabulários compilados em tabelas de códigos, com validação e tradução por coluna inteira."""
+
+    def __init__(self, vocabularios=VOCABULARIOS, faixas=FAIXAS_NUMERICAS, sinonimos=SINONIMOS_COLUNAS):
+        self.faixas = dict(faixas)
+        self.sinonimos = dict(sinonimos)
+        self.categorias = {}
+        self._grafias = {}
+        self._codigos = {}
+        for campo, vocabulario in vocabularios.items():
+            self.categorias[campo] = pd.Index(list(vocabulario), dtype=object)
+            grafias, codigos = [], []
+            for codigo, (categoria, alternativas) in enumerate(vocabulario.items()):
+                for grafia in (categoria, *alternativas):
+                    grafias.append(grafia)
+                    codigos.append(codigo)
+            self._grafias[campo] = pd.Index(grafias, dtype=object)
+            self._codigos[campo] = np.array(codigos + [-1], dtype=np.int16)
+        self._colunas_modelos = weakref.WeakKeyDictionary()
+
+    def codificar(self, campo, serie):
+        """Código da categoria (em `categorias[campo]`) de cada valor, ou -1 para valores inválidos/ausentes."""
+        grafias, codigos = self._grafias[campo], self._codigos[campo]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Só as categorias são procuradas no vocabulário; os códigos das linhas são remapeados
+            # (o código -1, valor ausente, aponta para o -1 acrescentado no fim)
+            por_categoria = np.append(codigos[grafias.get_indexer(serie.cat.categories)], np.int16(-1))
+            return por_categoria[np.asarray(serie.cat.codes)]
+        # O índice -1 (não encontrado) aponta para o -1 no fim da tabela de códigos
+        return codigos[grafias.get_indexer(pd.Index(serie, dtype=object))]
+
+    def validar(self, df, com_alvo=False):
+        """Relatório com todos os valores inválidos do DataFrame (vazio se tudo for válido).
+
+        Só as colunas presentes são verificadas; colunas ausentes são tratadas por `ColunasModelo`.
+        A coluna alvo só é verificada com `com_alvo=True` (treino): na predição ela é ignorada.
+        """
+        partes = []
+        for coluna in df.columns:
+            serie = df[coluna]
+            if coluna == COLUNA_ALVO and not com_alvo:
+                continue
+            if coluna in self._grafias:
+                invalidos = self.codificar(coluna, serie) < 0
+                if invalidos.any():
+                    valores = serie[invalidos]
+                    motivos = np.where(valores.isna(), 'ausente', 'valor desconhecido')
+                    partes.append((valores, motivos))
+            elif coluna in self.faixas:
+                minimo, maximo = self.faixas[coluna]
+                numeros = pd.to_numeric(serie, errors='coerce')
+                ausentes = serie.isna().to_numpy()
+                nao_numericos = numeros.isna().to_numpy() & ~ausentes
+                fora = ~numeros.between(minimo, maximo).to_numpy() & ~numeros.isna().to_numpy()
+                invalidos = ausentes | nao_numericos | fora
+                if invalidos.any():
+                    motivos = np.select(
+                        [ausentes[invalidos], nao_numericos[invalidos]],
+                        ['ausente', 'não numérico'], f'fora da faixa [{minimo}, {maximo}]',
+                    )
+                    partes.append((serie[invalidos], motivos))
+        if not partes:
+            return pd.DataFrame(columns=COLUNAS_RELATORIO)
+        relatorio = pd.concat([
+            pd.DataFrame({'linha': valores.index, 'coluna': valores.name,
+                          'valor': valores.astype(object).to_numpy(), 'motivo': motivos})
+            for valores, motivos in partes
+        ], ignore_index=True)
+        return relatorio.sort_values('linha', kind='stable').reset_index(drop=True)
+
+    def traduzir(self, df, validar=True, com_alvo=False):
+        """Troca as colunas do vocabulário pelas categorias em inglês (tipo 'category') e converte as
+        colunas numéricas lidas como texto. Altera `df`.
+
+        Com `validar=True`, levanta EntradaInvalida com todos os erros do DataFrame; sem validação,
+        valores inválidos viram ausentes (NaN). A coluna alvo só é validada e traduzida com
+        `com_alvo=True`.
+        """
+        if validar:
+            relatorio = self.validar(df, com_alvo)
+            if len(relatorio):
+                raise EntradaInvalida(relatorio)
+        campos = self._grafias.keys() & set(df.columns)
+        if not com_alvo:
+            campos.discard(COLUNA_ALVO)
+        for campo in campos:
+            df[campo] = pd.Categorical.from_codes(self.codificar(campo, df[campo]), self.categorias[campo])
+        for coluna in self.faixas.keys() & set(df.columns):
+            if not pd.api.types.is_numeric_dtype(df[coluna]):
+                df[coluna] = pd.to_numeric(df[coluna], errors='coerce')
+        return df
+
+    def colunas_modelo(self, model):
+        """Colunas de entrada do modelo, resolvidas na primeira chamada para cada modelo carregado."""
+        try:
+            return self._colunas_modelos[model]
+        except (KeyError, TypeError):
+            pass
+        esperadas = getattr(model, 'feature_names_in_', None)
+        colunas = ColunasModelo(esperadas, self.sinonimos)
+        try:
+            self._colunas_modelos[model] = colunas
+        except TypeError:
+            # Objetos sem suporte a referência fraca são resolvidos a cada chamada
+            pass
+        return colunas
+
+    def preparar(self, df, model=None, validar=True):
+        """Copia o DataFrame, resolve os nomes de coluna do modelo, valida, traduz e cria o IMC."""
+        df = df.copy()
+        if model is not None:
+            self.colunas_modelo(model).aplicar(df)
+        df = self.traduzir(df, validar)
+        df['IMC'] = df['Weight'] / (df['Height']**2)
+        return df
+
+
+# Esquema compartilhado pela aplicação
+ESQUEMA = Esquema()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida um CSV no formato de 'Obesity.csv'.")
+    parser.add_argument('dados', help="CSV a validar")
+    parser.add_argument('--tamanho-bloco', type=int, default=200_000, help="Linhas lidas por vez")
+    parser.add_argument('--relatorio', help="Grava todos os erros neste CSV")
+    parser.add_argument('--alvo', action='store_true',
+                        help=f"Também verifica a coluna '{COLUNA_ALVO}' (datasets de treino)")
+    args = parser.parse_args()
+
+    relatorios = []
+    total = 0
+    # Com as colunas do vocabulário como 'category', só as categorias de cada bloco são procuradas
+    tipos = {campo: 'category' for campo in ESQUEMA.categorias}
+    for bloco in pd.read_csv(args.dados, chunksize=args.tamanho_bloco, dtype=tipos):
+        relatorios.append(ESQUEMA.validar(bloco, com_alvo=args.alvo))
+        total += len(bloco)
+    relatorio = pd.concat(relatorios, ignore_index=True)
+
+    print(f"{total} linhas verificadas, {relatorio['linha'].nunique()} com valores inválidos "
+          f"({len(relatorio)} erros)")
+    if len(relatorio):
+        print(relatorio.groupby(['coluna', 'motivo']).size().rename('erros').to_string())
+        if args.relatorio:
+            relatorio.to_csv(args.relatorio, index=False)
+            print(f"Relatório salvo em '{args.relatorio}'")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
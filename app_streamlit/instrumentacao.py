@@ -0,0 +1,430 @@
+# --- Instrumentação do caminho de predição (opcional) ---
+# Mede o tempo de cada etapa de uma predição (montagem do DataFrame, tradução, pré-processamento,
+# classificador, renderização) com contadores e histogramas por modelo, junta as estatísticas de
+# carga dos modelos e exporta tudo no formato texto do Prometheus: por um endpoint HTTP (/metrics)
+# ou por um arquivo (compatível com o textfile collector do node_exporter). Um amostrador de
+# pilhas opcional grava as pilhas no formato "collapsed", pronto para gerar flamegraphs.
+#
+# Na interface, tudo fica desligado por padrão e é ativado por variáveis de ambiente:
+#   INSTRUMENTACAO=1          coleta as métricas (exibidas na barra lateral)
+#   METRICAS_PORTA=9464       endpoint http://127.0.0.1:9464/metrics (implica INSTRUMENTACAO=1)
+#   METRICAS_HOST=0.0.0.0     endereço do endpoint (padrão: 127.0.0.1, só a própria máquina)
+#   METRICAS_ARQUIVO=app.prom grava as métricas a cada execução da página (implica INSTRUMENTACAO=1)
+#   PERFIL_AMOSTRAS=app.txt   amostra as pilhas de todas as threads e grava o arquivo periodicamente
+#
+# Uso (fora da interface, para acompanhar regressões após retreinar os modelos):
+#   python app_streamlit/instrumentacao.py --modelos SVM --registros 500 --perfil pilhas.txt
+#   flamegraph.pl pilhas.txt > pilhas.svg
+import argparse
+import atexit
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites superiores (em segundos) dos histogramas de duração
+LIMITES_PADRAO = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+INTERVALO_AMOSTRAGEM_MS = 5
+PREFIXO = 'obesidade'
+HOST_METRICAS_PADRAO = '127.0.0.1'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(rotulos, extras=()):
+    pares = list(rotulos) + list(extras)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+def _formatar_valor(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * len(limites)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        self.soma += valor
+        self.total += 1
+
+
+class Metricas:
+    """Contadores, medidores e histogramas com rótulos, exportados no formato texto do Prometheus.
+
+    Pode ser compartilhado entre threads (ex: sessões do Streamlit). Coletores adicionais
+    (funções chamadas a cada exportação) permitem incluir estatísticas mantidas em outros
+    objetos, como o tempo de carga dos modelos do RegistroModelos.
+    """
+
+    ativa = True
+
+    def __init__(self, limites=LIMITES_PADRAO):
+        self.limites = tuple(sorted(limites))
+        self._descricoes = {}
+        self._contadores = {}
+        self._medidores = {}
+        self._histogramas = {}
+        self._coletores = []
+        self._trava = threading.Lock()
+
+    def _registrar(self, nome, tipo, ajuda):
+        if ajuda or nome not in self._descricoes:
+            self._descricoes[nome] = (tipo, ajuda)
+
+    def incrementar(self, nome, valor=1, ajuda='', **rotulos):
+        with self._trava:
+            self._registrar(nome, 'counter', ajuda)
+            chave = (nome, tuple(sorted(rotulos.items())))
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def definir(self, nome, valor, ajuda='', **rotulos):
+        with self._trava:
+            self._registrar(nome, 'gauge', ajuda)
+            self._medidores[(nome, tuple(sorted(rotulos.items())))] = valor
+
+    def observar(self, nome, valor, ajuda='', **rotulos):
+        with self._trava:
+            self._registrar(nome, 'histogram', ajuda)
+            chave = (nome, tuple(sorted(rotulos.items())))
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = _Histograma(self.limites)
+            histograma.observar(valor)
+
+    def registrar_etapa(self, etapa, segundos, **rotulos):
+        """Registra a duração de uma etapa no histograma de etapas."""
+        self.observar(f'{PREFIXO}_etapa_segundos', segundos, 'Duração de cada etapa da predição',
+                      etapa=etapa, **rotulos)
+
+    @contextlib.contextmanager
+    def medir(self, etapa, **rotulos):
+        """Mede a duração do bloco e registra no histograma de etapas (`etapa` + rótulos)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_etapa(etapa, time.perf_counter() - inicio, **rotulos)
+
+    def adicionar_coletor(self, coletor):
+        """Adiciona uma função chamada a cada exportação, que registra medidores em `self`."""
+        with self._trava:
+            self._coletores.append(coletor)
+
+    def resumo_etapas(self):
+        """{(etapa, modelo): (quantidade, média em segundos)} do histograma de etapas."""
+        with self._trava:
+            itens = list(self._histogramas.items())
+        resumo = {}
+        for (nome, rotulos), histograma in itens:
+            if nome == f'{PREFIXO}_etapa_segundos' and histograma.total:
+                rotulos = dict(rotulos)
+                resumo[(rotulos.get('etapa'), rotulos.get('modelo', ''))] = (
+                    histograma.total, histograma.soma / histograma.total
+                )
+        return resumo
+
+    def exportar_prometheus(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        for coletor in list(self._coletores):
+            coletor(self)
+        with self._trava:
+            series = {}
+            for (nome, rotulos), valor in sorted(self._contadores.items()):
+                series.setdefault(nome, []).append(f'{nome}{_formatar_rotulos(rotulos)} {_formatar_valor(valor)}')
+            for (nome, rotulos), valor in sorted(self._medidores.items()):
+                series.setdefault(nome, []).append(f'{nome}{_formatar_rotulos(rotulos)} {_formatar_valor(valor)}')
+            for (nome, rotulos), histograma in sorted(self._histogramas.items()):
+                linhas = series.setdefault(nome, [])
+                acumulado = 0
+                for limite, contagem in zip(histograma.limites, histograma.contagens):
+                    acumulado += contagem
+                    linhas.append(f'{nome}_bucket{_formatar_rotulos(rotulos, [("le", _formatar_valor(limite))])} {acumulado}')
+                linhas.append(f'{nome}_bucket{_formatar_rotulos(rotulos, [("le", "+Inf")])} {histograma.total}')
+                linhas.append(f'{nome}_sum{_formatar_rotulos(rotulos)} {_formatar_valor(histograma.soma)}')
+                linhas.append(f'{nome}_count{_formatar_rotulos(rotulos)} {histograma.total}')
+            texto = []
+            for nome in sorted(series):
+                tipo, ajuda = self._descricoes[nome]
+                if ajuda:
+                    texto.append(f'# HELP {nome} {ajuda}')
+                texto.append(f'# TYPE {nome} {tipo}')
+                texto.extend(series[nome])
+        return '\n'.join(texto) + '\n'
+
+    def gravar_arquivo(self, caminho):
+        """Grava as métricas em `caminho` (escrita atômica: arquivo temporário + rename)."""
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix='.metricas_')
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(self.exportar_prometheus())
+        os.replace(temporario, caminho)
+
+
+class MetricasDesligadas:
+    """Mesma interface de Metricas, sem coletar nada (instrumentação desativada)."""
+
+    ativa = False
+
+    def incrementar(self, *args, **kwargs):
+        pass
+
+    definir = observar = registrar_etapa = adicionar_coletor = incrementar
+
+    def medir(self, etapa, **rotulos):
+        return contextlib.nullcontext()
+
+    def resumo_etapas(self):
+        return {}
+
+
+def coletor_registro(registro, artefato='pipeline'):
+    """Coletor que publica as estatísticas de carga de um RegistroModelos como medidores."""
+    def coletar(metricas):
+        relatorio = registro.relatorio()
+        if relatorio['tempo_importacao_s'] is not None:
+            metricas.definir(f'{PREFIXO}_importacao_segundos', relatorio['tempo_importacao_s'],
+                             'Tempo de importação das bibliotecas de machine learning', artefato=artefato)
+        for nome, estatisticas in relatorio['modelos'].items():
+            metricas.definir(f'{PREFIXO}_modelo_carga_segundos', estatisticas['tempo_carga_s'],
+                             'Tempo da última carga do modelo', modelo=nome, artefato=artefato)
+            metricas.definir(f'{PREFIXO}_modelo_cargas', estatisticas['cargas'],
+                             'Cargas do modelo desde o início do processo (inclui recargas após retreino)',
+                             modelo=nome, artefato=artefato)
+            metricas.definir(f'{PREFIXO}_modelo_arquivo_bytes', estatisticas['tamanho_arquivo_mb'] * 1024**2,
+                             'Tamanho do arquivo do modelo', modelo=nome, artefato=artefato)
+            if estatisticas['rss_mb'] is not None:
+                metricas.definir(f'{PREFIXO}_modelo_rss_bytes', estatisticas['rss_mb'] * 1024**2,
+                                 'Aumento da memória residente (RSS) na carga do modelo',
+                                 modelo=nome, artefato=artefato)
+    return coletar
+
+
+def coletor_cache(cache):
+    """Coletor que publica os contadores de um CachePredicoes."""
+    def coletar(metricas):
+        for nome, valor in cache.contadores().items():
+            metricas.definir(f'{PREFIXO}_cache_{nome}', valor, 'Contador do cache de predições')
+    return coletar
+
+
+def prever_por_etapas(model, df, metricas, nome_modelo):
+    """model.predict(df) separando o pré-processamento do classificador nas métricas.
+
+    Para um Pipeline, executa as etapas anteriores ao classificador e depois o classificador,
+    o que equivale a model.predict. Outros modelos são medidos como uma única etapa.
+    """
+    if hasattr(model, 'steps') and len(model.steps) > 1:
+        with metricas.medir('pre_processamento', modelo=nome_modelo):
+            X = model[:-1].transform(df)
+        with metricas.medir('classificador', modelo=nome_modelo):
+            return model[-1].predict(X)
+    with metricas.medir('modelo', modelo=nome_modelo):
+        return model.predict(df)
+
+
+# --- Endpoint HTTP ---
+class _ManipuladorMetricas(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/metricas'):
+            self.send_error(404)
+            return
+        dados = self.server.metricas.exportar_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+
+# Um servidor por endereço no processo, reaproveitado por chamadas seguintes
+_servidores_metricas = {}
+_trava_servidores_metricas = threading.Lock()
+
+
+def iniciar_servidor_metricas(metricas, porta, host=HOST_METRICAS_PADRAO):
+    """Atende GET /metrics em uma thread em segundo plano. Retorna o servidor.
+
+    Se já houver um servidor neste processo no mesmo endereço (ex: o cache do Streamlit foi
+    limpo), ele passa a exportar `metricas` em vez de a porta ser aberta outra vez. Levanta
+    OSError se a porta estiver ocupada por outro processo.
+    """
+    with _trava_servidores_metricas:
+        servidor = _servidores_metricas.get((host, porta))
+        if servidor is None:
+            servidor = ThreadingHTTPServer((host, porta), _ManipuladorMetricas)
+            servidor.daemon_threads = True
+            threading.Thread(target=servidor.serve_forever, name='metricas-http', daemon=True).start()
+            _servidores_metricas[(host, porta)] = servidor
+        servidor.metricas = metricas
+    return servidor
+
+
+# --- Amostrador de pilhas ---
+class AmostradorPilhas:
+    """Perfilador por amostragem: a cada `intervalo_ms`, registra a pilha de cada thread.
+
+    As pilhas são agregadas no formato "collapsed" (uma linha por pilha, quadros separados por
+    ';' seguidos da contagem), aceito por flamegraph.pl, speedscope e inferno. O primeiro quadro
+    é o nome da thread. Com `caminho`, o arquivo é regravado a cada `intervalo_gravacao_s` e ao
+    encerrar o processo.
+    """
+
+    def __init__(self, intervalo_ms=INTERVALO_AMOSTRAGEM_MS, caminho=None, intervalo_gravacao_s=10.0):
+        self.intervalo_s = intervalo_ms / 1000
+        self.caminho = caminho
+        self.intervalo_gravacao_s = intervalo_gravacao_s
+        self.pilhas = {}
+        self.amostras = 0
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _quadro(frame):
+        codigo = frame.f_code
+        return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)})"
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == proprio:
+                continue
+            quadros = []
+            while frame is not None:
+                quadros.append(self._quadro(frame))
+                frame = frame.f_back
+            quadros.append(nomes.get(ident, f'thread-{ident}'))
+            pilha = ';'.join(reversed(quadros))
+            with self._trava:
+                self.pilhas[pilha] = self.pilhas.get(pilha, 0) + 1
+        self.amostras += 1
+
+    def _executar(self):
+        ultima_gravacao = time.monotonic()
+        while not self._parar.wait(self.intervalo_s):
+            self._amostrar()
+            if self.caminho and time.monotonic() - ultima_gravacao >= self.intervalo_gravacao_s:
+                self.gravar()
+                ultima_gravacao = time.monotonic()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name='amostrador-pilhas', daemon=True)
+            self._thread.start()
+            if self.caminho:
+                atexit.register(self.parar)
+        return self
+
+    def parar(self):
+        """Interrompe a amostragem e grava o arquivo (se houver)."""
+        if self._thread is not None:
+            self._parar.set()
+            self._thread.join()
+            self._thread = None
+        if self.caminho:
+            self.gravar()
+
+    def collapsed(self):
+        with self._trava:
+            itens = sorted(self.pilhas.items())
+        return ''.join(f'{pilha} {contagem}\n' for pilha, contagem in itens)
+
+    def gravar(self, caminho=None):
+        caminho = caminho or self.caminho
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(self.collapsed())
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *excecao):
+        self.parar()
+
+
+def configuracao_ambiente(ambiente=None):
+    """Lê as variáveis de ambiente da instrumentação (ver o cabeçalho do módulo)."""
+    ambiente = os.environ if ambiente is None else ambiente
+    porta = ambiente.get('METRICAS_PORTA')
+    arquivo = ambiente.get('METRICAS_ARQUIVO')
+    return {
+        'ativa': ambiente.get('INSTRUMENTACAO') == '1' or bool(porta) or bool(arquivo),
+        'porta': int(porta) if porta else None,
+        'host': ambiente.get('METRICAS_HOST') or HOST_METRICAS_PADRAO,
+        'arquivo': arquivo or None,
+        'perfil': ambiente.get('PERFIL_AMOSTRAS') or None,
+    }
+
+
+def main():
+    import pandas as pd
+
+    from modelos import CAMINHOS_MODELOS, RegistroModelos
+    from rapido import carregar_dados_verificacao
+    from traducao import preparar_dataframe
+
+    parser = argparse.ArgumentParser(
+        description="Executa o caminho de predição da interface registro a registro e exporta as métricas."
+    )
+    parser.add_argument('--modelos', nargs='+', default=list(CAMINHOS_MODELOS))
+    parser.add_argument('--registros', type=int, default=500)
+    parser.add_argument('--saida', help="Arquivo para as métricas no formato do Prometheus (padrão: terminal)")
+    parser.add_argument('--perfil', help="Arquivo para as pilhas amostradas (formato collapsed)")
+    parser.add_argument('--intervalo-ms', type=float, default=INTERVALO_AMOSTRAGEM_MS)
+    args = parser.parse_args()
+
+    metricas = Metricas()
+    registro = RegistroModelos()
+    metricas.adicionar_coletor(coletor_registro(registro))
+    registros = carregar_dados_verificacao().sample(n=args.registros, random_state=42, replace=True)
+    registros = registros.astype(object).to_dict('records')
+
+    amostrador = AmostradorPilhas(args.intervalo_ms) if args.perfil else None
+    if amostrador:
+        amostrador.iniciar()
+    for nome in args.modelos:
+        model = registro.obter(nome)
+        for dados in registros:
+            with metricas.medir('total', modelo=nome):
+                with metricas.medir('montagem_dataframe', modelo=nome):
+                    df = pd.DataFrame([dados])
+                with metricas.medir('traducao', modelo=nome):
+                    df = preparar_dataframe(df, model)
+                prever_por_etapas(model, df, metricas, nome)
+            metricas.incrementar(f'{PREFIXO}_predicoes_total', ajuda='Predições realizadas', modelo=nome)
+    if amostrador:
+        amostrador.parar()
+        amostrador.gravar(args.perfil)
+        print(f"{amostrador.amostras} amostras de pilha gravadas em '{args.perfil}'", file=sys.stderr)
+
+    if args.saida:
+        metricas.gravar_arquivo(args.saida)
+    else:
+        print(metricas.exportar_prometheus())
+    print(f"{'Etapa':<22}{'Modelo':<16}{'Média (ms)':>12}", file=sys.stderr)
+    for (etapa, modelo), (_, media) in sorted(metricas.resumo_etapas().items(), key=lambda item: (item[0][1], item[0][0])):
+        print(f"{etapa:<22}{modelo:<16}{media * 1000:>12.3f}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# --- Pontuação em lote de arquivos CSV de questionários ---
+# Uso: python app_streamlit/lote.py pacientes.csv predicoes.csv --modelo "Random Forest"
+import argparse
+import time
+
+import pandas as pd
+
+from esquema import ESQUEMA
+from modelos import CAMINHOS_MODELOS, carregar_modelo
+from traducao import colunas_faltantes, preparar_dataframe, traduzir_predicao_para_portugues
+
+TAMANHO_LOTE_PADRAO = 10_000
+COLUNA_ERRO = 'Erro'
+
+
+def colunas_predicao(model, com_probabilidades=True):
+    """Colunas acrescentadas pela predição: a classe e, se houver, a probabilidade de cada classe."""
+    colunas = ['Predicao']
+    if com_probabilidades and hasattr(model, 'predict_proba'):
+        colunas += [f'prob_{classe}' for classe in model.classes_]
+    return colunas
+
+
+def prever_dataframe(model, df, com_probabilidades=True):
+    """Prevê um DataFrame já traduzido com uma única chamada vetorizada ao modelo."""
+    faltantes = colunas_faltantes(df, model)
+    if faltantes:
+        raise ValueError(f"As seguintes colunas estão faltando para o modelo: {faltantes}")
+
+    # Envia ao modelo apenas as colunas que ele espera, na ordem do treino
+    entrada = df[list(model.feature_names_in_)] if hasattr(model, 'feature_names_in_') else df
+    resultado = pd.DataFrame({'Predicao': model.predict(entrada)}, index=df.index)
+    if com_probabilidades and hasattr(model, 'predict_proba'):
+        probabilidades = model.predict_proba(entrada)
+        for i, classe in enumerate(model.classes_):
+            resultado[f'prob_{classe}'] = probabilidades[:, i]
+    return resultado
+
+
+def prever_registros(model, registros):
+    """Prevê uma lista de registros (dicts) e retorna um resultado JSON por registro.
+
+    Se algum registro tiver valores inválidos, levanta EntradaInvalida com os erros de todos eles
+    (a coluna 'linha' do relatório é a posição do registro na lista).
+    """
+    entrada = preparar_dataframe(pd.DataFrame(registros), model)
+    predicoes = prever_dataframe(model, entrada)
+    colunas_prob = [c for c in predicoes.columns if c.startswith('prob_')]
+    resultados = []
+    for registro in predicoes.to_dict('records'):
+        resultados.append({
+            'predicao': registro['Predicao'],
+            'predicao_pt': traduzir_predicao_para_portugues(registro['Predicao'].replace("_", " ")),
+            'probabilidades': {c[len('prob_'):]: float(registro[c]) for c in colunas_prob},
+        })
+    return resultados
+
+
+def prever_csv_em_lotes(model, arquivo_csv, tamanho_lote=TAMANHO_LOTE_PADRAO, com_probabilidades=True):
+    """Lê o CSV em blocos e retorna um gerador com as predições de cada bloco.
+
+    A memória usada fica limitada ao tamanho do bloco, independente do tamanho do arquivo.
+    Cada bloco é validado de uma vez: linhas com valores inválidos não vão para o modelo, ficam
+    sem predição e recebem a descrição dos erros na coluna 'Erro' (vazia nas linhas válidas).
+    """
+    for bloco in pd.read_csv(arquivo_csv, chunksize=tamanho_lote):
+        relatorio = ESQUEMA.validar(bloco)
+        descricoes = (
+            relatorio['coluna'] + ' = ' + relatorio['valor'].astype(str) + ' (' + relatorio['motivo'] + ')'
+        ).groupby(relatorio['linha']).agg('; '.join)
+        validas = bloco.drop(index=descricoes.index)
+        if len(validas):
+            entrada = preparar_dataframe(validas, model, validar=False)
+            predicoes = prever_dataframe(model, entrada, com_probabilidades)
+        else:
+            predicoes = pd.DataFrame(columns=colunas_predicao(model, com_probabilidades))
+        resultado = pd.concat([bloco, predicoes.reindex(bloco.index)], axis=1)
+        resultado[COLUNA_ERRO] = descricoes.reindex(bloco.index).fillna('')
+        yield resultado
+
+
+def pontuar_csv(model, arquivo_entrada, arquivo_saida, tamanho_lote=TAMANHO_LOTE_PADRAO,
+                com_probabilidades=True, ao_concluir_lote=None):
+    """Pontua o CSV de entrada e grava as predições no CSV de saída, bloco a bloco.
+
+    Retorna um dicionário com o total de linhas, as linhas inválidas (não previstas), o tempo
+    gasto e a vazão em linhas por segundo.
+    """
+    total_linhas = 0
+    linhas_invalidas = 0
+    inicio = time.perf_counter()
+    for i, resultado in enumerate(prever_csv_em_lotes(model, arquivo_entrada, tamanho_lote, com_probabilidades)):
+        resultado.to_csv(arquivo_saida, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        total_linhas += len(resultado)
+        linhas_invalidas += int((resultado[COLUNA_ERRO] != '').sum())
+        if ao_concluir_lote is not None:
+            ao_concluir_lote(total_linhas, time.perf_counter() - inicio)
+    segundos = time.perf_counter() - inicio
+    return {
+        'linhas': total_linhas,
+        'linhas_invalidas': linhas_invalidas,
+        'segundos': segundos,
+        'linhas_por_segundo': total_linhas / segundos if segundos > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pontua um CSV de questionários no formato de 'Obesity.csv'.")
+    parser.add_argument('entrada', help="CSV de entrada com as respostas dos pacientes")
+    parser.add_argument('saida', help="CSV de saída com as predições")
+    parser.add_argument('--modelo', default="Random Forest",
+                        help=f"Nome do modelo ({', '.join(CAMINHOS_MODELOS)}) ou caminho de um .pkl")
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE_PADRAO,
+                        help="Número de linhas lidas e previstas por vez")
+    parser.add_argument('--sem-probabilidades', action='store_true',
+                        help="Não calcula as probabilidades de cada classe")
+    args = parser.parse_args()
+
+    model = carregar_modelo(args.modelo)
+
+    def relatar(linhas, segundos):
+        print(f"{linhas} linhas pontuadas ({linhas / segundos:,.0f} linhas/s)")
+
+    estatisticas = pontuar_csv(model, args.entrada, args.saida, args.tamanho_lote,
+                               not args.sem_probabilidades, relatar)
+    print("\n-------------------------------------------")
+    print(f"Total: {estatisticas['linhas']} linhas em {estatisticas['segundos']:.2f}s "
+          f"({estatisticas['linhas_por_segundo']:,.0f} linhas/s)")
+    if estatisticas['linhas_invalidas']:
+        print(f"{estatisticas['linhas_invalidas']} linhas com valores inválidos não foram previstas "
+              f"(motivos na coluna '{COLUNA_ERRO}')")
+    print(f"Predições salvas em '{args.saida}'")
+    print("-------------------------------------------")
+
+
+if __name__ == '__main__':
+    main()
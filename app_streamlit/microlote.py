@@ -0,0 +1,176 @@
+# --- Agendador de micro-lotes para predições concorrentes ---
+# Junta requisições de um único registro que chegam ao mesmo tempo e faz uma só chamada
+# vetorizada ao pipeline, dividindo o custo fixo do ColumnTransformer/OneHotEncoder entre elas.
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from esquema import EntradaInvalida
+from lote import prever_registros
+
+MAX_LOTE_PADRAO = 32
+MAX_ESPERA_MS_PADRAO = 5.0
+
+
+class MicroLote:
+    """Acumula registros por até `max_lote` itens ou `max_espera_ms` e prevê todos de uma vez.
+
+    Uso (dentro de um event loop):
+        micro_lote = MicroLote(model, max_lote=32, max_espera_ms=5)
+        resultado = await micro_lote.prever(registro)
+        await micro_lote.encerrar()
+    """
+
+    def __init__(self, model, max_lote=MAX_LOTE_PADRAO, max_espera_ms=MAX_ESPERA_MS_PADRAO):
+        if max_lote < 1:
+            raise ValueError("max_lote deve ser pelo menos 1")
+        self.model = model
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self.lotes_processados = 0
+        self.registros_processados = 0
+        self._fila = None
+        self._tarefa = None
+        self._em_andamento = []
+        self._encerrado = False
+        # Uma única thread de predição: enquanto um lote é previsto, o próximo já vai sendo montado
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='microlote')
+
+    @property
+    def tamanho_medio_lote(self):
+        return self.registros_processados / self.lotes_processados if self.lotes_processados else 0.0
+
+    async def prever(self, registro):
+        """Agenda um registro (dict) e aguarda o resultado do lote em que ele for incluído."""
+        if self._encerrado:
+            raise RuntimeError("O agendador de micro-lotes foi encerrado")
+        if self._tarefa is None:
+            self._fila = asyncio.Queue()
+            self._tarefa = asyncio.get_running_loop().create_task(self._processar())
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((registro, futuro))
+        return await futuro
+
+    async def encerrar(self):
+        """Interrompe o agendador, falha as requisições pendentes e libera a thread de predição."""
+        self._encerrado = True
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        # Quem aguarda o lote interrompido ou ainda está na fila recebe um erro em vez de esperar para sempre
+        pendentes = self._em_andamento
+        while self._fila is not None and not self._fila.empty():
+            pendentes.append(self._fila.get_nowait())
+        for _, futuro in pendentes:
+            if not futuro.done():
+                futuro.set_exception(RuntimeError("O agendador de micro-lotes foi encerrado"))
+        self._em_andamento = []
+        self._executor.shutdown(wait=True)
+
+    async def _coletar_lote(self):
+        """Espera o primeiro registro e junta os seguintes até encher o lote ou o prazo acabar."""
+        # O lote em montagem fica visível a `encerrar`, que falha os seus futuros se for cancelado
+        pendentes = self._em_andamento = [await self._fila.get()]
+        prazo = time.perf_counter() + self.max_espera
+        while len(pendentes) < self.max_lote:
+            # Primeiro esvazia o que já está na fila, sem esperar
+            if not self._fila.empty():
+                pendentes.append(self._fila.get_nowait())
+                continue
+            restante = prazo - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                pendentes.append(await asyncio.wait_for(self._fila.get(), timeout=restante))
+            except asyncio.TimeoutError:
+                break
+        return pendentes
+
+    async def _prever_lote(self, pendentes):
+        """Prevê os registros pendentes com uma única chamada e entrega os resultados."""
+        registros = [registro for registro, _ in pendentes]
+        resultados = await asyncio.get_running_loop().run_in_executor(
+            self._executor, prever_registros, self.model, registros
+        )
+        self.lotes_processados += 1
+        self.registros_processados += len(registros)
+        for (_, futuro), resultado in zip(pendentes, resultados):
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+    @staticmethod
+    def _rejeitar_invalidos(pendentes, relatorio):
+        """Entrega a cada registro inválido apenas os seus erros e retorna os pendentes válidos."""
+        validos = []
+        for posicao, (registro, futuro) in enumerate(pendentes):
+            erros = relatorio[relatorio['linha'] == posicao]
+            if erros.empty:
+                validos.append((registro, futuro))
+            elif not futuro.done():
+                futuro.set_exception(EntradaInvalida(erros.assign(linha=0).reset_index(drop=True)))
+        return validos
+
+    async def _processar(self):
+        while True:
+            pendentes = await self._coletar_lote()
+            try:
+                await self._prever_lote(pendentes)
+                continue
+            except EntradaInvalida as erro:
+                # O relatório traz todos os registros inválidos do lote: só eles recebem o erro e
+                # os demais continuam sendo previstos juntos
+                pendentes = self._rejeitar_invalidos(pendentes, erro.relatorio)
+                try:
+                    if pendentes:
+                        await self._prever_lote(pendentes)
+                    continue
+                except Exception:
+                    pass
+            except Exception:
+                pass
+            # Outros erros (ex: campo ausente): refaz um a um para que apenas as requisições
+            # com erro recebam a exceção
+            await self._prever_individualmente(pendentes)
+
+    async def _prever_individualmente(self, pendentes):
+        loop = asyncio.get_running_loop()
+        for registro, futuro in pendentes:
+            try:
+                resultado = await loop.run_in_executor(self._executor, prever_registros, self.model, [registro])
+            except Exception as erro:
+                if not futuro.done():
+                    futuro.set_exception(erro)
+                continue
+            self.lotes_processados += 1
+            self.registros_processados += 1
+            if not futuro.done():
+                futuro.set_result(resultado[0])
+
+
+class MicroLoteEmSegundoPlano:
+    """Executa um MicroLote por modelo em um event loop próprio, para uso a partir de threads.
+
+    Permite que código síncrono (ex: o servidor HTTP com uma thread por conexão) envie
+    registros ao agendador e bloqueie apenas a própria thread até receber o resultado.
+    """
+
+    def __init__(self, modelos, max_lote=MAX_LOTE_PADRAO, max_espera_ms=MAX_ESPERA_MS_PADRAO):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='microlote-loop', daemon=True)
+        self._thread.start()
+        self.micro_lotes = {nome: MicroLote(model, max_lote, max_espera_ms) for nome, model in modelos.items()}
+
+    def prever(self, nome_modelo, registro):
+        futuro = asyncio.run_coroutine_threadsafe(self.micro_lotes[nome_modelo].prever(registro), self._loop)
+        return futuro.result()
+
+    def encerrar(self):
+        for micro_lote in self.micro_lotes.values():
+            asyncio.run_coroutine_threadsafe(micro_lote.encerrar(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
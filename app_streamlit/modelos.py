@@ -0,0 +1,222 @@
+# --- Localização e carregamento dos modelos treinados ---
+# Uso: python app_streamlit/modelos.py   (relatório de importação, carga e memória por modelo)
+import os
+import sys
+import threading
+import time
+
+DIRETORIO_MODELOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+# Nome exibido na interface -> arquivo do pipeline salvo
+CAMINHOS_MODELOS = {
+    "KNN": os.path.join(DIRETORIO_MODELOS, 'KNN.pkl'),
+    "Random Forest": os.path.join(DIRETORIO_MODELOS, 'RandomForest.pkl'),
+    "SVM": os.path.join(DIRETORIO_MODELOS, 'SVM.pkl'),
+}
+
+# Artefatos compactos gerados por compactar.py (mesmos nomes de arquivo)
+DIRETORIO_COMPACTOS = os.path.join(DIRETORIO_MODELOS, 'compactos')
+CAMINHOS_COMPACTOS = {
+    nome: os.path.join(DIRETORIO_COMPACTOS, os.path.basename(caminho)) for nome, caminho in CAMINHOS_MODELOS.items()
+}
+
+# Os arrays NumPy dos pickles (salvos sem compressão pelo joblib) são mapeados em memória:
+# vários processos que carregam o mesmo arquivo compartilham as mesmas páginas. Por isso um
+# artefato nunca deve ser sobrescrito no lugar: quem grava modelos usa `salvar_modelo`.
+MMAP_MODE_PADRAO = 'r'
+
+
+def resolver_caminho_modelo(nome_ou_caminho):
+    """Aceita o nome do modelo (ex: 'SVM') ou o caminho de um arquivo .pkl."""
+    return CAMINHOS_MODELOS.get(nome_ou_caminho, nome_ou_caminho)
+
+
+def _tornar_svm_gravavel(model):
+    """Copia para a memória os arrays mapeados de um SVC (libsvm exige buffers graváveis).
+
+    O `predict_proba` do SVC falha com arrays somente leitura ('buffer source array is
+    read-only'); os demais classificadores continuam lendo direto do arquivo mapeado.
+    """
+    import numpy as np
+    from sklearn.svm._base import BaseLibSVM
+
+    classificador = model[-1] if hasattr(model, 'steps') else model
+    # Preditores do caminho rápido (inclusive os compactos) guardam o classificador em `classificador`
+    classificador = getattr(classificador, 'classificador', classificador)
+    if isinstance(classificador, BaseLibSVM):
+        for atributo, valor in vars(classificador).items():
+            if isinstance(valor, np.ndarray) and not valor.flags.writeable:
+                setattr(classificador, atributo, np.array(valor))
+    return model
+
+
+def carregar_modelo(nome_ou_caminho, mmap_mode=None):
+    """Carrega o pipeline de machine learning salvo."""
+    import joblib
+    model = joblib.load(resolver_caminho_modelo(nome_ou_caminho), mmap_mode=mmap_mode)
+    return _tornar_svm_gravavel(model) if mmap_mode is not None else model
+
+
+def salvar_modelo(objeto, destino, **opcoes_dump):
+    """Grava um artefato com joblib em um arquivo temporário no mesmo diretório e o renomeia.
+
+    A troca é atômica: processos que mapearam o arquivo antigo em memória continuam lendo o
+    conteúdo antigo até recarregar, em vez de ver páginas reescritas (ou truncadas) no meio.
+    """
+    import joblib
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    try:
+        joblib.dump(objeto, temporario, **opcoes_dump)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def rss_atual_mb():
+    """Memória residente (RSS) atual do processo em MB, ou None se não for possível medir."""
+    try:
+        with open('/proc/self/statm') as statm:
+            paginas_residentes = int(statm.read().split()[1])
+        return paginas_residentes * os.sysconf('SC_PAGE_SIZE') / 1024**2
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Sem /proc (ex: macOS), usa o pico de memória como aproximação
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024**2 if sys.platform == 'darwin' else pico / 1024
+
+
+def pico_memoria_mb(filhos=False):
+    """Pico de memória residente (MB) deste processo ou do maior processo filho, se disponível."""
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    pico = resource.getrusage(resource.RUSAGE_CHILDREN if filhos else resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024**2 if sys.platform == 'darwin' else pico / 1024
+
+
+class RegistroModelos:
+    """Carrega cada modelo apenas na primeira vez em que ele é pedido.
+
+    Se o arquivo do modelo for substituído (ex: modelo retreinado), ele é recarregado no
+    próximo acesso.
+
+    Guarda, por modelo, o tempo de carga e o aumento de memória (RSS), além do tempo de
+    importação das bibliotecas de machine learning, que só acontece na primeira carga.
+    Pode ser compartilhado entre threads (ex: sessões do Streamlit).
+    """
+
+    def __init__(self, caminhos=None, mmap_mode=MMAP_MODE_PADRAO):
+        self.caminhos = dict(CAMINHOS_MODELOS if caminhos is None else caminhos)
+        self.mmap_mode = mmap_mode
+        self.tempo_importacao = None
+        self.estatisticas = {}
+        self._modelos = {}
+        self._assinaturas = {}
+        self._travas = {nome: threading.Lock() for nome in self.caminhos}
+        self._trava_importacao = threading.Lock()
+
+    def _importar_bibliotecas(self):
+        with self._trava_importacao:
+            if self.tempo_importacao is None:
+                inicio = time.perf_counter()
+                import joblib  # noqa: F401
+                import sklearn.pipeline  # noqa: F401
+                self.tempo_importacao = time.perf_counter() - inicio
+
+    @staticmethod
+    def _assinatura(caminho):
+        estado = os.stat(caminho)
+        return estado.st_mtime_ns, estado.st_size
+
+    def obter(self, nome):
+        """Retorna o modelo, carregando-o do disco no primeiro acesso ou se o arquivo mudou."""
+        if nome not in self.caminhos:
+            raise KeyError(f"Modelo desconhecido: '{nome}'")
+        assinatura = self._assinatura(self.caminhos[nome])
+        model = self._modelos.get(nome)
+        if model is not None and self._assinaturas.get(nome) == assinatura:
+            return model
+
+        with self._travas[nome]:
+            # Outra thread pode ter carregado o modelo enquanto esperávamos a trava
+            if nome in self._modelos and self._assinaturas.get(nome) == assinatura:
+                return self._modelos[nome]
+            self._importar_bibliotecas()
+            rss_antes = rss_atual_mb()
+            inicio = time.perf_counter()
+            model = carregar_modelo(self.caminhos[nome], mmap_mode=self.mmap_mode)
+            tempo_carga = time.perf_counter() - inicio
+            rss_depois = rss_atual_mb()
+            self.estatisticas[nome] = {
+                'tempo_carga_s': tempo_carga,
+                'rss_mb': rss_depois - rss_antes if None not in (rss_antes, rss_depois) else None,
+                'tamanho_arquivo_mb': os.path.getsize(self.caminhos[nome]) / 1024**2,
+                'cargas': self.estatisticas.get(nome, {}).get('cargas', 0) + 1,
+            }
+            self._modelos[nome] = model
+            self._assinaturas[nome] = assinatura
+            return model
+
+    def aquecer(self, nomes=None, em_segundo_plano=True):
+        """Carrega antecipadamente os modelos indicados (todos, por padrão).
+
+        Com `em_segundo_plano=True`, a carga acontece em uma thread separada e a função
+        retorna imediatamente essa thread.
+        """
+        nomes = list(self.caminhos if nomes is None else nomes)
+
+        def carregar_todos():
+            for nome in nomes:
+                try:
+                    self.obter(nome)
+                except (OSError, KeyError):
+                    # Um arquivo ausente não impede o aquecimento dos demais;
+                    # o erro aparece quando o modelo for de fato pedido
+                    pass
+
+        if not em_segundo_plano:
+            carregar_todos()
+            return None
+        thread = threading.Thread(target=carregar_todos, name='aquecimento-modelos', daemon=True)
+        thread.start()
+        return thread
+
+    def relatorio(self):
+        """Estatísticas de importação e de carga de cada modelo já carregado."""
+        return {
+            'tempo_importacao_s': self.tempo_importacao,
+            'modelos': {nome: dict(estatisticas) for nome, estatisticas in list(self.estatisticas.items())},
+        }
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Mede importação, carga e memória de cada modelo.")
+    parser.add_argument('--modelos', nargs='+', default=list(CAMINHOS_MODELOS))
+    parser.add_argument('--sem-mmap', action='store_true', help="Carrega os arrays para a memória do processo")
+    parser.add_argument('--compactos', action='store_true', help="Usa os artefatos gerados por compactar.py")
+    args = parser.parse_args()
+
+    caminhos = CAMINHOS_COMPACTOS if args.compactos else CAMINHOS_MODELOS
+    registro = RegistroModelos(caminhos, mmap_mode=None if args.sem_mmap else MMAP_MODE_PADRAO)
+    for nome in args.modelos:
+        registro.obter(nome)
+
+    relatorio = registro.relatorio()
+    print(f"Importação das bibliotecas: {relatorio['tempo_importacao_s'] * 1000:.1f} ms")
+    print(f"{'Modelo':<15}{'Arquivo (MB)':>14}{'Carga (ms)':>12}{'RSS (MB)':>10}")
+    for nome, estatisticas in relatorio['modelos'].items():
+        rss = estatisticas['rss_mb']
+        print(f"{nome:<15}{estatisticas['tamanho_arquivo_mb']:>14.2f}"
+              f"{estatisticas['tempo_carga_s'] * 1000:>12.1f}{rss if rss is not None else float('nan'):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
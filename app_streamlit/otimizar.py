@@ -0,0 +1,205 @@
+# --- Otimização de hiperparâmetros por successive halving ---
+# Sorteia candidatos do espaço de busca de cada modelo e os avalia com validação cruzada
+# estratificada, usando no início só uma fração das amostras de treino. A cada rodada, apenas
+# os melhores candidatos seguem adiante, com mais amostras (successive halving).
+#
+# Os folds pré-processados ficam em cache no disco e o progresso é salvo em um checkpoint,
+# permitindo retomar uma busca interrompida. Usado por `python app_streamlit/treinar.py --otimizar`.
+import hashlib
+import json
+import math
+import os
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+
+from treinar import (
+    CAMINHO_DADOS, CLASSIFICADORES, DIRETORIO_CACHE, chave_cache, criar_preprocessador, dividir_dataset,
+    hash_arquivo,
+)
+
+# Espaço de busca de cada modelo (complementa os hiperparâmetros fixos de CLASSIFICADORES)
+ESPACOS_BUSCA = {
+    "KNN": {
+        'n_neighbors': [1, 3, 5, 7, 9, 11, 15, 21, 31],
+        'weights': ['uniform', 'distance'],
+        # 'p' fica fixo em 2: no scikit-learn 1.6, KNN com p=1 e rótulos em texto falha no predict
+    },
+    "Random Forest": {
+        'n_estimators': [100, 200, 300, 500],
+        'max_depth': [None, 10, 15, 20, 30],
+        'max_features': ['sqrt', 'log2', None],
+        'min_samples_leaf': [1, 2, 4],
+        'criterion': ['gini', 'entropy'],
+    },
+    "SVM": {
+        'C': [0.1, 0.3, 1, 3, 10, 30, 100, 300],
+        'gamma': ['scale', 0.001, 0.003, 0.01, 0.03, 0.1, 0.3],
+    },
+}
+
+CONFIG_PADRAO = {'candidatos': 40, 'folds': 5, 'fator': 3, 'min_amostras': 200, 'semente': 42}
+
+
+def preparar_folds(caminho_dados=CAMINHO_DADOS, diretorio_cache=DIRETORIO_CACHE, n_folds=5, semente=42):
+    """Pré-processa cada fold da validação cruzada uma única vez e guarda o resultado em cache.
+
+    O pré-processador é ajustado só com a parte de treino de cada fold, como faria um Pipeline
+    dentro do cross_val_score. Retorna o caminho do arquivo de cache.
+    """
+    hash_dataset = hash_arquivo(caminho_dados)
+    caminho_cache = os.path.join(
+        diretorio_cache, f"folds_{chave_cache(hash_dataset)}_{n_folds}_{semente}.joblib"
+    )
+    if os.path.exists(caminho_cache):
+        return caminho_cache
+
+    X_train, _, y_train, _ = dividir_dataset(caminho_dados, diretorio_cache)
+    y_train = y_train.to_numpy()
+    validacao = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=semente)
+    rng = np.random.RandomState(semente)
+    folds = []
+    for indices_treino, indices_validacao in validacao.split(X_train, y_train):
+        preprocessor = criar_preprocessador(X_train)
+        X_fold = preprocessor.fit_transform(X_train.iloc[indices_treino])
+        y_fold = y_train[indices_treino]
+        # Ordem estratificada e embaralhada: os primeiros n exemplos formam uma amostra
+        # representativa do fold, usada nas primeiras rodadas (com poucas amostras)
+        ordem = StratifiedKFold(n_splits=max(2, len(y_fold) // 50), shuffle=True, random_state=rng)
+        intercalado = np.concatenate([v for _, v in ordem.split(X_fold, y_fold)])
+        folds.append({
+            'X_treino': X_fold[intercalado], 'y_treino': y_fold[intercalado],
+            'X_validacao': preprocessor.transform(X_train.iloc[indices_validacao]),
+            'y_validacao': y_train[indices_validacao],
+        })
+
+    os.makedirs(diretorio_cache, exist_ok=True)
+    temporario = f"{caminho_cache}.{os.getpid()}.tmp"
+    joblib.dump(folds, temporario)
+    os.replace(temporario, caminho_cache)
+    return caminho_cache
+
+
+def _avaliar(estimador, fold, n_amostras):
+    """Treina o candidato nas primeiras `n_amostras` do fold e retorna a acurácia na validação."""
+    estimador = clone(estimador)
+    estimador.fit(fold['X_treino'][:n_amostras], fold['y_treino'][:n_amostras])
+    return accuracy_score(fold['y_validacao'], estimador.predict(fold['X_validacao']))
+
+
+def _normalizar(valor):
+    # Tipos NumPy sorteados pelo ParameterSampler não são serializáveis em JSON
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+class Checkpoint:
+    """Progresso de uma busca, gravado em JSON a cada lote de avaliações concluído."""
+
+    def __init__(self, caminho, configuracao):
+        self.caminho = caminho
+        self.configuracao = configuracao
+        self.resultados = {}
+        if os.path.exists(caminho):
+            with open(caminho, encoding='utf-8') as arquivo:
+                salvo = json.load(arquivo)
+            # Só retoma se a busca salva for exatamente a mesma
+            if salvo.get('configuracao') == configuracao:
+                self.resultados = salvo['resultados']
+
+    @staticmethod
+    def chave(rodada, candidato):
+        return f"{rodada}:{candidato}"
+
+    def obter(self, rodada, candidato):
+        return self.resultados.get(self.chave(rodada, candidato))
+
+    def registrar(self, rodada, candidato, pontuacoes):
+        self.resultados[self.chave(rodada, candidato)] = pontuacoes
+
+    def salvar(self):
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'configuracao': self.configuracao, 'resultados': self.resultados}, arquivo, indent=1)
+        os.replace(temporario, self.caminho)
+
+
+def otimizar_modelo(nome, caminho_dados=CAMINHO_DADOS, diretorio_cache=DIRETORIO_CACHE, n_jobs=-1,
+                    candidatos=CONFIG_PADRAO['candidatos'], folds=CONFIG_PADRAO['folds'],
+                    fator=CONFIG_PADRAO['fator'], min_amostras=CONFIG_PADRAO['min_amostras'],
+                    semente=CONFIG_PADRAO['semente'], verbose=True):
+    """Executa a busca por successive halving para um modelo e retorna os melhores hiperparâmetros.
+
+    Retorna um dicionário com os hiperparâmetros escolhidos, a acurácia média na validação
+    cruzada e o histórico de cada rodada.
+    """
+    caminho_folds = preparar_folds(caminho_dados, diretorio_cache, folds, semente)
+    dados_folds = joblib.load(caminho_folds, mmap_mode='r')
+    max_amostras = min(len(f['y_treino']) for f in dados_folds)
+
+    classe, parametros_fixos = CLASSIFICADORES[nome]
+    espaco = ESPACOS_BUSCA[nome]
+    lista_candidatos = [
+        {k: _normalizar(v) for k, v in p.items()}
+        for p in ParameterSampler(espaco, n_iter=candidatos, random_state=semente)
+    ]
+
+    configuracao = {
+        'modelo': nome, 'espaco': espaco, 'candidatos': lista_candidatos, 'folds': folds, 'fator': fator,
+        'min_amostras': min_amostras, 'semente': semente, 'dataset': os.path.basename(caminho_folds),
+    }
+    identificador = hashlib.sha256(json.dumps(configuracao, sort_keys=True).encode()).hexdigest()[:12]
+    nome_arquivo = nome.replace(' ', '')
+    checkpoint = Checkpoint(
+        os.path.join(diretorio_cache, f"otimizacao_{nome_arquivo}_{identificador}.json"), configuracao
+    )
+
+    # Cada candidato roda em um núcleo; o paralelismo fica na busca, não no classificador
+    parametros_base = {**parametros_fixos}
+    if 'n_jobs' in parametros_base:
+        parametros_base['n_jobs'] = 1
+
+    restantes = list(range(len(lista_candidatos)))
+    n_rodadas = 1 + max(0, math.ceil(math.log(len(restantes), fator))) if len(restantes) > 1 else 1
+    historico = []
+    with Parallel(n_jobs=n_jobs) as paralelo:
+        for rodada in range(n_rodadas):
+            n_amostras = min(max_amostras, int(min_amostras * fator**rodada))
+            if rodada == n_rodadas - 1:
+                n_amostras = max_amostras
+
+            pendentes = [c for c in restantes if checkpoint.obter(rodada, c) is None]
+            # Avalia em lotes para gravar o checkpoint com frequência
+            tamanho_lote = max(1, (os.cpu_count() or 1) * 2)
+            for inicio in range(0, len(pendentes), tamanho_lote):
+                lote = pendentes[inicio:inicio + tamanho_lote]
+                pontuacoes = paralelo(
+                    delayed(_avaliar)(classe(**{**parametros_base, **lista_candidatos[c]}), fold, n_amostras)
+                    for c in lote for fold in dados_folds
+                )
+                for i, c in enumerate(lote):
+                    checkpoint.registrar(rodada, c, pontuacoes[i * folds:(i + 1) * folds])
+                checkpoint.salvar()
+
+            medias = {c: float(np.mean(checkpoint.obter(rodada, c))) for c in restantes}
+            ordenados = sorted(restantes, key=lambda c: medias[c], reverse=True)
+            historico.append({'rodada': rodada, 'amostras': n_amostras, 'candidatos': len(restantes),
+                              'melhor_acuracia': medias[ordenados[0]]})
+            if verbose:
+                print(f"[{nome}] rodada {rodada}: {len(restantes)} candidatos com {n_amostras} amostras, "
+                      f"melhor acurácia {medias[ordenados[0]] * 100:.2f}% {lista_candidatos[ordenados[0]]}")
+            restantes = ordenados[:max(1, math.ceil(len(restantes) / fator))]
+            if len(restantes) == 1 and n_amostras == max_amostras:
+                break
+
+    melhor = ordenados[0]
+    return {
+        'hiperparametros': lista_candidatos[melhor],
+        'acuracia_validacao': medias[melhor],
+        'rodadas': historico,
+        'checkpoint': checkpoint.caminho,
+    }
@@ -0,0 +1,230 @@
+# --- Caminho rápido para predição de um único registro ---
+# Extrai do pipeline salvo os parâmetros do StandardScaler, as tabelas de categorias do
+# OneHotEncoder e o classificador, montando um preditor que usa apenas NumPy (sem pandas e
+# sem ColumnTransformer) para transformar a entrada.
+#
+# Uso:
+#   python app_streamlit/rapido.py exportar     # salva models/rapido/<modelo>.pkl
+#   python app_streamlit/rapido.py verificar    # compara com model.predict em todo o Obesity.csv
+#   python app_streamlit/rapido.py benchmark    # latência por registro: pipeline x caminho rápido
+import argparse
+import copy
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_colunar import CAMINHO_DADOS, carregar_colunar
+from esquema import SINONIMOS_COLUNAS, TRADUCOES
+from modelos import CAMINHOS_MODELOS, DIRETORIO_MODELOS, carregar_modelo, salvar_modelo
+from traducao import preparar_dataframe
+
+DIRETORIO_RAPIDO = os.path.join(DIRETORIO_MODELOS, 'rapido')
+
+
+class PreditorRapido:
+    """Preditor NumPy equivalente a Pipeline(ColumnTransformer(StandardScaler, OneHotEncoder), classificador)."""
+
+    def __init__(self, colunas_numericas, medias, escalas, colunas_categoricas, categorias,
+                 classificador, feature_names_in):
+        self.colunas_numericas = list(colunas_numericas)
+        self.medias = np.asarray(medias, dtype=np.float64)
+        self.escalas = np.asarray(escalas, dtype=np.float64)
+        self.colunas_categoricas = list(colunas_categoricas)
+        self.categorias = [np.asarray(c, dtype=object) for c in categorias]
+        self.classificador = classificador
+        self.feature_names_in_ = np.asarray(feature_names_in, dtype=object)
+        self.classes_ = classificador.classes_
+        self._compilar()
+
+    def _compilar(self):
+        """Pré-calcula as posições de cada categoria no vetor de features."""
+        n_numericas = len(self.colunas_numericas)
+        self.n_features = n_numericas + sum(len(c) for c in self.categorias)
+        self.deslocamentos = []
+        self.indices_categorias = []
+        deslocamento = n_numericas
+        for coluna, categorias in zip(self.colunas_categoricas, self.categorias):
+            indices = {valor: deslocamento + i for i, valor in enumerate(categorias)}
+            # Respostas em pt-br apontam direto para a posição da categoria traduzida
+            for original, traduzido in TRADUCOES.get(coluna, {}).items():
+                if traduzido in indices:
+                    indices.setdefault(original, indices[traduzido])
+            self.deslocamentos.append(deslocamento)
+            self.indices_categorias.append(indices)
+            deslocamento += len(categorias)
+        self.posicao_imc = self.colunas_numericas.index('IMC') if 'IMC' in self.colunas_numericas else None
+        self._local = threading.local()
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        for chave in ('deslocamentos', 'indices_categorias', 'posicao_imc', 'n_features', '_local'):
+            estado.pop(chave, None)
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._compilar()
+
+    def _vetor(self):
+        # Vetor de features pré-alocado, um por thread para permitir uso concorrente
+        vetor = getattr(self._local, 'vetor', None)
+        if vetor is None:
+            vetor = self._local.vetor = np.zeros((1, self.n_features), dtype=np.float64)
+        return vetor
+
+    @staticmethod
+    def _valor(registro, coluna):
+        if coluna in registro:
+            return registro[coluna]
+        return registro[SINONIMOS_COLUNAS.get(coluna, coluna)]
+
+    def transformar_registro(self, registro):
+        """Monta o vetor de features de um registro (dict com respostas em pt-br ou inglês)."""
+        vetor = self._vetor()
+        linha = vetor[0]
+        linha[:] = 0.0
+        for i, coluna in enumerate(self.colunas_numericas):
+            if i == self.posicao_imc and 'IMC' not in registro:
+                altura = float(self._valor(registro, 'Height'))
+                linha[i] = float(self._valor(registro, 'Weight')) / (altura**2)
+            else:
+                linha[i] = float(self._valor(registro, coluna))
+        n_numericas = len(self.colunas_numericas)
+        linha[:n_numericas] -= self.medias
+        linha[:n_numericas] /= self.escalas
+        for coluna, indices in zip(self.colunas_categoricas, self.indices_categorias):
+            # Categorias desconhecidas ficam zeradas, como no handle_unknown='ignore'
+            posicao = indices.get(self._valor(registro, coluna))
+            if posicao is not None:
+                linha[posicao] = 1.0
+        return vetor
+
+    def transformar(self, df):
+        """Versão vetorizada de `transformar_registro` para um DataFrame já traduzido e com IMC."""
+        X = np.zeros((len(df), self.n_features), dtype=np.float64)
+        n_numericas = len(self.colunas_numericas)
+        X[:, :n_numericas] = df[self.colunas_numericas].to_numpy(dtype=np.float64)
+        X[:, :n_numericas] -= self.medias
+        X[:, :n_numericas] /= self.escalas
+        linhas = np.arange(len(df))
+        for coluna, categorias, deslocamento in zip(self.colunas_categoricas, self.categorias, self.deslocamentos):
+            codigos = pd.Categorical(df[coluna], categories=categorias).codes
+            conhecidos = codigos >= 0
+            X[linhas[conhecidos], deslocamento + codigos[conhecidos]] = 1.0
+        return X
+
+    def prever_registro(self, registro):
+        """Retorna a classe prevista para um único registro."""
+        return self.classificador.predict(self.transformar_registro(registro))[0]
+
+    def prever_proba_registro(self, registro):
+        """Retorna as probabilidades de cada classe (na ordem de `classes_`) para um único registro."""
+        return self.classificador.predict_proba(self.transformar_registro(registro))[0]
+
+    def predict(self, df):
+        return self.classificador.predict(self.transformar(df))
+
+    def predict_proba(self, df):
+        return self.classificador.predict_proba(self.transformar(df))
+
+
+def exportar_preditor(model, n_jobs=1):
+    """Extrai de um pipeline salvo os parâmetros necessários para o PreditorRapido."""
+    preprocessor = model.named_steps['preprocessor']
+    if preprocessor.sparse_output_:
+        raise ValueError("O caminho rápido só suporta pipelines cuja saída do pré-processamento é densa")
+
+    scaler = preprocessor.named_transformers_['num']
+    encoder = preprocessor.named_transformers_['cat']
+    colunas_numericas = preprocessor.transformers_[0][2]
+    colunas_categoricas = preprocessor.transformers_[1][2]
+    if encoder.drop_idx_ is not None or encoder.handle_unknown != 'ignore':
+        raise ValueError("O caminho rápido só suporta OneHotEncoder(handle_unknown='ignore') sem 'drop'")
+
+    # Uma predição de um registro não compensa o custo de distribuir o trabalho entre núcleos
+    classificador = copy.deepcopy(model.named_steps['classifier'])
+    if n_jobs is not None and 'n_jobs' in classificador.get_params():
+        classificador.set_params(n_jobs=n_jobs)
+
+    return PreditorRapido(
+        colunas_numericas, scaler.mean_, scaler.scale_,
+        colunas_categoricas, encoder.categories_,
+        classificador, model.feature_names_in_,
+    )
+
+
+def carregar_dados_verificacao():
+    """Lê 'Obesity.csv' (do cache colunar) no formato de entrada do modelo, sem a coluna alvo e o IMC."""
+    return carregar_colunar(CAMINHO_DADOS).drop(columns=['Obesity', 'IMC'])
+
+
+def verificar(model, preditor, df):
+    """Compara o caminho rápido com `model.predict` linha a linha e em lote.
+
+    Retorna o número de linhas em que as predições (ou probabilidades) divergem.
+    """
+    entrada = preparar_dataframe(df, model)
+    esperado = model.predict(entrada)
+    divergencias = int(np.sum(preditor.predict(entrada) != esperado))
+    for registro, classe in zip(df.to_dict('records'), esperado):
+        if preditor.prever_registro(registro) != classe:
+            divergencias += 1
+    if hasattr(model, 'predict_proba'):
+        esperado_proba = model.predict_proba(entrada)
+        divergencias += int(np.sum(np.any(preditor.predict_proba(entrada) != esperado_proba, axis=1)))
+    return divergencias
+
+
+def medir_latencia(funcao, registros, repeticoes=1):
+    """Latência média (ms) por registro chamando `funcao` uma vez por registro."""
+    funcao(registros[0])  # aquecimento
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for registro in registros:
+            funcao(registro)
+    return (time.perf_counter() - inicio) / (len(registros) * repeticoes) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caminho rápido (NumPy) para predição de um único registro.")
+    parser.add_argument('acao', choices=['exportar', 'verificar', 'benchmark'])
+    parser.add_argument('--modelos', nargs='+', default=list(CAMINHOS_MODELOS))
+    parser.add_argument('--registros', type=int, default=200, help="Registros usados no benchmark")
+    args = parser.parse_args()
+
+    df = carregar_dados_verificacao()
+    if args.acao == 'benchmark':
+        print(f"{'Modelo':<15}{'Pipeline (ms)':>15}{'Rápido (ms)':>14}{'Ganho':>8}")
+
+    for nome in args.modelos:
+        model = carregar_modelo(nome)
+        preditor = exportar_preditor(model)
+
+        if args.acao == 'exportar':
+            os.makedirs(DIRETORIO_RAPIDO, exist_ok=True)
+            destino = os.path.join(DIRETORIO_RAPIDO, os.path.basename(CAMINHOS_MODELOS[nome]))
+            salvar_modelo(preditor, destino)
+            print(f"Preditor rápido de '{nome}' salvo em '{destino}'")
+        elif args.acao == 'verificar':
+            divergencias = verificar(model, preditor, df)
+            situacao = "idênticas" if divergencias == 0 else f"{divergencias} divergências"
+            print(f"{nome}: {len(df)} linhas verificadas, predições {situacao}")
+        else:
+            registros = df.sample(n=args.registros, random_state=42).to_dict('records')
+
+            def prever_pipeline(registro):
+                entrada = preparar_dataframe(pd.DataFrame([registro]), model)
+                return model.predict(entrada)[0]
+
+            pipeline_ms = medir_latencia(prever_pipeline, registros)
+            rapido_ms = medir_latencia(preditor.prever_registro, registros)
+            print(f"{nome:<15}{pipeline_ms:>15.3f}{rapido_ms:>14.3f}{pipeline_ms / rapido_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    # Importa pelo nome do módulo para que o pickle referencie 'rapido.PreditorRapido', e não '__main__'
+    from rapido import main
+    main()
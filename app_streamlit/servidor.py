@@ -0,0 +1,166 @@
+# --- Servidor HTTP de predição ---
+# Carrega os pipelines uma única vez na inicialização e atende requisições JSON concorrentes.
+# Uso: python app_streamlit/servidor.py --porta 8000
+#
+# Endpoints:
+#   GET  /saude        -> situação do servidor e modelos carregados
+#   POST /prever       -> {"modelo": "SVM", "dados": {"Gender": "Feminino", "Age": 21, ...}}
+#   POST /prever_lote  -> {"modelo": "SVM", "dados": [{...}, {...}]}
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from esquema import EntradaInvalida
+from lote import prever_registros
+from microlote import MAX_ESPERA_MS_PADRAO, MAX_LOTE_PADRAO, MicroLoteEmSegundoPlano
+from modelos import CAMINHOS_MODELOS, MMAP_MODE_PADRAO, carregar_modelo
+
+MODELO_PADRAO = "Random Forest"
+
+
+def carregar_modelos(n_jobs=1):
+    """Carrega todos os pipelines salvos.
+
+    Com várias requisições em paralelo, cada predição usa um único núcleo (n_jobs=1)
+    para evitar que os classificadores disputem os mesmos núcleos entre si. Os arrays são
+    mapeados em memória, então vários processos do servidor compartilham as mesmas páginas.
+    """
+    modelos = {}
+    for nome in CAMINHOS_MODELOS:
+        model = carregar_modelo(nome, mmap_mode=MMAP_MODE_PADRAO)
+        classificador = model[-1] if hasattr(model, 'steps') else model
+        if n_jobs is not None and 'n_jobs' in classificador.get_params():
+            classificador.set_params(n_jobs=n_jobs)
+        modelos[nome] = model
+    return modelos
+
+
+class ManipuladorPredicao(BaseHTTPRequestHandler):
+    """Trata as requisições HTTP usando os modelos carregados no servidor."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if not self.server.silencioso:
+            super().log_message(format, *args)
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        if self.path == '/saude':
+            self._responder(200, {'status': 'ok', 'modelos': list(self.server.modelos)})
+        else:
+            self._responder(404, {'erro': f"Caminho não encontrado: '{self.path}'"})
+
+    def do_POST(self):
+        try:
+            tamanho = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            tamanho = -1
+        if tamanho < 0:
+            self._responder(400, {'erro': "Cabeçalho Content-Length inválido"})
+            return
+        try:
+            corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+        except json.JSONDecodeError as erro:
+            self._responder(400, {'erro': f"JSON inválido: {erro}"})
+            return
+        if not isinstance(corpo, dict):
+            self._responder(400, {'erro': "O corpo da requisição deve ser um objeto JSON"})
+            return
+
+        if self.path not in ('/prever', '/prever_lote'):
+            self._responder(404, {'erro': f"Caminho não encontrado: '{self.path}'"})
+            return
+
+        nome_modelo = corpo.get('modelo', MODELO_PADRAO)
+        model = self.server.modelos.get(nome_modelo)
+        if model is None:
+            self._responder(404, {'erro': f"Modelo desconhecido: '{nome_modelo}'",
+                                  'modelos': list(self.server.modelos)})
+            return
+
+        dados = corpo.get('dados')
+        lote = self.path == '/prever_lote'
+        if (lote and not isinstance(dados, list)) or (not lote and not isinstance(dados, dict)):
+            tipo = "uma lista de registros" if lote else "um registro (objeto JSON)"
+            self._responder(400, {'erro': f"O campo 'dados' deve ser {tipo}"})
+            return
+        if lote and not all(isinstance(registro, dict) for registro in dados):
+            self._responder(400, {'erro': "Cada item de 'dados' deve ser um registro (objeto JSON)"})
+            return
+        if lote and not dados:
+            self._responder(200, {'modelo': nome_modelo, 'resultados': []})
+            return
+
+        try:
+            if not lote and self.server.micro_lote is not None:
+                resultados = [self.server.micro_lote.prever(nome_modelo, dados)]
+            else:
+                resultados = prever_registros(model, dados if lote else [dados])
+        except EntradaInvalida as erro:
+            # Todos os valores inválidos da requisição de uma vez ('linha' é a posição do registro)
+            self._responder(400, {'erro': str(erro), 'invalidos': erro.erros()})
+            return
+        except KeyError as erro:
+            self._responder(400, {'erro': f"Campo obrigatório ausente: {erro}"})
+            return
+        except (ValueError, TypeError) as erro:
+            self._responder(400, {'erro': str(erro)})
+            return
+
+        if lote:
+            self._responder(200, {'modelo': nome_modelo, 'resultados': resultados})
+        else:
+            self._responder(200, {'modelo': nome_modelo, **resultados[0]})
+
+
+def criar_servidor(host, porta, modelos, silencioso=False, micro_lote=None):
+    """Cria o servidor HTTP (uma thread por conexão) com os modelos já carregados.
+
+    Se `micro_lote` for informado, as requisições de um único registro passam pelo
+    agendador de micro-lotes em vez de chamar o modelo individualmente.
+    """
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorPredicao)
+    servidor.daemon_threads = True
+    servidor.modelos = modelos
+    servidor.silencioso = silencioso
+    servidor.micro_lote = micro_lote
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP de predição de níveis de obesidade.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--silencioso', action='store_true', help="Não registra cada requisição no terminal")
+    parser.add_argument('--microlote', action='store_true',
+                        help="Agrupa requisições simultâneas de /prever em uma única predição vetorizada")
+    parser.add_argument('--max-lote', type=int, default=MAX_LOTE_PADRAO, help="Máximo de registros por micro-lote")
+    parser.add_argument('--max-espera-ms', type=float, default=MAX_ESPERA_MS_PADRAO,
+                        help="Tempo máximo de espera para completar um micro-lote")
+    args = parser.parse_args()
+
+    modelos = carregar_modelos()
+    print(f"Modelos carregados: {', '.join(modelos)}")
+    micro_lote = MicroLoteEmSegundoPlano(modelos, args.max_lote, args.max_espera_ms) if args.microlote else None
+    servidor = criar_servidor(args.host, args.porta, modelos, args.silencioso, micro_lote)
+    print(f"Servidor de predição em http://{args.host}:{args.porta}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        if micro_lote is not None:
+            micro_lote.encerrar()
+
+
+if __name__ == '__main__':
+    main()
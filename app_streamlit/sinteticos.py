@@ -0,0 +1,68 @@
+# --- Gerador de dados sintéticos no formato de 'Obesity.csv' ---
+# Sorteia linhas reais do dataset e aplica um pequeno ruído gaussiano às colunas contínuas,
+# mantendo as respostas categóricas e a classe da linha sorteada. Gera arquivos de qualquer
+# tamanho bloco a bloco, sem manter o arquivo inteiro em memória.
+#
+# Uso: python app_streamlit/sinteticos.py dados_sinteticos.csv --linhas 5000000
+import argparse
+import time
+
+import numpy as np
+
+from dataset_colunar import CAMINHO_DADOS, carregar_colunar
+
+# Colunas numéricas que recebem ruído (as escalas do questionário ficam nos limites observados)
+COLUNAS_CONTINUAS = ['Age', 'Height', 'Weight', 'FCVC', 'NCP', 'CH2O', 'FAF', 'TUE']
+COLUNAS_ESCALAS = ['FCVC', 'NCP', 'CH2O', 'FAF', 'TUE']
+
+
+def gerar_blocos(n_linhas, tamanho_bloco=100_000, ruido=0.05, inteiros=False, semente=42,
+                 caminho_base=CAMINHO_DADOS):
+    """Gerador de DataFrames sintéticos com no máximo `tamanho_bloco` linhas cada.
+
+    `ruido` é o desvio padrão do ruído como fração do desvio padrão de cada coluna. Com
+    `inteiros=True`, as escalas do questionário (FCVC, NCP, CH2O, FAF, TUE) são arredondadas,
+    como nas respostas da interface.
+    """
+    base = carregar_colunar(caminho_base).drop(columns='IMC')
+    rng = np.random.default_rng(semente)
+    desvios = base[COLUNAS_CONTINUAS].std()
+    minimos, maximos = base[COLUNAS_CONTINUAS].min(), base[COLUNAS_CONTINUAS].max()
+    for inicio in range(0, n_linhas, tamanho_bloco):
+        n = min(tamanho_bloco, n_linhas - inicio)
+        bloco = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+        for coluna in COLUNAS_CONTINUAS:
+            valores = bloco[coluna].to_numpy() + rng.normal(0, ruido * desvios[coluna], n)
+            bloco[coluna] = np.clip(valores, minimos[coluna], maximos[coluna])
+        if inteiros:
+            bloco[COLUNAS_ESCALAS] = bloco[COLUNAS_ESCALAS].round().astype(int)
+        bloco['Age'] = bloco['Age'].round(1)
+        bloco['Height'] = bloco['Height'].round(2)
+        bloco['Weight'] = bloco['Weight'].round(1)
+        yield bloco
+
+
+def gerar_csv(caminho_saida, n_linhas, tamanho_bloco=100_000, ruido=0.05, inteiros=False, semente=42):
+    """Grava `n_linhas` sintéticas em um CSV, bloco a bloco."""
+    for i, bloco in enumerate(gerar_blocos(n_linhas, tamanho_bloco, ruido, inteiros, semente)):
+        bloco.to_csv(caminho_saida, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético no formato de 'Obesity.csv'.")
+    parser.add_argument('saida', help="Arquivo CSV de saída")
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--tamanho-bloco', type=int, default=100_000)
+    parser.add_argument('--ruido', type=float, default=0.05,
+                        help="Desvio padrão do ruído, como fração do desvio padrão de cada coluna")
+    parser.add_argument('--inteiros', action='store_true', help="Arredonda as escalas do questionário")
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    gerar_csv(args.saida, args.linhas, args.tamanho_bloco, args.ruido, args.inteiros, args.semente)
+    print(f"{args.linhas} linhas gravadas em '{args.saida}' em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
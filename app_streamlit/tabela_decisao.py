@@ -0,0 +1,403 @@
+# --- Tabela de decisão pré-calculada ---
+# Com exceção de Idade, Altura e Peso, todas as respostas do questionário são discretas. Este
+# módulo enumera as combinações das respostas discretas e guarda, para cada uma, a classe prevista
+# pelo modelo em uma grade de faixas de Idade x IMC. Na predição, a classe é obtida por indexação
+# direta de um array (O(1)); fora das faixas ou combinações tabeladas, usa-se o modelo exato.
+#
+# A Altura e o Peso de cada célula são aproximados: usa-se a altura mediana do gênero no dataset
+# e o peso que resulta no IMC do centro da faixa. A tabela é gerada a partir da parte de treino
+# da divisão de treinar.py; a cobertura e a divergência em relação ao pipeline exato são medidas
+# na parte de teste e em questionários sintéticos (respostas sorteadas entre as opções do
+# formulário). Uma tabela que diverge do modelo acima de `--max-divergencia` não é salva.
+#
+# Uso:
+#   python app_streamlit/tabela_decisao.py gerar --passo-idade 2 --passo-imc 1
+#   python app_streamlit/tabela_decisao.py gerar --combinacoes todas   # todas as combinações (lento)
+#   python app_streamlit/tabela_decisao.py validar
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Só o necessário para carregar e consultar a tabela: a interface importa este módulo na
+# inicialização, e as bibliotecas de machine learning só devem ser importadas na carga do modelo
+from cache_predicoes import HashArquivos
+from esquema import ESQUEMA, SINONIMOS_COLUNAS, TRADUCOES
+from modelos import CAMINHOS_MODELOS, DIRETORIO_MODELOS, carregar_modelo, salvar_modelo
+from traducao import preparar_dataframe
+
+DIRETORIO_TABELAS = os.path.join(DIRETORIO_MODELOS, 'tabelas')
+
+# Respostas possíveis de cada pergunta discreta (valores em inglês, como no dataset)
+CATEGORIAS_DISCRETAS = {
+    'Gender': ['Female', 'Male'],
+    'family_history': ['no', 'yes'],
+    'FAVC': ['no', 'yes'],
+    'FCVC': [1, 2, 3],
+    'NCP': [1, 2, 3, 4],
+    'CAEC': ['no', 'Sometimes', 'Frequently', 'Always'],
+    'SMOKE': ['no', 'yes'],
+    'CH2O': [1, 2, 3],
+    'SCC': ['no', 'yes'],
+    'FAF': [0, 1, 2, 3],
+    'TUE': [0, 1, 2],
+    'CALC': ['no', 'Sometimes', 'Frequently', 'Always'],
+    'MTRANS': ['Public_Transportation', 'Automobile', 'Walking', 'Motorbike', 'Bike'],
+}
+
+# Linhas enviadas ao modelo por vez durante a geração
+TAMANHO_BLOCO = 200_000
+
+# Divergência final máxima (fração das predições diferentes do modelo exato) aceita na validação
+MAX_DIVERGENCIA_PADRAO = 0.02
+# Questionários sintéticos usados na validação
+FORMULARIOS_PADRAO = 20_000
+
+_hash_arquivos = HashArquivos()
+
+
+def _valor_coluna(registro, coluna):
+    if coluna in registro:
+        return registro[coluna]
+    return registro.get(SINONIMOS_COLUNAS.get(coluna))
+
+
+class TabelaDecisao:
+    """Classe prevista por combinação de respostas discretas e faixa de Idade x IMC.
+
+    As combinações são numeradas em base mista (uma "casa" por pergunta). `linhas` leva o
+    número da combinação à linha de `predicoes` (ou -1 se a combinação não foi tabelada);
+    `linhas=None` indica que todas as combinações foram tabeladas, na ordem da numeração.
+    """
+
+    def __init__(self, classes, categorias, faixa_idade, faixa_imc, alturas_referencia, linhas, predicoes,
+                 hash_modelo=None):
+        self.classes = np.asarray(classes)
+        self.categorias = categorias
+        self.faixa_idade = faixa_idade  # (início, passo, número de faixas)
+        self.faixa_imc = faixa_imc
+        self.alturas_referencia = alturas_referencia
+        self.linhas = linhas
+        self.predicoes = predicoes
+        self.hash_modelo = hash_modelo
+        self._compilar()
+
+    def _compilar(self):
+        """Monta os índices de cada resposta (também em pt-br) e o peso de cada pergunta na numeração."""
+        self._indices = {}
+        self._pesos = {}
+        peso = 1
+        for coluna in reversed(list(self.categorias)):
+            valores = self.categorias[coluna]
+            indices = {valor: i for i, valor in enumerate(valores)}
+            for original, traduzido in TRADUCOES.get(coluna, {}).items():
+                if traduzido in indices:
+                    indices[original] = indices[traduzido]
+            self._indices[coluna] = indices
+            self._pesos[coluna] = peso
+            peso *= len(valores)
+        self.n_combinacoes = peso
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        for atributo in ('_indices', '_pesos', 'n_combinacoes'):
+            estado.pop(atributo, None)
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._compilar()
+
+    @property
+    def n_tabeladas(self):
+        return self.predicoes.shape[0]
+
+    def _indice_resposta(self, coluna, valor):
+        if valor is None:
+            return None
+        if isinstance(self.categorias[coluna][0], int):
+            # Perguntas em escala: o dataset tem valores fracionários, a interface só inteiros
+            try:
+                valor = int(round(float(valor)))
+            except (TypeError, ValueError):
+                return None
+        return self._indices[coluna].get(valor)
+
+    @staticmethod
+    def _faixa(valor, faixa):
+        inicio, passo, n_faixas = faixa
+        indice = math.floor((valor - inicio) / passo)
+        return indice if 0 <= indice < n_faixas else None
+
+    def celula(self, registro):
+        """Posição (linha, faixa de idade, faixa de IMC) do registro, ou None se não estiver tabelado."""
+        codigo = 0
+        for coluna, peso in self._pesos.items():
+            indice = self._indice_resposta(coluna, _valor_coluna(registro, coluna))
+            if indice is None:
+                return None
+            codigo += indice * peso
+        linha = codigo if self.linhas is None else int(self.linhas[codigo])
+        if linha < 0:
+            return None
+        try:
+            idade = float(registro['Age'])
+            imc = float(registro['IMC']) if 'IMC' in registro else float(registro['Weight']) / float(registro['Height'])**2
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            return None
+        faixa_idade = self._faixa(idade, self.faixa_idade)
+        faixa_imc = self._faixa(imc, self.faixa_imc)
+        if faixa_idade is None or faixa_imc is None:
+            return None
+        return linha, faixa_idade, faixa_imc
+
+    def prever_registro(self, registro):
+        """Classe tabelada para um único questionário (dict), ou None se estiver fora da tabela."""
+        celula = self.celula(registro)
+        if celula is None:
+            return None
+        return self.classes[self.predicoes[celula]]
+
+    def prever(self, registro, model):
+        """Classe tabelada ou, fora da tabela, a predição do modelo exato."""
+        classe = self.prever_registro(registro)
+        if classe is None:
+            classe = model.predict(preparar_dataframe(pd.DataFrame([registro]), model))[0]
+        return classe
+
+    def codigos_dataframe(self, df):
+        """Número da combinação de cada linha do DataFrame (-1 para respostas desconhecidas)."""
+        codigos = np.zeros(len(df), dtype=np.int64)
+        validos = np.ones(len(df), dtype=bool)
+        for coluna, peso in self._pesos.items():
+            origem = coluna if coluna in df.columns else SINONIMOS_COLUNAS.get(coluna)
+            if origem not in df.columns:
+                return np.full(len(df), -1, dtype=np.int64)
+            valores = df[origem]
+            if isinstance(self.categorias[coluna][0], int):
+                valores = pd.to_numeric(valores, errors='coerce').round()
+            indices = valores.map(self._indices[coluna]).to_numpy(dtype=float)
+            validos &= ~np.isnan(indices)
+            codigos += np.nan_to_num(indices).astype(np.int64) * peso
+        codigos[~validos] = -1
+        return codigos
+
+    def prever_dataframe(self, df):
+        """Versão vetorizada: retorna (classes, mascara), com mascara=False nas linhas fora da tabela."""
+        codigos = self.codigos_dataframe(df)
+        if self.linhas is None:
+            linhas = codigos
+        else:
+            linhas = np.where(codigos >= 0, self.linhas[np.maximum(codigos, 0)], -1).astype(np.int64)
+        imc = df['IMC'] if 'IMC' in df.columns else df['Weight'] / df['Height']**2
+        faixas = []
+        for valores, (inicio, passo, n_faixas) in ((df['Age'], self.faixa_idade), (imc, self.faixa_imc)):
+            indice = np.floor((pd.to_numeric(valores, errors='coerce').to_numpy(dtype=float) - inicio) / passo)
+            faixas.append(np.where((indice >= 0) & (indice < n_faixas), indice, -1).astype(np.int64))
+        mascara = (linhas >= 0) & (faixas[0] >= 0) & (faixas[1] >= 0)
+        classes = np.full(len(df), None, dtype=object)
+        classes[mascara] = self.classes[self.predicoes[linhas[mascara], faixas[0][mascara], faixas[1][mascara]]]
+        return classes, mascara
+
+
+def _definir_faixa(valores, passo):
+    """(início, passo, número de faixas) cobrindo os valores observados."""
+    inicio = math.floor(valores.min() / passo) * passo
+    n_faixas = math.floor((valores.max() - inicio) / passo) + 1
+    return float(inicio), float(passo), int(n_faixas)
+
+
+def gerar_tabela(model, df_referencia, passo_idade=2.0, passo_imc=1.0, combinacoes='observadas',
+                 tamanho_bloco=TAMANHO_BLOCO, hash_modelo=None):
+    """Calcula a tabela de decisão do modelo.
+
+    `df_referencia` (no formato de 'Obesity.csv') define as faixas de Idade e IMC cobertas, a
+    altura de referência de cada gênero e, com `combinacoes='observadas'`, quais combinações de
+    respostas discretas são tabeladas. Com `combinacoes='todas'`, todas as combinações possíveis
+    são tabeladas (cerca de 1,1 milhão, vezes o número de células de Idade x IMC).
+    """
+    from compactar import menor_inteiro
+
+    df_referencia = preparar_dataframe(df_referencia, model)
+    faixa_idade = _definir_faixa(df_referencia['Age'], passo_idade)
+    faixa_imc = _definir_faixa(df_referencia['IMC'], passo_imc)
+    alturas_referencia = df_referencia.groupby('Gender', observed=True)['Height'].median().to_dict()
+
+    classes = np.asarray(model.classes_)
+    tabela = TabelaDecisao(classes, CATEGORIAS_DISCRETAS, faixa_idade, faixa_imc, alturas_referencia,
+                           linhas=None, predicoes=np.zeros((0, 0, 0), dtype=np.uint8))
+    if combinacoes == 'todas':
+        tabeladas = np.arange(tabela.n_combinacoes)
+        linhas = None
+    else:
+        codigos = tabela.codigos_dataframe(df_referencia)
+        tabeladas = np.unique(codigos[codigos >= 0])
+        linhas = np.full(tabela.n_combinacoes, -1, dtype=menor_inteiro(len(tabeladas)))
+        linhas[tabeladas] = np.arange(len(tabeladas))
+
+    # Centro de cada faixa; todas as células de uma combinação formam uma grade Idade x IMC
+    centros_idade = faixa_idade[0] + (np.arange(faixa_idade[2]) + 0.5) * faixa_idade[1]
+    centros_imc = faixa_imc[0] + (np.arange(faixa_imc[2]) + 0.5) * faixa_imc[1]
+    grade_idade, grade_imc = (g.ravel() for g in np.meshgrid(centros_idade, centros_imc, indexing='ij'))
+    n_celulas = len(grade_idade)
+
+    # Índice da classe em model.classes_ (são só 7 classes)
+    predicoes = np.empty((len(tabeladas), faixa_idade[2], faixa_imc[2]), dtype=np.uint8)
+    combinacoes_por_bloco = max(1, tamanho_bloco // n_celulas)
+    for inicio in range(0, len(tabeladas), combinacoes_por_bloco):
+        bloco = tabeladas[inicio:inicio + combinacoes_por_bloco]
+        codigos = np.repeat(bloco, n_celulas)
+        entrada = {}
+        for coluna, valores in CATEGORIAS_DISCRETAS.items():
+            indices = (codigos // tabela._pesos[coluna]) % len(valores)
+            entrada[coluna] = np.asarray(valores, dtype=object)[indices]
+        entrada['Age'] = np.tile(grade_idade, len(bloco))
+        imc = np.tile(grade_imc, len(bloco))
+        entrada['Height'] = pd.Series(entrada['Gender']).map(alturas_referencia).to_numpy(dtype=float)
+        entrada['Weight'] = imc * entrada['Height']**2
+        df_bloco = pd.DataFrame(entrada)
+        ESQUEMA.colunas_modelo(model).aplicar(df_bloco)
+        df_bloco['IMC'] = imc
+        previstas = np.searchsorted(classes, model.predict(df_bloco))
+        predicoes[inicio:inicio + len(bloco)] = previstas.reshape(len(bloco), faixa_idade[2], faixa_imc[2])
+
+    return TabelaDecisao(classes, CATEGORIAS_DISCRETAS, faixa_idade, faixa_imc, alturas_referencia,
+                         linhas, predicoes, hash_modelo)
+
+
+def caminho_tabela(nome_ou_caminho, diretorio=DIRETORIO_TABELAS):
+    """Arquivo da tabela de decisão de um modelo (mesmo nome do arquivo .pkl)."""
+    return os.path.join(diretorio, os.path.basename(CAMINHOS_MODELOS.get(nome_ou_caminho, nome_ou_caminho)))
+
+
+def carregar_tabela(caminho_modelo, diretorio=DIRETORIO_TABELAS):
+    """Carrega a tabela do modelo, ou retorna None se ela não existir ou for de outra versão do modelo."""
+    caminho = caminho_tabela(caminho_modelo, diretorio)
+    if not os.path.exists(caminho):
+        return None
+    import joblib
+    tabela = joblib.load(caminho)
+    if tabela.hash_modelo is not None and tabela.hash_modelo != _hash_arquivos.obter(caminho_modelo):
+        return None
+    return tabela
+
+
+def gerar_formularios(df_referencia, n, semente=42):
+    """Questionários sintéticos como os enviados pelo formulário da interface.
+
+    Cada resposta discreta é sorteada entre as opções do formulário, independentemente das demais
+    (a maior parte das combinações não aparece no dataset). Idade e o par Altura/Peso são
+    sorteados de linhas de `df_referencia`.
+    """
+    rng = np.random.default_rng(semente)
+    formularios = {
+        coluna: np.asarray(valores, dtype=object)[rng.integers(0, len(valores), n)]
+        for coluna, valores in CATEGORIAS_DISCRETAS.items()
+    }
+    formularios['Age'] = df_referencia['Age'].to_numpy()[rng.integers(0, len(df_referencia), n)].round()
+    linhas = rng.integers(0, len(df_referencia), n)
+    formularios['Height'] = df_referencia['Height'].to_numpy()[linhas]
+    formularios['Weight'] = df_referencia['Weight'].to_numpy()[linhas]
+    return pd.DataFrame(formularios)
+
+
+def validar(tabela, model, df):
+    """Compara a tabela com o pipeline exato linha a linha.
+
+    Retorna a cobertura (fração das linhas dentro da tabela), a divergência entre as linhas
+    cobertas e a divergência final, já com o modelo exato nas linhas fora da tabela.
+    """
+    exatas = model.predict(preparar_dataframe(df, model))
+    tabeladas, mascara = tabela.prever_dataframe(df)
+    divergentes = mascara & (tabeladas != exatas)
+    return {
+        'linhas': len(df),
+        'cobertura': float(np.mean(mascara)),
+        'divergencia_tabeladas': float(divergentes.sum() / max(1, mascara.sum())),
+        'divergencia_final': float(np.mean(divergentes)),
+    }
+
+
+def main():
+    from rapido import medir_latencia
+    from treinar import dividir_dataset
+
+    parser = argparse.ArgumentParser(description="Tabela de decisão pré-calculada por faixas de Idade x IMC.")
+    parser.add_argument('acao', choices=['gerar', 'validar'])
+    parser.add_argument('--modelos', nargs='+', default=list(CAMINHOS_MODELOS))
+    parser.add_argument('--passo-idade', type=float, default=2.0, help="Largura das faixas de idade (anos)")
+    parser.add_argument('--passo-imc', type=float, default=1.0, help="Largura das faixas de IMC (kg/m²)")
+    parser.add_argument('--combinacoes', choices=['observadas', 'todas'], default='observadas',
+                        help="Combinações de respostas tabeladas: as da parte de treino ou todas as possíveis")
+    parser.add_argument('--formularios', type=int, default=FORMULARIOS_PADRAO,
+                        help="Questionários sintéticos usados na validação")
+    parser.add_argument('--max-divergencia', type=float, default=MAX_DIVERGENCIA_PADRAO,
+                        help="Divergência final máxima aceita (fração) nos dados de validação")
+    parser.add_argument('--registros', type=int, default=200, help="Registros usados na medição de latência")
+    parser.add_argument('--diretorio', default=DIRETORIO_TABELAS)
+    args = parser.parse_args()
+
+    # A tabela só vê a parte de treino; a validação usa a parte de teste e questionários sintéticos
+    X_treino, X_teste, _, _ = dividir_dataset()
+    X_treino, X_teste = (X.drop(columns='IMC').astype({c: object for c in CATEGORIAS_DISCRETAS if c in X})
+                         for X in (X_treino, X_teste))
+    conjuntos = {'teste': X_teste, 'formulários': gerar_formularios(X_treino, args.formularios)}
+    print(f"{'Modelo':<15}{'Dados':<13}{'Cobertura':>11}{'Div. tabela':>13}{'Div. final':>12}")
+
+    reprovados = []
+    for nome in args.modelos:
+        model = carregar_modelo(nome)
+        if args.acao == 'gerar':
+            inicio = time.perf_counter()
+            tabela = gerar_tabela(model, X_treino, args.passo_idade, args.passo_imc, args.combinacoes,
+                                  hash_modelo=_hash_arquivos.obter(CAMINHOS_MODELOS[nome]))
+            duracao = time.perf_counter() - inicio
+        else:
+            tabela = carregar_tabela(CAMINHOS_MODELOS[nome], args.diretorio)
+            if tabela is None:
+                print(f"{nome}: tabela ausente ou desatualizada, execute a ação 'gerar'")
+                continue
+
+        divergencia = 0.0
+        for rotulo, df in conjuntos.items():
+            resultado = validar(tabela, model, df)
+            divergencia = max(divergencia, resultado['divergencia_final'])
+            print(f"{nome:<15}{rotulo:<13}{resultado['cobertura'] * 100:>10.2f}%"
+                  f"{resultado['divergencia_tabeladas'] * 100:>12.2f}%{resultado['divergencia_final'] * 100:>11.2f}%")
+        aprovada = divergencia <= args.max_divergencia
+        if not aprovada:
+            reprovados.append(nome)
+            print(f"{nome}: divergência de {divergencia * 100:.2f}% acima do limite de "
+                  f"{args.max_divergencia * 100:.2f}% (use passos menores ou o modelo exato)")
+
+        if args.acao == 'gerar':
+            destino = caminho_tabela(nome, args.diretorio)
+            if not aprovada:
+                # Uma tabela antiga deste modelo também não deve continuar em uso
+                if os.path.exists(destino):
+                    os.remove(destino)
+                continue
+            os.makedirs(args.diretorio, exist_ok=True)
+            salvar_modelo(tabela, destino, compress=3)
+            print(f"{nome}: {tabela.n_tabeladas} combinações x {tabela.faixa_idade[2]} faixas de idade x "
+                  f"{tabela.faixa_imc[2]} faixas de IMC em {duracao:.1f}s, "
+                  f"{os.path.getsize(destino) / 1024:.0f} KB em '{destino}'")
+        else:
+            registros = X_teste.sample(n=min(args.registros, len(X_teste)), random_state=42).to_dict('records')
+            pipeline_ms = medir_latencia(
+                lambda registro: model.predict(preparar_dataframe(pd.DataFrame([registro]), model))[0], registros
+            )
+            tabela_ms = medir_latencia(lambda registro: tabela.prever(registro, model), registros)
+            print(f"{nome}: {pipeline_ms:.3f} ms por registro no pipeline, {tabela_ms:.3f} ms com a tabela")
+
+    if reprovados:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    # Importa pelo nome do módulo para que o pickle referencie 'tabela_decisao.TabelaDecisao'
+    from tabela_decisao import main
+    main()
@@ -0,0 +1,33 @@
+# --- Tradução e preparação das entradas para os modelos ---
+# Funções compartilhadas entre a interface Streamlit e a pontuação em lote. Os vocabulários, a
+# validação e a tradução das respostas ficam no esquema (esquema.py).
+from esquema import ESQUEMA
+
+# Tradução das classes previstas do inglês para pt-br
+TRADUCOES_PREDICAO = {
+    'Insufficient Weight': 'Peso Insuficiente',
+    'Normal Weight': 'Peso Normal',
+    'Overweight Level I': 'Sobrepeso Nível I',
+    'Overweight Level II': 'Sobrepeso Nível II',
+    'Obesity Type I': 'Obesidade Tipo I',
+    'Obesity Type II': 'Obesidade Tipo II',
+    'Obesity Type III': 'Obesidade Tipo III'
+}
+
+
+def traduzir_predicao_para_portugues(prediction_text):
+    """Traduz o resultado da predição do inglês para pt-br."""
+    return TRADUCOES_PREDICAO.get(prediction_text, prediction_text)
+
+
+def preparar_dataframe(df, model, validar=True):
+    """Aplica nomes de coluna, validação, tradução e IMC a um DataFrame no formato de 'Obesity.csv'.
+
+    Levanta EntradaInvalida (um ValueError) com todas as linhas inválidas de uma vez.
+    """
+    return ESQUEMA.preparar(df, model, validar)
+
+
+def colunas_faltantes(df, model):
+    """Retorna as colunas esperadas pelo modelo que não estão presentes no DataFrame."""
+    return ESQUEMA.colunas_modelo(model).faltantes(df)
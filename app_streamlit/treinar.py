@@ -0,0 +1,280 @@
+# --- Treinamento dos modelos de classificação de obesidade ---
+# Substitui os scripts KNN.py, RandomForest.py e SVM.py: o pré-processamento é ajustado uma
+# única vez e as matrizes de treino/teste transformadas ficam em cache no disco (chave: hash do
+# dataset); os classificadores são treinados em paralelo, um por processo.
+#
+# Uso:
+#   python app_streamlit/treinar.py                    # treina todos os modelos
+#   python app_streamlit/treinar.py --modelos SVM      # só o SVM (reaproveita o cache)
+#   python app_streamlit/treinar.py --otimizar         # busca hiperparâmetros antes de treinar
+#   python app_streamlit/treinar.py --indice-knn aproximado   # KNN com índice de vizinhos aproximado
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import joblib
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.svm import SVC
+
+from dataset_colunar import CAMINHO_DADOS, DIRETORIO_CACHE, carregar_colunar
+from esquema import COLUNA_ALVO, ESQUEMA, EntradaInvalida
+from modelos import CAMINHOS_MODELOS, DIRETORIO_MODELOS, salvar_modelo
+from vizinhos import INDICES, KNNIndexado
+
+ARQUIVO_METRICAS = 'metricas.json'
+
+# Configuração da divisão treino/teste, a mesma dos scripts originais.
+# Qualquer mudança aqui (ou no pré-processamento) gera uma nova chave de cache.
+CONFIG_DIVISAO = {'test_size': 0.2, 'random_state': 42}
+VERSAO_PREPROCESSAMENTO = 2
+
+# Nome do modelo -> (classe do classificador, hiperparâmetros)
+CLASSIFICADORES = {
+    "KNN": (KNeighborsClassifier, {'n_neighbors': 5, 'n_jobs': -1}),
+    "Random Forest": (RandomForestClassifier, {'n_estimators': 100, 'random_state': 42, 'n_jobs': -1}),
+    "SVM": (SVC, {'kernel': 'rbf', 'probability': True, 'random_state': 42}),
+}
+
+# Índices de vizinhos do KNN: 'sklearn' mantém o KNeighborsClassifier; os demais usam o KNNIndexado
+INDICES_KNN = ['sklearn', *INDICES]
+
+
+def hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    """Calcula o SHA-256 do conteúdo de um arquivo."""
+    sha256 = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+
+def chave_cache(hash_dataset):
+    """Chave do cache de pré-processamento: dataset + configuração da divisão e do pré-processamento."""
+    configuracao = json.dumps({**CONFIG_DIVISAO, 'versao': VERSAO_PREPROCESSAMENTO}, sort_keys=True)
+    return hashlib.sha256(f"{hash_dataset}:{configuracao}".encode()).hexdigest()[:16]
+
+
+def carregar_dataset(caminho_dados=CAMINHO_DADOS, diretorio_cache=DIRETORIO_CACHE):
+    """Lê o dataset (com o IMC já calculado) do cache colunar e separa features (X) e alvo (y).
+
+    As respostas e as classes passam pelo mesmo esquema usado na predição: são traduzidas para as
+    categorias em inglês e qualquer valor inválido interrompe o treino (EntradaInvalida) com o
+    relatório de todas as linhas afetadas.
+    """
+    df = ESQUEMA.traduzir(carregar_colunar(caminho_dados, diretorio_cache), com_alvo=True)
+    y = df[COLUNA_ALVO]
+    X = df.drop(COLUNA_ALVO, axis=1)
+    return X, y
+
+
+def dividir_dataset(caminho_dados=CAMINHO_DADOS, diretorio_cache=DIRETORIO_CACHE):
+    """Divide o dataset em treino e teste com a configuração fixa de CONFIG_DIVISAO."""
+    X, y = carregar_dataset(caminho_dados, diretorio_cache)
+    # 'stratify=y' garante que a proporção das classes seja a mesma no treino e no teste
+    return train_test_split(X, y, stratify=y, **CONFIG_DIVISAO)
+
+
+def criar_preprocessador(X):
+    """Cria o ColumnTransformer: padronização das numéricas e One-Hot das categóricas."""
+    numerical_features = X.select_dtypes(include=['int64', 'float64']).columns
+    categorical_features = X.select_dtypes(include=['object', 'category']).columns
+    return ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numerical_features),
+            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
+        ]
+    )
+
+
+def preprocessar(caminho_dados=CAMINHO_DADOS, diretorio_cache=DIRETORIO_CACHE):
+    """Ajusta o pré-processamento e salva as matrizes transformadas, se ainda não estiverem em cache.
+
+    Retorna o caminho do arquivo de cache e se ele já existia.
+    """
+    hash_dataset = hash_arquivo(caminho_dados)
+    caminho_cache = os.path.join(diretorio_cache, f"preprocessamento_{chave_cache(hash_dataset)}.joblib")
+    if os.path.exists(caminho_cache):
+        return caminho_cache, True
+
+    X_train, X_test, y_train, y_test = dividir_dataset(caminho_dados, diretorio_cache)
+    preprocessor = criar_preprocessador(X_train)
+    X_train_t = preprocessor.fit_transform(X_train)
+    X_test_t = preprocessor.transform(X_test)
+
+    os.makedirs(diretorio_cache, exist_ok=True)
+    # Grava em um arquivo temporário e renomeia, para que um treino interrompido não deixe cache corrompido
+    temporario = f"{caminho_cache}.{os.getpid()}.tmp"
+    joblib.dump({
+        'hash_dataset': hash_dataset,
+        'preprocessor': preprocessor,
+        'X_train': X_train_t, 'X_test': X_test_t,
+        'y_train': y_train.to_numpy(), 'y_test': y_test.to_numpy(),
+    }, temporario)
+    os.replace(temporario, caminho_cache)
+    return caminho_cache, False
+
+
+def treinar_modelo(nome, caminho_cache, diretorio_saida, n_jobs_treino=None, ajustes=None, indice_knn='sklearn'):
+    """Treina um classificador sobre as matrizes em cache e salva o pipeline completo (.pkl).
+
+    Executado em um processo separado para cada modelo. `ajustes` substitui hiperparâmetros
+    padrão de CLASSIFICADORES (ex: os encontrados pela otimização) e `indice_knn` escolhe o
+    índice de vizinhos do KNN (ver INDICES_KNN). Retorna as métricas do modelo.
+    """
+    # Os arrays do cache são mapeados em memória: os processos não copiam os dados entre si
+    dados = joblib.load(caminho_cache, mmap_mode='r')
+    classe, parametros = CLASSIFICADORES[nome]
+    parametros = {**parametros, **(ajustes or {})}
+    if nome == "KNN" and indice_knn != 'sklearn':
+        # O índice escolhido é construído no fit e salvo dentro do .pkl junto com o classificador
+        classe = KNNIndexado
+        parametros = {**parametros, 'indice': indice_knn}
+    classificador = classe(**parametros)
+    if n_jobs_treino is not None and 'n_jobs' in parametros:
+        # Durante o treino em paralelo, cada processo usa só a sua parte dos núcleos
+        classificador.set_params(n_jobs=n_jobs_treino)
+
+    inicio = time.perf_counter()
+    classificador.fit(dados['X_train'], dados['y_train'])
+    tempo_treino = time.perf_counter() - inicio
+    # O modelo salvo mantém os hiperparâmetros configurados (ex: n_jobs=-1 para a predição)
+    classificador.set_params(**{k: v for k, v in parametros.items() if k == 'n_jobs'})
+
+    y_test = dados['y_test']
+    y_pred = classificador.predict(dados['X_test'])
+    model_pipeline = Pipeline(steps=[
+        ('preprocessor', dados['preprocessor']),
+        ('classifier', classificador)
+    ])
+    destino = os.path.join(diretorio_saida, os.path.basename(CAMINHOS_MODELOS[nome]))
+    salvar_modelo(model_pipeline, destino)
+
+    return {
+        'arquivo': os.path.basename(destino),
+        'classificador': classe.__name__,
+        'hiperparametros': parametros,
+        'acuracia': accuracy_score(y_test, y_pred),
+        'tempo_treino_s': tempo_treino,
+        'matriz_confusao': confusion_matrix(y_test, y_pred).tolist(),
+        'relatorio_classificacao': classification_report(y_test, y_pred, output_dict=True),
+        'hash_dataset': dados['hash_dataset'],
+        'treinado_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def salvar_metricas(metricas, diretorio_saida):
+    """Atualiza o arquivo de métricas, mantendo as dos modelos que não foram retreinados."""
+    caminho = os.path.join(diretorio_saida, ARQUIVO_METRICAS)
+    existentes = {}
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as arquivo:
+            existentes = json.load(arquivo)
+    existentes.update(metricas)
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(existentes, arquivo, indent=2, ensure_ascii=False)
+    return caminho
+
+
+def treinar(nomes, caminho_dados=CAMINHO_DADOS, diretorio_saida=DIRETORIO_MODELOS,
+            diretorio_cache=DIRETORIO_CACHE, processos=None, ajustes=None, indice_knn='sklearn'):
+    """Pré-processa (ou reaproveita o cache) e treina os modelos indicados em paralelo.
+
+    `ajustes` é um dicionário opcional {nome do modelo: hiperparâmetros}.
+    """
+    ajustes = ajustes or {}
+    inicio = time.perf_counter()
+    caminho_cache, em_cache = preprocessar(caminho_dados, diretorio_cache)
+    if em_cache:
+        print(f"Pré-processamento reaproveitado do cache '{caminho_cache}'.")
+    else:
+        print(f"Pré-processamento ajustado em {time.perf_counter() - inicio:.2f}s e salvo em '{caminho_cache}'.")
+
+    processos = processos or min(len(nomes), os.cpu_count() or 1)
+    n_jobs_treino = max(1, (os.cpu_count() or 1) // processos)
+    os.makedirs(diretorio_saida, exist_ok=True)
+
+    metricas = {}
+    print(f"\nIniciando o treinamento de {', '.join(nomes)} em {processos} processo(s)...")
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = {
+            executor.submit(treinar_modelo, nome, caminho_cache, diretorio_saida, n_jobs_treino,
+                            ajustes.get(nome), indice_knn): nome
+            for nome in nomes
+        }
+        for futuro in as_completed(futuros):
+            nome = futuros[futuro]
+            metricas[nome] = futuro.result()
+            print(f"Modelo '{nome}' treinado em {metricas[nome]['tempo_treino_s']:.2f}s "
+                  f"e salvo como '{metricas[nome]['arquivo']}'")
+
+    caminho_metricas = salvar_metricas(metricas, diretorio_saida)
+    return metricas, caminho_metricas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina os modelos de classificação de obesidade.")
+    parser.add_argument('--modelos', nargs='+', choices=list(CLASSIFICADORES), default=list(CLASSIFICADORES))
+    parser.add_argument('--dados', default=CAMINHO_DADOS, help="CSV no formato de 'Obesity.csv'")
+    parser.add_argument('--saida', default=DIRETORIO_MODELOS, help="Diretório onde os .pkl e as métricas são salvos")
+    parser.add_argument('--cache', default=DIRETORIO_CACHE, help="Diretório do cache de pré-processamento")
+    parser.add_argument('--processos', type=int, help="Número de processos de treino (padrão: um por modelo)")
+    parser.add_argument('--indice-knn', choices=INDICES_KNN, default='sklearn',
+                        help="Índice de vizinhos do KNN: busca do scikit-learn, exata (BLAS) ou aproximada")
+    otimizacao = parser.add_argument_group("otimização de hiperparâmetros (successive halving)")
+    otimizacao.add_argument('--otimizar', action='store_true',
+                            help="Busca os melhores hiperparâmetros de cada modelo antes do treino final")
+    otimizacao.add_argument('--candidatos', type=int, default=40, help="Candidatos sorteados por modelo")
+    otimizacao.add_argument('--folds', type=int, default=5, help="Folds da validação cruzada estratificada")
+    otimizacao.add_argument('--fator', type=int, default=3, help="Fração (1/fator) de candidatos mantida a cada rodada")
+    otimizacao.add_argument('--min-amostras', type=int, default=200, help="Amostras de treino na primeira rodada")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dados):
+        print(f"Erro: O arquivo '{args.dados}' não foi encontrado.")
+        raise SystemExit(1)
+
+    # O dataset é validado ao ser lido (carregar_dataset), apenas quando não há cache para ele
+    try:
+        resultados_otimizacao = {}
+        if args.otimizar:
+            from otimizar import otimizar_modelo
+            for nome in args.modelos:
+                resultados_otimizacao[nome] = otimizar_modelo(
+                    nome, args.dados, args.cache, candidatos=args.candidatos, folds=args.folds,
+                    fator=args.fator, min_amostras=args.min_amostras,
+                )
+
+        ajustes = {nome: r['hiperparametros'] for nome, r in resultados_otimizacao.items()}
+        metricas, caminho_metricas = treinar(args.modelos, args.dados, args.saida, args.cache, args.processos,
+                                             ajustes, args.indice_knn)
+    except EntradaInvalida as erro:
+        print(f"Erro: o dataset '{args.dados}' tem valores inválidos.")
+        print(erro.relatorio.to_string(max_rows=20))
+        raise SystemExit(1)
+    if resultados_otimizacao:
+        for nome, resultado in resultados_otimizacao.items():
+            metricas[nome]['otimizacao'] = resultado
+        salvar_metricas(metricas, args.saida)
+
+    for nome in args.modelos:
+        print("\n-------------------------------------------")
+        print(f"Acurácia do Modelo {nome}: {metricas[nome]['acuracia'] * 100:.2f}%")
+        print("-------------------------------------------")
+        print("Matriz de confusão:")
+        for linha in metricas[nome]['matriz_confusao']:
+            print(linha)
+    print(f"\nMétricas salvas em '{caminho_metricas}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+# --- Treinamento fora da memória (out-of-core) para datasets grandes ---
+# O CSV é lido em blocos com tipos compactos (categorias como 'category', numéricas em float32 ou
+# int8). Uma primeira passada ajusta o StandardScaler (partial_fit) e o vocabulário do One-Hot;
+# a segunda treina o classificador bloco a bloco:
+#   - sgd: SGDClassifier (regressão logística) com partial_fit em cada bloco;
+#   - floresta: uma pequena Random Forest por subamostra de cada bloco, treinadas em paralelo
+#     (um processo por floresta) e unidas em uma única RandomForestClassifier de no máximo
+#     --max-arvores árvores, sorteadas entre todas as treinadas.
+# A memória fica limitada ao tamanho do bloco (mais as subamostras em treino), qualquer que seja
+# o tamanho do arquivo. O resultado é um Pipeline igual ao de treinar.py, carregado pelo app.py.
+# Uma fração fixa das linhas (escolhida pelo número da linha) fica fora do treino e mede a acurácia.
+#
+# Uso:
+#   python app_streamlit/sinteticos.py /tmp/pacientes.csv --linhas 5000000
+#   python app_streamlit/treinar_incremental.py /tmp/pacientes.csv --classificador floresta
+import argparse
+import copy
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from esquema import COLUNA_ALVO, ESQUEMA
+from modelos import DIRETORIO_MODELOS, pico_memoria_mb, salvar_modelo
+from treinar import CAMINHO_DADOS
+
+DIRETORIO_INCREMENTAL = os.path.join(DIRETORIO_MODELOS, 'incremental')
+TAMANHO_BLOCO_PADRAO = 200_000
+FRACAO_VALIDACAO_PADRAO = 0.2
+MAX_ARVORES_PADRAO = 100
+
+# Tipos de cada coluna na leitura em blocos
+TIPOS_CATEGORICOS = {
+    coluna: 'category' for coluna in (
+        'Gender', 'family_history', 'family_history_with_overweight', 'FAVC', 'CAEC', 'SMOKE', 'SCC',
+        'CALC', 'MTRANS', COLUNA_ALVO,
+    )
+}
+TIPOS_NUMERICOS = {'Age': 'float32', 'Height': 'float32', 'Weight': 'float32'}
+# Em 'Obesity.csv' as escalas do questionário têm valores fracionários (amostras sintéticas do
+# dataset original), por isso o padrão é float32; com respostas inteiras, int8 basta
+COLUNAS_ESCALAS = ['FCVC', 'NCP', 'CH2O', 'FAF', 'TUE']
+
+
+def tipos_colunas(escalas_inteiras=False):
+    """Tipos explícitos usados no read_csv."""
+    tipo_escalas = 'int8' if escalas_inteiras else 'float32'
+    return {**TIPOS_CATEGORICOS, **TIPOS_NUMERICOS, **{coluna: tipo_escalas for coluna in COLUNAS_ESCALAS}}
+
+
+def linhas_validacao(numeros_linhas, fracao):
+    """Máscara das linhas reservadas para validação, fixa para cada número de linha do arquivo.
+
+    Usa um hash multiplicativo do número da linha: a escolha não depende do tamanho do bloco e
+    não exige guardar nenhum estado entre as passadas.
+    """
+    espalhado = (np.asarray(numeros_linhas, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2**32)
+    return espalhado < np.uint64(int(fracao * 2**32))
+
+
+def ler_blocos(caminho, tamanho_bloco=TAMANHO_BLOCO_PADRAO, escalas_inteiras=False, parte=None,
+               fracao_validacao=FRACAO_VALIDACAO_PADRAO):
+    """Lê o CSV em blocos tipados, valida e traduz pelo esquema e cria o IMC; retorna um gerador de (X, y).
+
+    Com `parte='treino'` ou `parte='validacao'`, só as linhas dessa parte são retornadas (ver
+    `linhas_validacao`); com `parte=None`, todas.
+
+    Um bloco com valores inválidos interrompe o treino (EntradaInvalida) com todos os erros do bloco;
+    a coluna 'linha' do relatório é a linha do arquivo (a partir de 0, sem o cabeçalho).
+    """
+    for bloco in pd.read_csv(caminho, chunksize=tamanho_bloco, dtype=tipos_colunas(escalas_inteiras)):
+        if parte is not None:
+            validacao = linhas_validacao(bloco.index, fracao_validacao)
+            bloco = bloco[validacao if parte == 'validacao' else ~validacao]
+            if bloco.empty:
+                continue
+        bloco = ESQUEMA.traduzir(bloco, com_alvo=True)
+        bloco['IMC'] = (bloco['Weight'] / bloco['Height']**2).astype('float32')
+        yield bloco.drop(columns=COLUNA_ALVO), bloco[COLUNA_ALVO]
+
+
+def ajustar_preprocessamento(caminho, tamanho_bloco=TAMANHO_BLOCO_PADRAO, escalas_inteiras=False, **leitura):
+    """Primeira passada: média/variância das numéricas, categorias e classes, bloco a bloco.
+
+    Retorna o ColumnTransformer já ajustado (mesma estrutura do treinar.py), as classes e o
+    número de linhas. `leitura` (parte, fracao_validacao) é repassado a `ler_blocos`.
+    """
+    escala = StandardScaler()
+    categorias = {}
+    classes = set()
+    n_linhas = 0
+    primeiro_bloco = None
+    for X, y in ler_blocos(caminho, tamanho_bloco, escalas_inteiras, **leitura):
+        if primeiro_bloco is None:
+            primeiro_bloco = X.head(100)
+            colunas_numericas = list(X.select_dtypes(include='number').columns)
+            colunas_categoricas = list(X.select_dtypes(include='category').columns)
+        escala.partial_fit(X[colunas_numericas])
+        for coluna in colunas_categoricas:
+            # Só as categorias presentes no arquivo (o tipo traduzido traz o vocabulário inteiro)
+            categorias.setdefault(coluna, set()).update(X[coluna].dropna().unique())
+        classes.update(y.dropna().unique())
+        n_linhas += len(X)
+    if primeiro_bloco is None:
+        raise ValueError(f"Nenhuma linha lida de '{caminho}' para ajustar o pré-processamento")
+
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', StandardScaler(), colunas_numericas),
+        ('cat', OneHotEncoder(categories=[sorted(categorias[c]) for c in colunas_categoricas],
+                              handle_unknown='ignore'), colunas_categoricas),
+    ])
+    # O fit em poucas linhas só monta a estrutura do ColumnTransformer (colunas, nomes, tipos);
+    # em seguida a média e a variância são substituídas pelas calculadas sobre o arquivo inteiro
+    preprocessor.fit(primeiro_bloco)
+    scaler = preprocessor.named_transformers_['num']
+    for atributo in ('mean_', 'var_', 'scale_', 'n_samples_seen_'):
+        setattr(scaler, atributo, getattr(escala, atributo))
+    return preprocessor, np.array(sorted(classes), dtype=object), n_linhas
+
+
+def _transformar(preprocessor, X):
+    X_t = preprocessor.transform(X)
+    return X_t.toarray() if hasattr(X_t, 'toarray') else X_t
+
+
+def treinar_sgd(caminho, preprocessor, classes, tamanho_bloco, escalas_inteiras=False, epocas=3, semente=42,
+                **leitura):
+    """Segunda passada: regressão logística por gradiente estocástico, um partial_fit por bloco.
+
+    Os coeficientes finais são a média dos vistos ao longo do treino (SGD com média), que oscila
+    bem menos que o último passo quando há poucas passadas pelo arquivo.
+    """
+    classificador = SGDClassifier(loss='log_loss', alpha=1e-4, average=True, random_state=semente)
+    rng = np.random.default_rng(semente)
+    for _ in range(epocas):
+        for X, y in ler_blocos(caminho, tamanho_bloco, escalas_inteiras, **leitura):
+            ordem = rng.permutation(len(X))
+            classificador.partial_fit(_transformar(preprocessor, X)[ordem], y.to_numpy()[ordem], classes=classes)
+    return classificador
+
+
+def _treinar_floresta(X, y, n_arvores, semente):
+    floresta = RandomForestClassifier(n_estimators=n_arvores, random_state=semente, n_jobs=1)
+    return floresta.fit(X, y)
+
+
+class AmostraArvores:
+    """Amostra uniforme de no máximo `max_arvores` árvores entre as de várias florestas (reservoir sampling).
+
+    Cada árvore recebida tem a mesma chance de ficar, qualquer que seja o bloco de origem; as
+    demais são descartadas assim que chegam, então a memória não cresce com o tamanho do arquivo.
+    """
+
+    def __init__(self, max_arvores=MAX_ARVORES_PADRAO, semente=42):
+        self.max_arvores = max_arvores
+        self.rng = np.random.default_rng(semente)
+        self.arvores = []
+        self.vistas = 0
+        self.base = None
+
+    def adicionar(self, floresta):
+        if self.base is None:
+            self.base = floresta
+        for arvore in floresta.estimators_:
+            self.vistas += 1
+            if len(self.arvores) < self.max_arvores:
+                self.arvores.append(arvore)
+            else:
+                posicao = self.rng.integers(self.vistas)
+                if posicao < self.max_arvores:
+                    self.arvores[posicao] = arvore
+
+
+def unir_florestas(base, arvores):
+    """Monta uma Random Forest com as árvores de florestas treinadas separadamente (com as mesmas classes)."""
+    unida = copy.copy(base)
+    unida.estimators_ = list(arvores)
+    unida.n_estimators = len(unida.estimators_)
+    unida.set_params(n_jobs=-1)
+    return unida
+
+
+def treinar_floresta(caminho, preprocessor, classes, tamanho_bloco, escalas_inteiras=False,
+                     arvores_por_bloco=10, amostras_por_bloco=50_000, processos=None, semente=42,
+                     max_arvores=MAX_ARVORES_PADRAO, **leitura):
+    """Segunda passada: uma floresta por subamostra de cada bloco, treinadas em paralelo.
+
+    No máximo `processos` subamostras ficam em treino (e em memória) ao mesmo tempo. As árvores só
+    são compatíveis se cada floresta vir todas as classes: uma subamostra sem todas elas é acumulada
+    com a do bloco seguinte. A última subamostra completa só é enviada no fim, junto com as linhas
+    que sobrarem depois dela, para que nenhuma linha sorteada fique fora do treino.
+
+    A floresta final tem no máximo `max_arvores` árvores, sorteadas uniformemente entre todas as
+    treinadas (ver `AmostraArvores`).
+    """
+    processos = processos or os.cpu_count() or 1
+    rng = np.random.default_rng(semente)
+    amostra_arvores, pendentes = AmostraArvores(max_arvores, semente), set()
+    acumulado_X, acumulado_y = [], []
+    pronta = None  # (X, y, semente) da última subamostra com todas as classes, ainda não enviada
+
+    def enviar(X_amostra, y_amostra, semente_floresta):
+        nonlocal pendentes
+        if len(pendentes) >= processos:
+            concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                amostra_arvores.adicionar(futuro.result())
+        pendentes.add(executor.submit(_treinar_floresta, X_amostra, y_amostra, arvores_por_bloco, semente_floresta))
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        for i, (X, y) in enumerate(ler_blocos(caminho, tamanho_bloco, escalas_inteiras, **leitura)):
+            amostra = rng.choice(len(X), size=min(len(X), amostras_por_bloco), replace=False)
+            acumulado_X.append(_transformar(preprocessor, X.iloc[amostra]).astype(np.float32))
+            acumulado_y.append(y.to_numpy()[amostra].astype(object))
+            y_amostra = np.concatenate(acumulado_y)
+            if len(np.unique(y_amostra)) < len(classes):
+                continue
+            if pronta is not None:
+                enviar(*pronta)
+            pronta = (np.concatenate(acumulado_X), y_amostra, semente + i)
+            acumulado_X, acumulado_y = [], []
+        if pronta is None:
+            raise ValueError("Nenhuma subamostra contém todas as classes; aumente --amostras-por-bloco")
+        if acumulado_y:
+            pronta = (np.concatenate([pronta[0], *acumulado_X]), np.concatenate([pronta[1], *acumulado_y]), pronta[2])
+        enviar(*pronta)
+        for futuro in pendentes:
+            amostra_arvores.adicionar(futuro.result())
+    return unir_florestas(amostra_arvores.base, amostra_arvores.arvores)
+
+
+def avaliar(model, caminho, tamanho_bloco=TAMANHO_BLOCO_PADRAO, **leitura):
+    """Acurácia do pipeline em um CSV (ou na parte dele indicada em `leitura`), calculada bloco a bloco."""
+    acertos = total = 0
+    for X, y in ler_blocos(caminho, tamanho_bloco, **leitura):
+        acertos += int(np.sum(model.predict(X) == y.to_numpy()))
+        total += len(X)
+    return acertos / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treino fora da memória a partir de um CSV grande.")
+    parser.add_argument('dados', nargs='?', default=CAMINHO_DADOS, help="CSV no formato de 'Obesity.csv'")
+    parser.add_argument('--classificador', choices=['sgd', 'floresta'], default='floresta')
+    parser.add_argument('--saida', help="Arquivo .pkl do pipeline (padrão: models/incremental/<classificador>.pkl)")
+    parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_PADRAO, help="Linhas lidas por vez")
+    parser.add_argument('--escalas-inteiras', action='store_true',
+                        help="Lê FCVC, NCP, CH2O, FAF e TUE como int8 (respostas inteiras)")
+    parser.add_argument('--epocas', type=int, default=3, help="Passadas pelo arquivo (sgd)")
+    parser.add_argument('--arvores-por-bloco', type=int, default=10, help="Árvores treinadas por bloco (floresta)")
+    parser.add_argument('--max-arvores', type=int, default=MAX_ARVORES_PADRAO,
+                        help="Máximo de árvores na floresta final, sorteadas entre as de todos os blocos")
+    parser.add_argument('--amostras-por-bloco', type=int, default=50_000,
+                        help="Linhas sorteadas de cada bloco para a floresta")
+    parser.add_argument('--processos', type=int, help="Florestas treinadas em paralelo (padrão: núcleos)")
+    parser.add_argument('--fracao-validacao', type=float, default=FRACAO_VALIDACAO_PADRAO,
+                        help="Fração das linhas do arquivo reservada para medir a acurácia (0: treina com todas)")
+    parser.add_argument('--validacao', help="CSV separado para medir a acurácia (em vez das linhas reservadas)")
+    args = parser.parse_args()
+
+    # Sem um CSV de validação separado, parte das linhas do próprio arquivo fica fora do treino
+    reservar = args.validacao is None and args.fracao_validacao > 0
+    leitura = {'parte': 'treino', 'fracao_validacao': args.fracao_validacao} if reservar else {}
+
+    inicio = time.perf_counter()
+    preprocessor, classes, n_linhas = ajustar_preprocessamento(
+        args.dados, args.tamanho_bloco, args.escalas_inteiras, **leitura
+    )
+    print(f"Pré-processamento ajustado em {n_linhas} linhas ({time.perf_counter() - inicio:.1f}s)")
+
+    inicio_treino = time.perf_counter()
+    if args.classificador == 'sgd':
+        classificador = treinar_sgd(args.dados, preprocessor, classes, args.tamanho_bloco,
+                                    args.escalas_inteiras, args.epocas, **leitura)
+    else:
+        classificador = treinar_floresta(args.dados, preprocessor, classes, args.tamanho_bloco,
+                                         args.escalas_inteiras, args.arvores_por_bloco,
+                                         args.amostras_por_bloco, args.processos,
+                                         max_arvores=args.max_arvores, **leitura)
+    print(f"Classificador '{args.classificador}' treinado em {time.perf_counter() - inicio_treino:.1f}s")
+
+    model_pipeline = Pipeline(steps=[('preprocessor', preprocessor), ('classifier', classificador)])
+    destino = args.saida or os.path.join(DIRETORIO_INCREMENTAL, f"{args.classificador}.pkl")
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    salvar_modelo(model_pipeline, destino)
+    print(f"Pipeline salvo em '{destino}' ({os.path.getsize(destino) / 1024**2:.1f} MB)")
+
+    if args.validacao:
+        acuracia = avaliar(model_pipeline, args.validacao, args.tamanho_bloco)
+        print(f"Acurácia em '{os.path.basename(args.validacao)}': {acuracia * 100:.2f}%")
+    elif reservar:
+        acuracia = avaliar(model_pipeline, args.dados, args.tamanho_bloco, parte='validacao',
+                           fracao_validacao=args.fracao_validacao)
+        print(f"Acurácia nas linhas reservadas ({args.fracao_validacao:.0%} de "
+              f"'{os.path.basename(args.dados)}', fora do treino): {acuracia * 100:.2f}%")
+    print(f"Pico de memória: {pico_memoria_mb():.0f} MB neste processo, "
+          f"{pico_memoria_mb(filhos=True):.0f} MB no maior processo de treino")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+# --- Índices de vizinhos mais próximos para o KNN ---
+# O KNeighborsClassifier compara cada consulta com todo o conjunto de treino, então o custo cresce
+# linearmente com o tamanho do dataset. Aqui o KNN usa um índice plugável, escolhido no treino e
+# salvo dentro do .pkl:
+#   - 'exato': busca exata com distâncias calculadas em blocos por multiplicação de matrizes (BLAS);
+#   - 'aproximado': floresta de projeções aleatórias (no estilo do Annoy). Cada árvore divide os
+#     pontos ao meio, nível a nível, por hiperplanos aleatórios; a consulta desce até uma folha em
+#     cada árvore e só os pontos dessas folhas têm a distância calculada.
+#
+# Uso:
+#   python app_streamlit/treinar.py --modelos KNN --indice-knn aproximado
+#   python app_streamlit/vizinhos.py --tamanhos 10000 100000 1000000   # benchmark recall@5 e latência
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+# Elementos da matriz de distâncias (consultas x referência) calculados de uma vez: ~64 MB em float32
+ELEMENTOS_POR_BLOCO = 2**24
+# Consultas processadas por vez no índice aproximado
+CONSULTAS_POR_BLOCO = 256
+
+
+def _normas(X):
+    return np.einsum('ij,ij->i', X, X)
+
+
+def _menores_k(distancias, k):
+    """Índices (nas colunas) das k menores distâncias de cada linha, em ordem crescente."""
+    k = min(k, distancias.shape[1])
+    indices = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+    ordem = np.argsort(np.take_along_axis(distancias, indices, axis=1), axis=1)
+    return np.take_along_axis(indices, ordem, axis=1)
+
+
+class IndiceExato:
+    """Busca exata (distância euclidiana) com o conjunto de referência em float32."""
+
+    def __init__(self, X):
+        self.referencia = np.ascontiguousarray(X, dtype=np.float32)
+        self._normas_referencia = None
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado['_normas_referencia'] = None
+        return estado
+
+    def consultar(self, X, k):
+        """Retorna (distâncias, índices) dos k vizinhos mais próximos de cada linha de X."""
+        if self._normas_referencia is None:
+            self._normas_referencia = _normas(self.referencia)
+        X = np.asarray(X, dtype=np.float32)
+        distancias = np.empty((len(X), min(k, len(self.referencia))), dtype=np.float32)
+        indices = np.empty(distancias.shape, dtype=np.intp)
+        tamanho_bloco = max(1, ELEMENTOS_POR_BLOCO // len(self.referencia))
+        for inicio in range(0, len(X), tamanho_bloco):
+            bloco = X[inicio:inicio + tamanho_bloco]
+            # ||x - r||² = ||x||² - 2 x·r + ||r||², calculado com uma única multiplicação de matrizes
+            quadrados = _normas(bloco)[:, None] - 2 * bloco @ self.referencia.T + self._normas_referencia[None, :]
+            np.maximum(quadrados, 0, out=quadrados)
+            melhores = _menores_k(quadrados, k)
+            distancias[inicio:inicio + len(bloco)] = np.sqrt(np.take_along_axis(quadrados, melhores, axis=1))
+            indices[inicio:inicio + len(bloco)] = melhores
+        return distancias, indices
+
+
+class IndiceProjecaoAleatoria:
+    """Floresta de árvores de projeção aleatória para busca aproximada de vizinhos.
+
+    As árvores são completas e balanceadas: cada nó divide seus pontos na mediana da projeção
+    sobre a direção entre dois pontos sorteados do nó. Assim cada nível é guardado como arrays
+    (direções e limiares) e a descida de todas as consultas é vetorizada.
+    """
+
+    def __init__(self, X, n_arvores=20, tamanho_folha=64, random_state=None):
+        self.referencia = np.ascontiguousarray(X, dtype=np.float32)
+        self.n_arvores = n_arvores
+        self.tamanho_folha = tamanho_folha
+        n = len(self.referencia)
+        self.profundidade = max(0, math.ceil(math.log2(n / tamanho_folha))) if n > tamanho_folha else 0
+        rng = np.random.RandomState(random_state)
+        # Todas as árvores têm a mesma forma, então são empilhadas: a consulta desce por todas juntas
+        arvores = [self._construir_arvore(rng) for _ in range(n_arvores)]
+        self.direcoes, self.limiares, self.folhas = (np.stack(partes) for partes in zip(*arvores))
+        self._normas_referencia = None
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado['_normas_referencia'] = None
+        return estado
+
+    @staticmethod
+    def _segmentos(no, n_nos):
+        """Início e tamanho do trecho de cada nó na ordem dos pontos agrupados por nó."""
+        tamanhos = np.bincount(no, minlength=n_nos)
+        return np.concatenate([[0], np.cumsum(tamanhos)[:-1]]), tamanhos
+
+    def _construir_arvore(self, rng):
+        X = self.referencia
+        n, d = X.shape
+        no = np.zeros(n, dtype=np.int64)
+        # Pontos agrupados por nó; após cada divisão continuam agrupados pelos nós filhos
+        ordem = np.arange(n)
+        n_internos = 2**self.profundidade - 1
+        direcoes = np.zeros((n_internos, d), dtype=np.float32)
+        limiares = np.zeros(n_internos, dtype=np.float32)
+
+        for nivel in range(self.profundidade):
+            n_nos = 2**nivel
+            inicios, tamanhos = self._segmentos(no, n_nos)
+            # Direção de cada nó: diferença entre dois pontos sorteados do próprio nó
+            a = ordem[inicios + (rng.random_sample(n_nos) * tamanhos).astype(np.int64)]
+            b = ordem[inicios + (rng.random_sample(n_nos) * tamanhos).astype(np.int64)]
+            direcoes_nivel = X[a] - X[b]
+            degeneradas = ~direcoes_nivel.any(axis=1)
+            direcoes_nivel[degeneradas] = rng.standard_normal((degeneradas.sum(), d))
+            projecoes = np.einsum('ij,ij->i', X, direcoes_nivel[no])
+
+            # Ordena os pontos de cada nó pela projeção com um único argsort:
+            # chave = nó + projeção normalizada para [0, 0.5] dentro do nó
+            nos, valores = no[ordem], projecoes[ordem].astype(np.float64)
+            minimos = np.minimum.reduceat(valores, inicios)
+            amplitudes = np.maximum.reduceat(valores, inicios) - minimos
+            amplitudes[amplitudes == 0] = 1.0
+            ordem = ordem[np.argsort(nos + 0.5 * (valores - minimos[nos]) / amplitudes[nos], kind='stable')]
+
+            # A primeira metade de cada nó vai para o filho da esquerda
+            metade = tamanhos // 2
+            direita = np.empty(n, dtype=np.int64)
+            direita[ordem] = np.arange(n) - inicios[nos] >= metade[nos]
+            # Limiar: ponto médio entre o último da esquerda e o primeiro da direita
+            validos = metade > 0
+            ultimo_esquerda = projecoes[ordem[inicios[validos] + metade[validos] - 1]]
+            primeiro_direita = projecoes[ordem[inicios[validos] + metade[validos]]]
+            limiares_nivel = np.zeros(n_nos, dtype=np.float32)
+            limiares_nivel[validos] = (ultimo_esquerda + primeiro_direita) / 2
+
+            direcoes[n_nos - 1:2 * n_nos - 1] = direcoes_nivel
+            limiares[n_nos - 1:2 * n_nos - 1] = limiares_nivel
+            no = 2 * no + direita
+
+        # Pontos de cada folha, completados com -1 até o tamanho da maior folha
+        n_folhas = 2**self.profundidade
+        inicios, tamanhos = self._segmentos(no, n_folhas)
+        folhas = np.full((n_folhas, max(1, tamanhos.max())), -1, dtype=np.int32)
+        folhas[no[ordem], np.arange(n) - inicios[no[ordem]]] = ordem
+        return direcoes, limiares, folhas
+
+    def _candidatos(self, X):
+        """Pontos das folhas alcançadas por cada consulta em todas as árvores (-1 completa as folhas)."""
+        arvore = np.arange(self.n_arvores)[None, :]
+        no = np.zeros((len(X), self.n_arvores), dtype=np.int64)
+        for nivel in range(self.profundidade):
+            global_ = 2**nivel - 1 + no
+            projecoes = np.einsum('qtd,qd->qt', self.direcoes[arvore, global_], X)
+            no = 2 * no + (projecoes > self.limiares[arvore, global_])
+        return self.folhas[arvore, no].reshape(len(X), -1)
+
+    def consultar(self, X, k):
+        """Retorna (distâncias, índices) aproximados dos k vizinhos mais próximos de cada linha de X."""
+        if self._normas_referencia is None:
+            self._normas_referencia = _normas(self.referencia)
+        X = np.asarray(X, dtype=np.float32)
+        k = min(k, len(self.referencia))
+        distancias = np.full((len(X), k), np.inf, dtype=np.float32)
+        indices = np.full((len(X), k), -1, dtype=np.intp)
+        for inicio in range(0, len(X), CONSULTAS_POR_BLOCO):
+            bloco = X[inicio:inicio + CONSULTAS_POR_BLOCO]
+            candidatos = self._candidatos(bloco)
+            # O mesmo ponto pode aparecer em mais de uma árvore: as repetições são descartadas
+            candidatos.sort(axis=1)
+            invalidos = candidatos < 0
+            invalidos[:, 1:] |= candidatos[:, 1:] == candidatos[:, :-1]
+            seguros = np.maximum(candidatos, 0)
+            quadrados = (_normas(bloco)[:, None]
+                         - 2 * np.einsum('qcd,qd->qc', self.referencia[seguros], bloco)
+                         + self._normas_referencia[seguros])
+            np.maximum(quadrados, 0, out=quadrados)
+            quadrados[invalidos] = np.inf
+            melhores = _menores_k(quadrados, k)
+            fim = inicio + len(bloco)
+            distancias[inicio:fim, :melhores.shape[1]] = np.sqrt(np.take_along_axis(quadrados, melhores, axis=1))
+            indices[inicio:fim, :melhores.shape[1]] = np.take_along_axis(candidatos, melhores, axis=1)
+        # Se uma consulta tiver menos de k candidatos, as posições restantes ficam com distância infinita
+        indices[np.isinf(distancias)] = -1
+        return distancias, indices
+
+
+INDICES = {'exato': IndiceExato, 'aproximado': IndiceProjecaoAleatoria}
+
+
+def votar_vizinhos(distancias, rotulos, n_classes, weights='uniform'):
+    """Probabilidades das classes a partir dos rótulos (códigos) dos vizinhos, como no scikit-learn."""
+    validos = np.isfinite(distancias)
+    if weights == 'uniform':
+        pesos = validos.astype(np.float64)
+    else:
+        # Vizinhos a distância zero recebem todo o peso
+        with np.errstate(divide='ignore'):
+            pesos = np.where(validos, 1.0 / distancias.astype(np.float64), 0.0)
+        exatos = np.isinf(pesos)
+        linhas_exatas = exatos.any(axis=1)
+        pesos[linhas_exatas] = exatos[linhas_exatas]
+    votos = np.zeros((len(rotulos), n_classes), dtype=np.float64)
+    np.add.at(votos, (np.arange(len(rotulos))[:, None], np.maximum(rotulos, 0)), pesos)
+    return votos / votos.sum(axis=1, keepdims=True)
+
+
+class KNNIndexado(ClassifierMixin, BaseEstimator):
+    """KNN (distância euclidiana) com índice de vizinhos plugável, compatível com o scikit-learn.
+
+    `indice` pode ser 'exato' ou 'aproximado'; `n_arvores` e `tamanho_folha` só valem para o
+    índice aproximado. `n_jobs` é o número de threads usadas para consultar blocos de linhas.
+    """
+
+    def __init__(self, n_neighbors=5, weights='uniform', indice='exato', n_arvores=20, tamanho_folha=64,
+                 random_state=42, n_jobs=None):
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.indice = indice
+        self.n_arvores = n_arvores
+        self.tamanho_folha = tamanho_folha
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        if self.indice not in INDICES:
+            raise ValueError(f"Índice desconhecido: '{self.indice}'. Opções: {list(INDICES)}")
+        if self.weights not in ('uniform', 'distance'):
+            raise ValueError("KNNIndexado só suporta weights='uniform' ou 'distance'")
+        X = X.toarray() if hasattr(X, 'toarray') else np.asarray(X)
+        self.classes_, codigos = np.unique(np.asarray(y), return_inverse=True)
+        self.rotulos_ = codigos.astype(np.int32)
+        self.n_features_in_ = X.shape[1]
+        if self.indice == 'exato':
+            self.indice_ = IndiceExato(X)
+        else:
+            self.indice_ = IndiceProjecaoAleatoria(X, self.n_arvores, self.tamanho_folha, self.random_state)
+        return self
+
+    def kneighbors(self, X, n_neighbors=None):
+        """Retorna (distâncias, índices) dos vizinhos de cada linha de X."""
+        X = X.toarray() if hasattr(X, 'toarray') else np.asarray(X)
+        k = n_neighbors or self.n_neighbors
+        n_threads = (os.cpu_count() or 1) if self.n_jobs == -1 else (self.n_jobs or 1)
+        if n_threads == 1 or len(X) <= CONSULTAS_POR_BLOCO:
+            return self.indice_.consultar(X, k)
+        # As multiplicações de matrizes liberam o GIL, então blocos de consultas rodam em paralelo
+        blocos = np.array_split(X, min(n_threads, math.ceil(len(X) / CONSULTAS_POR_BLOCO)))
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            resultados = list(executor.map(lambda bloco: self.indice_.consultar(bloco, k), blocos))
+        return np.concatenate([r[0] for r in resultados]), np.concatenate([r[1] for r in resultados])
+
+    def predict_proba(self, X):
+        distancias, indices = self.kneighbors(X)
+        rotulos = np.where(indices >= 0, self.rotulos_[np.maximum(indices, 0)], -1)
+        return votar_vizinhos(distancias, rotulos, len(self.classes_), self.weights)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def gerar_dados_sinteticos(X_base, n, ruido=0.1, semente=42):
+    """Sorteia n linhas de X_base (já pré-processado) com ruído gaussiano nas colunas não binárias."""
+    rng = np.random.RandomState(semente)
+    X = X_base[rng.randint(0, len(X_base), size=n)].astype(np.float32)
+    continuas = ~np.all(np.isin(X_base, (0.0, 1.0)), axis=0)
+    X[:, continuas] += rng.normal(0, ruido, size=(n, continuas.sum())).astype(np.float32)
+    return X
+
+
+def recall(indices, referencia):
+    """Fração dos k vizinhos exatos encontrados pela busca (recall@k)."""
+    acertos = sum(len(np.intersect1d(a, b)) for a, b in zip(indices, referencia))
+    return acertos / referencia.size
+
+
+def _candidatos(X, args):
+    """Construtores dos índices comparados no benchmark, todos sobre a mesma matriz `X`."""
+    from sklearn.neighbors import NearestNeighbors
+
+    return {
+        'sklearn brute': lambda: NearestNeighbors(n_neighbors=args.k, algorithm='brute').fit(X),
+        'sklearn kd_tree': lambda: NearestNeighbors(n_neighbors=args.k, algorithm='kd_tree').fit(X),
+        'exato (BLAS)': lambda: KNNIndexado(args.k, indice='exato').fit(X, np.zeros(len(X))),
+        'aproximado (proj.)': lambda: KNNIndexado(
+            args.k, indice='aproximado', n_arvores=args.n_arvores, tamanho_folha=args.tamanho_folha
+        ).fit(X, np.zeros(len(X))),
+    }
+
+
+def main():
+    import joblib
+
+    from treinar import preprocessar
+
+    parser = argparse.ArgumentParser(description="Benchmark dos índices de vizinhos do KNN (recall@k e latência).")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--n-arvores', type=int, default=20)
+    parser.add_argument('--tamanho-folha', type=int, default=64)
+    args = parser.parse_args()
+
+    # Dados sintéticos no espaço de features do modelo: linhas do treino com ruído nas colunas contínuas
+    dados = joblib.load(preprocessar()[0])
+    X_base = np.asarray(dados['X_train'], dtype=np.float64)
+    consultas = gerar_dados_sinteticos(np.asarray(dados['X_test'], dtype=np.float64), args.consultas, semente=7)
+
+    print(f"{'Linhas':>10}  {'Índice':<22}{'Construção (s)':>15}{'Consulta (ms)':>15}{f'Recall@{args.k}':>11}")
+    for tamanho in args.tamanhos:
+        referencia = None
+        for nome, construir in _candidatos(gerar_dados_sinteticos(X_base, tamanho), args).items():
+            inicio = time.perf_counter()
+            indice = construir()
+            construcao = time.perf_counter() - inicio
+            # Latência de uma consulta por vez, como na predição de um questionário
+            inicio = time.perf_counter()
+            vizinhos = np.concatenate([indice.kneighbors(consultas[i:i + 1], args.k)[1] for i in range(len(consultas))])
+            latencia = (time.perf_counter() - inicio) / len(consultas) * 1000
+            if referencia is None:
+                referencia = vizinhos
+            print(f"{tamanho:>10}  {nome:<22}{construcao:>15.2f}{latencia:>15.3f}{recall(vizinhos, referencia):>11.3f}")
+
+
+if __name__ == '__main__':
+    main()